@@ -0,0 +1,308 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from textnode import TextNode, TextType
+from markdown_parser import (BlockType, BLOCK_HANDLERS, block_to_block_type, markdown_to_blocks,
+                             markdown_to_html_node, text_to_textnodes, split_nodes_delimiter, split_nodes_image,
+                             split_nodes_link)
+import front_matter
+import main as site_main
+import mapped_source
+from mapped_source import open_block_reader
+from corpus import CORPORA, generate_corpus, write_corpus
+from main import generate_pages_recursively
+
+INLINE_SAMPLE = ("Some plain words, then **bold text** and _italic text_ with `inline code`, "
+                 "a [link](https://example.com/page) and an ![image](/images/photo.png). ")
+
+TEMPLATE = "<!doctype html><title>{{ Title }}</title><link href=\"/index.css\" /><article>{{ Content }}</article>"
+
+
+def chained_text_to_textnodes(text):
+    """The former five-pass inline pipeline, kept as a reference point for the single-pass scanner."""
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+def legacy_block_to_block_type(block):
+    """The former classifier: uncompiled patterns and an if-chain, kept as a reference point."""
+    if re.match(r"^#{1,6} ", block):
+        return BlockType.HEADING
+    elif block.startswith("```") and block.endswith("```"):
+        return BlockType.CODE
+    elif block.startswith("> "):
+        return BlockType.QUOTE
+    elif block.startswith("- "):
+        return BlockType.ULIST
+    elif re.match(r"^\d+\. ", block):
+        return BlockType.OLIST
+    else:
+        return BlockType.PARAGRAPH
+
+
+def legacy_dispatch(block):
+    """Classification plus the former if-chain that picked the handler."""
+    block_type = legacy_block_to_block_type(block)
+    for candidate in (BlockType.PARAGRAPH, BlockType.HEADING, BlockType.CODE, BlockType.OLIST, BlockType.ULIST,
+                      BlockType.QUOTE):
+        if block_type == candidate:
+            return BLOCK_HANDLERS[candidate]
+    raise ValueError("invalid block type")
+
+
+def table_dispatch(block):
+    return BLOCK_HANDLERS[block_to_block_type(block)]
+
+
+def bench_block_overhead(repeat):
+    """Per-block cost of classifying a block and picking its handler, without running the handler."""
+    blocks = []
+    for kind in sorted(CORPORA):
+        for markdown in generate_corpus(kind, 0.1).values():
+            blocks.extend(markdown_to_blocks(markdown))
+    for name, dispatch in (("legacy if-chain", legacy_dispatch), ("dispatch table", table_dispatch)):
+        seconds = time_call(lambda: [dispatch(block) for block in blocks], repeat=repeat)
+        print(f"{name:<16} {seconds / len(blocks) * 1e9:>8.1f} ns/block ({len(blocks)} blocks)")
+
+
+def make_paragraph(size):
+    """Builds a single paragraph of roughly size characters full of inline markup."""
+    return (INLINE_SAMPLE * (size // len(INLINE_SAMPLE) + 1))[:size]
+
+
+def time_call(func, *args, repeat=3):
+    """Best wall time of several runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_inline_scaling(sizes, reference_limit):
+    """Times text_to_textnodes on growing paragraphs; the chained reference only up to reference_limit."""
+    print(f"{'size':>10} {'single-pass':>12} {'s/MB':>8} {'chained':>10} {'s/MB':>8}")
+    for size in sizes:
+        text = make_paragraph(size)
+        megabytes = size / (1 << 20)
+        single = time_call(text_to_textnodes, text)
+        line = f"{size:>10} {single:>12.4f} {single / megabytes:>8.3f}"
+        if size <= reference_limit:
+            chained = time_call(chained_text_to_textnodes, text, repeat=1)
+            line += f" {chained:>10.4f} {chained / megabytes:>8.3f}"
+        print(line)
+
+
+def _inline_texts(documents):
+    """Every non-code block of the corpus, as the inline parser would see it."""
+    texts = []
+    for markdown in documents.values():
+        texts.extend(block for block in markdown.split("\n\n") if not block.startswith("```"))
+    return texts
+
+
+def _build_site(documents, root):
+    content = os.path.join(root, "content")
+    template = os.path.join(root, "template.html")
+    if not os.path.isdir(content):
+        write_corpus(content, documents)
+        with open(template, 'w') as f:
+            f.write(TEMPLATE)
+
+    def build():
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(content, template, os.path.join(root, "docs"), "/")
+    return build
+
+
+# Modules through which a build opens page sources (whole, block by block or header only) and outputs
+_OPENING_MODULES = (site_main, mapped_source, front_matter)
+
+
+@contextlib.contextmanager
+def simulated_io_latency(seconds):
+    """Delays every file the build opens for page sources and outputs, like a network filesystem would."""
+    def slow_open(*args, **kwargs):
+        time.sleep(seconds)
+        return open(*args, **kwargs)
+    for module in _OPENING_MODULES:
+        module.open = slow_open
+    try:
+        yield
+    finally:
+        for module in _OPENING_MODULES:
+            del module.open
+
+
+def bench_pipeline(kinds, scale, io_threads, latency, repeat):
+    """Compares the throughput of serial builds and pipelined builds with io_threads I/O threads."""
+    print(f"{'corpus':<14} {'mode':<12} {'seconds':>8} {'pages/s':>9} {'MB/s':>7}")
+    for kind in kinds:
+        documents = generate_corpus(kind, scale)
+        megabytes = sum(len(markdown) for markdown in documents.values()) / (1 << 20)
+        with tempfile.TemporaryDirectory() as tmp:
+            _build_site(documents, tmp)
+            content, template = os.path.join(tmp, "content"), os.path.join(tmp, "template.html")
+            for mode, threads in (("serial", 0), (f"pipeline x{io_threads}", io_threads)):
+                def build():
+                    with contextlib.redirect_stdout(io.StringIO()), simulated_io_latency(latency):
+                        generate_pages_recursively(content, template, os.path.join(tmp, "docs"), "/",
+                                                   io_threads=threads)
+                seconds = time_call(build, repeat=repeat)
+                print(f"{kind:<14} {mode:<12} {seconds:>8.3f} {len(documents) / seconds:>9.1f} "
+                      f"{megabytes / seconds:>7.2f}")
+
+
+def _read_blocks(path, threshold):
+    with open_block_reader(path, threshold) as reader:
+        return reader.read_until_title() + list(reader)
+
+
+def bench_mmap_crossover(sizes, repeat):
+    """Times reading the blocks of growing sources as text lines and mapped.
+
+    The crossover is the smallest size from which mapping wins at every larger size.
+    """
+    document = "\n\n".join(generate_corpus("huge-pages", 0.5).values())
+    print(f"{'size':>10} {'read':>10} {'mmap':>10} {'speedup':>8}")
+    crossover = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"{size}.md")
+            with open(path, 'w') as f:
+                f.write((document * (size // len(document) + 1))[:size])
+            read = time_call(_read_blocks, path, float("inf"), repeat=repeat)
+            mapped = time_call(_read_blocks, path, 0, repeat=repeat)
+            if mapped >= read:
+                crossover = None
+            elif crossover is None:
+                crossover = size
+            print(f"{size:>10} {read:>10.5f} {mapped:>10.5f} {read / mapped:>7.2f}x")
+    print(f"Crossover: {crossover if crossover is not None else 'none'} bytes")
+
+
+def measure_node_memory(documents):
+    """Megabytes still allocated after building the node trees of every document, i.e. their retained size."""
+    tracemalloc.start()
+    try:
+        nodes = [markdown_to_html_node(markdown) for markdown in documents.values()]
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del nodes
+    return retained / (1 << 20)
+
+
+def run_suite(kinds, scale, repeat):
+    """Times every pipeline stage on every corpus kind and measures the memory held by the node trees.
+
+    Returns {case name: value}; every value is a cost (seconds or megabytes), so lower is better.
+    """
+    results = {}
+    for kind in kinds:
+        documents = generate_corpus(kind, scale)
+        texts = _inline_texts(documents)
+        nodes = [markdown_to_html_node(markdown) for markdown in documents.values()]
+
+        results[f"{kind}/text_to_textnodes"] = time_call(lambda: [text_to_textnodes(t) for t in texts], repeat=repeat)
+        results[f"{kind}/markdown_to_html_node"] = time_call(
+            lambda: [markdown_to_html_node(markdown) for markdown in documents.values()], repeat=repeat)
+        results[f"{kind}/to_html"] = time_call(lambda: [node.to_html() for node in nodes], repeat=repeat)
+        results[f"{kind}/node_memory_mb"] = measure_node_memory(documents)
+        with tempfile.TemporaryDirectory() as tmp:
+            results[f"{kind}/build"] = time_call(_build_site(documents, tmp), repeat=repeat)
+        print(f"{kind}: " + ", ".join(f"{case.split('/')[1]} {value:.4f}"
+                                      for case, value in results.items() if case.startswith(kind + "/")))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns (case, baseline, current) for every case costlier than its baseline by more than threshold."""
+    regressions = []
+    for case, seconds in sorted(results.items()):
+        previous = baseline.get(case)
+        if previous and seconds > previous * (1 + threshold):
+            regressions.append((case, previous, seconds))
+    return regressions
+
+
+def save_results(path, results, scale):
+    with open(path, 'w') as f:
+        json.dump({"python": platform.python_version(), "scale": scale, "results": results}, f, indent=2,
+                  sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the markdown pipeline.")
+    parser.add_argument("--kinds", nargs="+", choices=sorted(CORPORA), default=sorted(CORPORA),
+                        help="corpus kinds to run")
+    parser.add_argument("--scale", type=float, default=0.25, help="multiplier for the number of pages per corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best one counts")
+    parser.add_argument("--output", metavar="PATH", help="write the results as JSON to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against results saved with --output")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown against the baseline that counts as a regression (default: 0.2)")
+    parser.add_argument("--inline-scaling", action="store_true",
+                        help="only time text_to_textnodes on growing paragraphs")
+    parser.add_argument("--block-overhead", action="store_true",
+                        help="only time block classification and handler dispatch per block")
+    parser.add_argument("--pipeline", type=int, metavar="THREADS",
+                        help="only compare serial and pipelined build throughput with THREADS I/O threads")
+    parser.add_argument("--io-latency", type=float, default=0.0, metavar="MS",
+                        help="simulated latency per opened file for --pipeline, in milliseconds")
+    parser.add_argument("--mmap-crossover", action="store_true",
+                        help="only compare reading sources as text and mapped, over --sizes in bytes")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        help="paragraph sizes in characters for --inline-scaling or source sizes in bytes for "
+                             "--mmap-crossover")
+    parser.add_argument("--reference-limit", type=int, default=1 << 19,
+                        help="largest size the quadratic chained pipeline is timed on")
+    args = parser.parse_args(argv)
+
+    if args.inline_scaling:
+        bench_inline_scaling(args.sizes or [1 << 18, 1 << 19, 1 << 20, 1 << 21, 1 << 22], args.reference_limit)
+        return 0
+    if args.block_overhead:
+        bench_block_overhead(max(args.repeat, 5))
+        return 0
+    if args.mmap_crossover:
+        bench_mmap_crossover(args.sizes or [1 << shift for shift in range(10, 25, 2)], max(args.repeat, 5))
+        return 0
+    if args.pipeline:
+        bench_pipeline(args.kinds, args.scale, args.pipeline, args.io_latency / 1000, args.repeat)
+        return 0
+
+    results = run_suite(args.kinds, args.scale, args.repeat)
+    if args.output:
+        save_results(args.output, results, args.scale)
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for case, previous, seconds in regressions:
+            print(f"REGRESSION {case}: {previous:.4f} -> {seconds:.4f} ({seconds / previous - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions above {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
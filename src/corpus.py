@@ -0,0 +1,89 @@
+import os
+import random
+from typing import Dict
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+         "et dolore magna aliqua elves hobbits rivendell glorfindel bombadil wizard river mountain").split()
+
+
+class CorpusGenerator:
+    """Produces deterministic synthetic markdown: the same seed always yields byte-identical documents."""
+    def __init__(self, seed: int = 0):
+        self.random = random.Random(seed)
+
+    def words(self, count: int) -> str:
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def inline(self, count: int, links: float = 0.1, images: float = 0.02) -> str:
+        parts = []
+        for _ in range(count):
+            roll = self.random.random()
+            if roll < links:
+                parts.append(f"[{self.words(2)}](/blog/{self.random.choice(WORDS)})")
+            elif roll < links + images:
+                parts.append(f"![{self.words(2)}](/images/{self.random.choice(WORDS)}.png)")
+            elif roll < links + images + 0.05:
+                parts.append(f"**{self.words(2)}**")
+            elif roll < links + images + 0.1:
+                parts.append(f"_{self.words(2)}_")
+            elif roll < links + images + 0.13:
+                parts.append(f"`{self.random.choice(WORDS)}()`")
+            else:
+                parts.append(self.words(1))
+        return " ".join(parts)
+
+    def code_block(self, lines: int) -> str:
+        body = "\n".join(f"{self.random.choice(WORDS)} = call({self.random.randint(0, 99)})" for _ in range(lines))
+        return f"```\n{body}\n```"
+
+    def document(self, title: str, blocks: int, links: float = 0.1, code: float = 0.1, list_items: int = 4,
+                 paragraph_words: int = 60) -> str:
+        parts = [f"# {title}"]
+        for _ in range(blocks):
+            roll = self.random.random()
+            if roll < code:
+                parts.append(self.code_block(self.random.randint(3, 12)))
+            elif roll < code + 0.1:
+                parts.append(f"## {self.words(4)}")
+            elif roll < code + 0.2:
+                parts.append("\n".join(f"- {self.inline(8, links)}" for _ in range(list_items)))
+            elif roll < code + 0.25:
+                parts.append("\n".join(f"{i}. {self.inline(8, links)}" for i in range(1, list_items + 1)))
+            elif roll < code + 0.3:
+                parts.append("\n".join(f"> {self.inline(10, links)}" for _ in range(3)))
+            else:
+                parts.append(self.inline(paragraph_words, links))
+        return "\n\n".join(parts) + "\n"
+
+
+# name -> (number of pages, blocks per page, generator options)
+CORPORA = {
+    "small-pages": (400, 8, {}),
+    "huge-pages": (2, 4000, {}),
+    "deep-nesting": (60, 20, {"list_items": 200}),
+    "link-heavy": (100, 30, {"links": 0.5}),
+    "code-heavy": (100, 30, {"code": 0.7}),
+}
+
+
+def generate_corpus(kind: str, scale: float = 1.0, seed: int = 0) -> Dict[str, str]:
+    """Returns {relative path: markdown} for one of the CORPORA kinds, scaled in number of pages."""
+    pages, blocks, options = CORPORA[kind]
+    generator = CorpusGenerator(seed)
+    documents = {}
+    for index in range(max(1, int(pages * scale))):
+        # Deep-nesting corpora also nest their directories, one level per page
+        if kind == "deep-nesting":
+            directory = os.path.join(*[f"d{level}" for level in range(index % 30 + 1)], f"page{index}")
+        else:
+            directory = os.path.join(f"section{index % 10}", f"page{index}")
+        documents[os.path.join(directory, "index.md")] = generator.document(f"{kind} {index}", blocks, **options)
+    return documents
+
+
+def write_corpus(root: str, documents: Dict[str, str]):
+    for relative_path, markdown in documents.items():
+        path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(markdown)
@@ -0,0 +1,103 @@
+import os
+from typing import Dict, Iterable, List, Optional
+
+from state import load_json, save_json
+
+GRAPH_VERSION = 1
+
+
+def resolve_url(url: str, content_dir: str, static_dir: str) -> Optional[str]:
+    """Maps a root-relative URL found in a page to the source file it refers to, or None.
+
+    /blog/post can be content/blog/post.md or content/blog/post/index.md; anything else is looked up in
+    the static directory, with or without the static/ prefix the output places assets under.
+    """
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    relative = url.split("#", 1)[0].split("?", 1)[0].strip("/")
+    if relative.endswith(".html"):
+        relative = relative[:-len(".html")]
+    candidates = [os.path.join(content_dir, relative, "index.md")]
+    if relative:
+        candidates.append(os.path.join(content_dir, relative + ".md"))
+        candidates.append(os.path.join(static_dir, relative))
+        if relative.startswith("static/"):
+            candidates.append(os.path.join(static_dir, relative[len("static/"):]))
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.normpath(candidate)
+    return None
+
+
+class DependencyGraph:
+    """Records, for each page source, the template, linked pages and static assets its output depends on.
+
+    The graph is persisted between builds. Only direct dependents of a changed path are invalidated: a page
+    embeds nothing from the pages it links to, so changes never need to propagate further than one edge.
+    """
+    KINDS = ("template", "pages", "assets")
+
+    def __init__(self, path: str, content_dir: str = "content", static_dir: str = "static",
+                 pages: Dict[str, Dict[str, List[str]]] = None):
+        self.path = path
+        self.content_dir = os.path.normpath(content_dir)
+        self.static_dir = os.path.normpath(static_dir)
+        self.pages = pages if pages is not None else {}
+        self._dependents = None
+
+    @classmethod
+    def load(cls, path: str, content_dir: str = "content", static_dir: str = "static") -> 'DependencyGraph':
+        data = load_json(path, GRAPH_VERSION)
+        if data is None:
+            return cls(path, content_dir, static_dir)
+        return cls(path, content_dir, static_dir, data.get("pages", {}))
+
+    def record(self, source_path: str, template_path: str, urls: Iterable[str]):
+        """Replaces the dependencies of a page with its template and the files its URLs resolve to."""
+        source_path = os.path.normpath(source_path)
+        pages, assets = set(), set()
+        for url in urls:
+            target = resolve_url(url, self.content_dir, self.static_dir)
+            if target is None or target == source_path:
+                continue
+            (pages if target.endswith(".md") and target.startswith(self.content_dir + os.sep) else assets).add(target)
+        self.pages[source_path] = {
+            "template": [os.path.normpath(template_path)],
+            "pages": sorted(pages),
+            "assets": sorted(assets),
+        }
+        self._dependents = None
+
+    def forget(self, source_path: str):
+        self.pages.pop(os.path.normpath(source_path), None)
+        self._dependents = None
+
+    def dependents(self, path: str) -> Dict[str, str]:
+        """Returns {page: kind of dependency} for every page that depends directly on path."""
+        if self._dependents is None:
+            self._dependents = {}
+            for page, dependencies in self.pages.items():
+                for kind in self.KINDS:
+                    for dependency in dependencies.get(kind, ()):
+                        self._dependents.setdefault(dependency, {})[page] = kind
+        return self._dependents.get(os.path.normpath(path), {})
+
+    def rebuild_set(self, changed_paths: Iterable[str]) -> Dict[str, str]:
+        """Returns {page: reason} for the minimal set of pages to rebuild after changed_paths changed.
+
+        Changed page sources are rebuilt themselves; every other page is rebuilt only if it depends on a
+        changed path. Sources that were deleted are reported too, so callers can drop their outputs.
+        """
+        reasons = {}
+        for path in sorted(os.path.normpath(path) for path in changed_paths):
+            if path.endswith(".md") and path.startswith(self.content_dir + os.sep):
+                reasons.setdefault(path, "source changed" if os.path.isfile(path) else "source deleted")
+            for page, kind in sorted(self.dependents(path).items()):
+                reasons.setdefault(page, f"{_DESCRIPTIONS[kind]} {path} changed")
+        return reasons
+
+    def save(self):
+        save_json(self.path, {"version": GRAPH_VERSION, "pages": self.pages}, indent=1)
+
+
+_DESCRIPTIONS = {"template": "template", "pages": "linked page", "assets": "asset"}
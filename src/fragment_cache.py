@@ -0,0 +1,101 @@
+import hashlib
+import os
+
+from markdown_parser import PARSER_VERSION
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class FragmentCache:
+    """On-disk, content-addressed cache mapping markdown blocks to their rendered HTML.
+
+    Entries live at <root>/v<PARSER_VERSION>/<first two hex digits>/<sha256>.html, keyed on the block text
+    and a namespace for any option that changes the output. Nothing in the layout is machine-specific,
+    and every write is a temp file plus rename, so the directory can be shared as a CI cache between
+    runners and concurrent builds. Hits refresh the file's mtime; once the cache grows past max_bytes the
+    least recently used entries are evicted.
+    """
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES, namespace: str = "", min_block_size: int = 200):
+        self.root = root
+        self.directory = os.path.join(root, f"v{PARSER_VERSION}")
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        # Parsing a tiny block is cheaper than a file lookup
+        self.min_block_size = min_block_size
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def __getstate__(self):
+        # Worker processes track their own size estimate and counters
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0, _size=None)
+        return state
+
+    def key(self, block: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{block}".encode()).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.html")
+
+    def accepts(self, block: str) -> bool:
+        return len(block) >= self.min_block_size
+
+    def get(self, block: str) -> str:
+        """Returns the cached HTML of block, or None."""
+        path = self.path_for(self.key(block))
+        try:
+            with open(path, 'r') as f:
+                html = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return html
+
+    def put(self, block: str, html: str):
+        path = self.path_for(self.key(block))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+        if self._size is None:
+            self._size = self.disk_usage()
+        else:
+            self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".html"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime_ns
+
+    def disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Deletes least recently used entries until the cache is below 90% of max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * 0.9
+        for path, entry_size, _ in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
@@ -0,0 +1,198 @@
+import itertools
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Opening line -> syntax; the header ends at the next line equal to the opening one
+DELIMITERS = {"---": "yaml", "+++": "toml"}
+
+_YAML_ENTRY = re.compile(r"([A-Za-z_][\w-]*)\s*:(?:\s+(.*))?$")
+_TOML_ENTRY = re.compile(r"([A-Za-z_][\w-]*)\s*=\s*(.*)$")
+_INT = re.compile(r"[+-]?\d+")
+_FLOAT = re.compile(r"[+-]?(\d+\.\d*|\.\d+)([eE][+-]?\d+)?|[+-]?\d+[eE][+-]?\d+")
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:\d{2})?)?")
+_ESCAPES = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
+
+
+class FrontMatterError(ValueError):
+    """Raised when a page header is not valid front matter of the supported subset."""
+
+
+def _split_comment(text: str) -> str:
+    """Cuts a trailing # comment off an unquoted value."""
+    match = re.search(r"(^|\s)#", text)
+    return text[:match.start()].rstrip() if match else text
+
+
+def _parse_quoted(text: str) -> Tuple[str, str]:
+    """Parses the quoted string text starts with; returns it and the rest of text."""
+    quote = text[0]
+    chars = []
+    position = 1
+    while position < len(text):
+        char = text[position]
+        if char == quote:
+            return "".join(chars), text[position + 1:]
+        if char == "\\" and quote == '"':
+            position += 1
+            escaped = text[position:position + 1]
+            if escaped not in _ESCAPES:
+                raise FrontMatterError(f"unsupported escape \\{escaped}")
+            char = _ESCAPES[escaped]
+        chars.append(char)
+        position += 1
+    raise FrontMatterError(f"unterminated string {text}")
+
+
+def _parse_list(text: str, bare_strings: bool) -> Tuple[list, str]:
+    """Parses the [a, b, ...] list text starts with; returns it and the rest of text. Lists do not nest."""
+    items = []
+    rest = text[1:].lstrip()
+    while not rest.startswith("]"):
+        if rest.startswith("["):
+            raise FrontMatterError("nested lists are not supported")
+        if rest[:1] in ("'", '"'):
+            item, rest = _parse_quoted(rest)
+        else:
+            match = re.match(r"[^,\]\[]*", rest)
+            item, rest = _parse_scalar(match.group(0), bare_strings), rest[match.end():]
+        items.append(item)
+        rest = rest.lstrip()
+        if rest.startswith(","):
+            rest = rest[1:].lstrip()
+        elif not rest.startswith("]"):
+            raise FrontMatterError(f"unterminated list {text}")
+    return items, rest[1:]
+
+
+def _parse_scalar(text: str, bare_strings: bool):
+    text = text.strip()
+    if text == "":
+        raise FrontMatterError("missing value")
+    if text in ("true", "false"):
+        return text == "true"
+    if _INT.fullmatch(text):
+        return int(text)
+    if _FLOAT.fullmatch(text):
+        return float(text)
+    if bare_strings or _DATE.fullmatch(text):
+        # Dates are kept as written
+        return text
+    raise FrontMatterError(f"strings must be quoted: {text}")
+
+
+def _parse_value(text: str, bare_strings: bool):
+    """Parses a value: a quoted string, a [list], a boolean, a number or, in YAML, a bare string."""
+    text = text.strip()
+    if text[:1] in ("'", '"'):
+        value, rest = _parse_quoted(text)
+    elif text.startswith("["):
+        value, rest = _parse_list(text, bare_strings)
+    else:
+        value = _split_comment(text)
+        if bare_strings and value in ("null", "~"):
+            return None
+        return _parse_scalar(value, bare_strings)
+    if rest.strip() and not rest.strip().startswith("#"):
+        raise FrontMatterError(f"unexpected text after value: {rest.strip()}")
+    return value
+
+
+def parse_front_matter(lines: List[str], syntax: str) -> Dict[str, object]:
+    """Parses the header lines (without delimiters) of the given syntax into a dict.
+
+    Supported are flat key/value pairs; strings, booleans, integers, floats, dates (kept as strings) and flat
+    lists. YAML also takes bare strings, null and block lists of "- item" lines; TOML requires quoted strings.
+    """
+    yaml = syntax == "yaml"
+    entry_pattern = _YAML_ENTRY if yaml else _TOML_ENTRY
+    data = {}
+    list_key = None
+    for number, line in enumerate(lines, 2):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        try:
+            if yaml and list_key is not None and stripped.startswith("- "):
+                if data[list_key] is None:
+                    data[list_key] = []
+                data[list_key].append(_parse_value(stripped[2:], True))
+                continue
+            if line[:1].isspace():
+                raise FrontMatterError("nested values are not supported")
+            match = entry_pattern.match(stripped)
+            if match is None:
+                raise FrontMatterError(f"expected {'key: value' if yaml else 'key = value'}")
+            key, value = match.group(1), match.group(2)
+            list_key = None
+            if yaml and not (value or "").strip():
+                # Null, unless a block list follows
+                data[key] = None
+                list_key = key
+                continue
+            data[key] = _parse_value(value, yaml)
+        except FrontMatterError as e:
+            raise FrontMatterError(f"line {number}: {e}") from None
+    return data
+
+
+def split_front_matter(lines: Iterable[str]) -> Tuple[Dict[str, object], Iterator[str]]:
+    """Reads the front matter at the start of lines; returns it and an iterator over the remaining lines.
+
+    Only the header lines are consumed, so reading the front matter of a file costs its first few lines.
+    A document without front matter yields an empty dict and all of its lines.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, lines
+    delimiter = first.rstrip()
+    if delimiter not in DELIMITERS:
+        return {}, itertools.chain((first,), lines)
+    header = []
+    for line in lines:
+        if line.rstrip() == delimiter:
+            return parse_front_matter(header, DELIMITERS[delimiter]), lines
+        header.append(line)
+    raise FrontMatterError(f"front matter opened with {delimiter} is never closed")
+
+
+def split_front_matter_buffer(buffer) -> Tuple[Dict[str, object], int]:
+    """Byte buffer counterpart of split_front_matter, e.g. for an mmap; returns the front matter and the offset
+    the document body starts at. The buffer holds UTF-8 text with \\n line breaks.
+    """
+    if buffer[:3] not in (b"---", b"+++"):
+        return {}, 0
+    header = []
+    position = 0
+    delimiter = None
+    while position < len(buffer):
+        end = buffer.find(b"\n", position)
+        end = len(buffer) if end == -1 else end + 1
+        line = buffer[position:end].decode("utf-8")
+        position = end
+        if delimiter is None:
+            delimiter = line.rstrip()
+            if delimiter not in DELIMITERS:
+                return {}, 0
+        elif line.rstrip() == delimiter:
+            return parse_front_matter(header, DELIMITERS[delimiter]), position
+        else:
+            header.append(line)
+    raise FrontMatterError(f"front matter opened with {delimiter} is never closed")
+
+
+def read_front_matter(path: str) -> Dict[str, object]:
+    """The front matter of the file at path, reading nothing past the header."""
+    with open(path, 'r') as f:
+        return split_front_matter(f)[0]
+
+
+def template_value(value) -> str:
+    """How a front matter value fills a {{ slot }}: lists are joined with commas, null is empty."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ", ".join(template_value(item) for item in value)
+    return str(value)
@@ -0,0 +1,138 @@
+import os
+import time
+from typing import Dict, Iterator, List, Set, Tuple
+
+from state import load_json, save_json
+
+SNAPSHOT_VERSION = 1
+# A directory modified this close to the previous scan may have changed again within the same mtime tick
+RACY_WINDOW_NS = 2 * 10**9
+
+# (size, mtime_ns, inode) of a file
+FileStat = Tuple[int, int, int]
+
+
+def stat_key(stat: os.stat_result) -> FileStat:
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def iter_tree(root: str) -> Iterator[os.DirEntry]:
+    """Yields a DirEntry for every file under root, depth first in name order.
+
+    The entry types come from the directory listing itself, so no file is stat'ed; entry.stat() costs one
+    call and is cached on the entry. Symlinks are followed like os.path.isfile/isdir would.
+    """
+    try:
+        with os.scandir(root) as iterator:
+            entries = sorted(iterator, key=lambda entry: entry.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    for entry in entries:
+        if entry.is_dir():
+            yield from iter_tree(entry.path)
+        elif entry.is_file():
+            yield entry
+
+
+class TreeSnapshot:
+    """The (size, mtime_ns, inode) of every file under root, keyed by path relative to root.
+
+    Scanning with a previous snapshot reuses the listing of every directory whose own mtime and inode did not
+    change, since only adding, removing or renaming entries touches a directory. Such directories are not
+    read again; their files are still stat'ed, because editing a file in place leaves its directory alone.
+    Snapshots can be saved and diffed against the next scan.
+    """
+    def __init__(self, root: str, files: Dict[str, FileStat] = None,
+                 dirs: Dict[str, Tuple[int, int, List[str], List[str]]] = None, scanned_ns: int = 0):
+        self.root = root
+        # Filled in scan order: depth first, by name
+        self.files = files if files is not None else {}
+        # relative directory -> (mtime_ns, inode, file names, subdirectory names)
+        self.dirs = dirs if dirs is not None else {}
+        self.scanned_ns = scanned_ns
+        self.listed = 0
+
+    @classmethod
+    def scan(cls, root: str, previous: 'TreeSnapshot' = None) -> 'TreeSnapshot':
+        snapshot = cls(root, scanned_ns=time.time_ns())
+        reusable = {}
+        if previous is not None and previous.root == root:
+            reusable = {relative: entry for relative, entry in previous.dirs.items()
+                        if entry[0] < previous.scanned_ns - RACY_WINDOW_NS}
+        snapshot._scan_dir("", reusable)
+        return snapshot
+
+    def _scan_dir(self, relative: str, previous_dirs):
+        path = os.path.join(self.root, relative) if relative else self.root
+        try:
+            dir_stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        cached = previous_dirs.get(relative)
+        if cached is not None and (cached[0], cached[1]) == (dir_stat.st_mtime_ns, dir_stat.st_ino):
+            file_names, dir_names = cached[2], cached[3]
+            stats = {}
+            for name in file_names:
+                try:
+                    stats[name] = stat_key(os.stat(os.path.join(path, name)))
+                except FileNotFoundError:
+                    continue
+        else:
+            self.listed += 1
+            file_names, dir_names, stats = [], [], {}
+            try:
+                with os.scandir(path) as iterator:
+                    for entry in iterator:
+                        try:
+                            if entry.is_dir():
+                                dir_names.append(entry.name)
+                            elif entry.is_file():
+                                stats[entry.name] = stat_key(entry.stat())
+                                file_names.append(entry.name)
+                        except FileNotFoundError:
+                            continue
+            except (FileNotFoundError, NotADirectoryError):
+                return
+            file_names.sort()
+            dir_names.sort()
+        self.dirs[relative] = (dir_stat.st_mtime_ns, dir_stat.st_ino, file_names, dir_names)
+        # Files and subdirectories interleave by name, the same order as iter_tree
+        subdirectories = set(dir_names)
+        for name in sorted(file_names + dir_names):
+            if name in subdirectories:
+                self._scan_dir(os.path.join(relative, name), previous_dirs)
+            elif name in stats:
+                self.files[os.path.join(relative, name)] = stats[name]
+
+    def paths(self, suffix: str = "") -> List[str]:
+        """Full paths of the files ending with suffix, in scan order."""
+        return [os.path.join(self.root, relative) for relative in self.files if relative.endswith(suffix)]
+
+    def stat(self, path: str) -> FileStat:
+        """The recorded stat of a full path under root, or None."""
+        return self.files.get(os.path.relpath(path, self.root))
+
+    def diff(self, other: 'TreeSnapshot') -> Tuple[Set[str], Set[str], Set[str]]:
+        """Returns the (added, removed, modified) relative paths going from this snapshot to other."""
+        added = set(other.files) - set(self.files)
+        removed = set(self.files) - set(other.files)
+        modified = {path for path in set(self.files) & set(other.files) if self.files[path] != other.files[path]}
+        return added, removed, modified
+
+    def changed_paths(self, other: 'TreeSnapshot') -> Set[str]:
+        """Full paths of every file added, removed or modified going from this snapshot to other."""
+        return {os.path.join(self.root, path) for paths in self.diff(other) for path in paths}
+
+    @classmethod
+    def load(cls, path: str, root: str) -> 'TreeSnapshot':
+        """Loads a saved snapshot of root; a snapshot of another root counts as missing."""
+        data = load_json(path, SNAPSHOT_VERSION)
+        if data is None or data.get("root") != root:
+            return cls(root)
+        return cls(root, {relative: tuple(stat) for relative, stat in data.get("files", {}).items()},
+                   {relative: tuple(entry) for relative, entry in data.get("dirs", {}).items()},
+                   data.get("scanned_ns", 0))
+
+    def save(self, path: str):
+        save_json(path, {"version": SNAPSHOT_VERSION, "root": self.root, "scanned_ns": self.scanned_ns,
+                         "files": self.files, "dirs": self.dirs}, separators=(",", ":"))
@@ -1,6 +1,30 @@
-from typing import List, Dict
+from typing import Callable, Dict, Iterator, List
+
+# Attributes whose values are URLs and therefore go through the URL resolver
+URL_ATTRIBUTES = frozenset(("href", "src"))
+
+
+def resolve_srcset(srcset: str, url_resolver: Callable[[str], str]) -> str:
+    """Maps the URL of every "url descriptor" candidate of a srcset attribute."""
+    candidates = []
+    for candidate in srcset.split(","):
+        url, _, descriptor = candidate.strip().partition(" ")
+        candidates.append(f"{url_resolver(url)} {descriptor}" if descriptor else url_resolver(url))
+    return ", ".join(candidates)
+
+
+def _resolve_prop(key: str, value: str, url_resolver: Callable[[str], str]) -> str:
+    if key in URL_ATTRIBUTES:
+        return url_resolver(value)
+    if key == "srcset":
+        return resolve_srcset(value, url_resolver)
+    return value
+
 
 class HTMLNode:
+    # Pages allocate one node per inline fragment, so nodes carry no per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self,
                  tag: str = None,
                  value: str = None,
@@ -11,13 +35,43 @@ class HTMLNode:
         self.children = children
         self.props = props
 
-    def to_html(self) -> str:
+    def to_html(self, url_resolver: Callable[[str], str] = None) -> str:
         raise NotImplementedError("to_html() not implemented")
+
+    def iter_html(self, url_resolver: Callable[[str], str] = None) -> Iterator[str]:
+        """Yields the HTML of this node as a sequence of fragments.
+
+        The tree is walked with an explicit stack instead of recursion, so nesting depth is unlimited and
+        no subtree is ever joined into an intermediate string. Children may be any iterable.
+        url_resolver, if given, maps the value of every href and src attribute, and each srcset URL, as it is
+        serialized.
+        """
+        stack = [(None, iter((self,)))]
+        while stack:
+            closing_tag, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if closing_tag is not None:
+                    yield closing_tag
+            elif isinstance(child, ParentNode):
+                child.validate()
+                yield f"<{child.tag}{child.props_to_html(url_resolver)}>"
+                stack.append((f"</{child.tag}>", iter(child.children)))
+            else:
+                yield child.to_html(url_resolver)
+
+    def render_to(self, write: Callable[[str], object], url_resolver: Callable[[str], str] = None):
+        """Streams the HTML of this node into write, e.g. the write method of a file or io.StringIO."""
+        for fragment in self.iter_html(url_resolver):
+            write(fragment)
     
-    def props_to_html(self) -> str:
+    def props_to_html(self, url_resolver: Callable[[str], str] = None) -> str:
         if self.props is None:
             return ""
-        return "".join([f' {key}="{value}"' for key, value in self.props.items()])
+        if url_resolver is None:
+            return "".join([f' {key}="{value}"' for key, value in self.props.items()])
+        return "".join([f' {key}="{_resolve_prop(key, value, url_resolver)}"' for key, value in self.props.items()])
     
     def __repr__(self) -> str:
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
@@ -25,33 +79,43 @@ class HTMLNode:
 
 class LeafNode(HTMLNode):
     """A leaf node in the HTML tree. It has no children and is used to represent a single HTML element with a tag and value."""
+    __slots__ = ()
+
     def __init__(self,
                  tag: str,
                  value: str,
                  props: Dict[str, str] = None):
-        super().__init__(tag, value, None, props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
     
-    def to_html(self) -> str:
+    def to_html(self, url_resolver: Callable[[str], str] = None) -> str:
         if self.value is None:
             raise ValueError("LeafNode value cannot be None")
         if self.tag is None:
             return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(url_resolver)}>{self.value}</{self.tag}>"
     
 
 class ParentNode(HTMLNode):
     """A parent node in the HTML tree. It can have children and is used to represent a container for other HTML elements."""
+    __slots__ = ()
+
     def __init__(self,
                  tag: str,
                  children: List[HTMLNode],
                  props: Dict[str, str] = None):
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
-    def to_html(self) -> str:
+    def validate(self):
         if self.tag is None:
             raise ValueError("ParentNode tag cannot be None")
         if self.children is None:
             raise ValueError("ParentNode children cannot be None")
-        
-        children_html = "".join([child.to_html() for child in self.children])
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
\ No newline at end of file
+
+    def to_html(self, url_resolver: Callable[[str], str] = None) -> str:
+        return "".join(self.iter_html(url_resolver))
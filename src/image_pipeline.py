@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import png_codec
+from fswalk import iter_tree, stat_key
+from manifest import RACY_WINDOW_NS, file_digest
+from state import load_json, save_json
+
+# Bump when the codec or naming changes what a cached entry holds
+IMAGE_VERSION = 1
+DEFAULT_WIDTHS = (480, 960, 1440)
+IMAGE_EXTENSIONS = frozenset((".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg"))
+FINGERPRINT_LENGTH = 12
+
+# <stem>.<fingerprint>[-<width>w]<ext>, as published into the output directory
+_OUTPUT_NAME = re.compile(rf"(?P<stem>.+)\.(?P<fingerprint>[0-9a-f]{{{FINGERPRINT_LENGTH}}})(?:-\d+w)?"
+                          rf"(?P<ext>\.[^.]+)$")
+
+
+def _write_atomic(path: str, data: bytes):
+    """Writes data to path through a temp file, like save_json, so concurrent workers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ImagePipeline:
+    """Publishes the static images pages reference under content-hashed names, with smaller PNG copies.
+
+    An image URL such as /images/photo.png (or /static/images/photo.png) is looked up in static_dir. The image is
+    published into output_dir as images/photo.<fingerprint>.png, plus a photo.<fingerprint>-480w.png copy for
+    every width in widths that is smaller than a PNG original; props() returns the src, srcset, width and height
+    attributes of the img tag. The fingerprint is derived from the source digest and the options, so the names
+    change whenever the bytes behind them do and can be cached forever.
+
+    Resized copies are produced by the pure Python codec in png_codec, which is slow, so they are kept in
+    cache_dir, keyed on the source digest: an image is processed once, no matter how many builds and pages use
+    it. Other formats, and PNGs the codec does not support, are published under a fingerprinted name only.
+    Source digests are remembered by (size, mtime, inode) in cache_dir/sources.json, so unchanged images are not
+    even hashed again.
+    """
+    def __init__(self, cache_dir: str, static_dir: str = "static", output_dir: str = "docs/assets",
+                 url_prefix: str = "/assets/", widths=DEFAULT_WIDTHS, sources: Dict[str, list] = None):
+        self.cache_dir = cache_dir
+        self.directory = os.path.join(cache_dir, f"v{IMAGE_VERSION}")
+        self.static_dir = os.path.normpath(static_dir)
+        self.output_dir = output_dir
+        self.url_prefix = url_prefix
+        self.widths = tuple(sorted(widths))
+        self.namespace = f"{IMAGE_VERSION}:{','.join(map(str, self.widths))}"
+        self.sources = sources if sources is not None else {}
+        self.processed = 0
+
+    @classmethod
+    def load(cls, cache_dir: str, **options) -> 'ImagePipeline':
+        """Loads the remembered source digests, if any."""
+        data = load_json(os.path.join(cache_dir, "sources.json"), IMAGE_VERSION)
+        if data is None:
+            return cls(cache_dir, **options)
+        return cls(cache_dir, sources=data.get("sources", {}), **options)
+
+    def __getstate__(self):
+        # Worker processes count their own processed images
+        state = self.__dict__.copy()
+        state.update(processed=0)
+        return state
+
+    def source_for(self, url: str) -> Optional[str]:
+        """The static image a root-relative URL refers to, or None, e.g. for external or missing images."""
+        if not url.startswith("/") or url.startswith("//"):
+            return None
+        relative = url.split("#", 1)[0].split("?", 1)[0].lstrip("/")
+        if os.path.splitext(relative)[1].lower() not in IMAGE_EXTENSIONS:
+            return None
+        for candidate in (relative[len("static/"):] if relative.startswith("static/") else None, relative):
+            if candidate is not None:
+                path = os.path.normpath(os.path.join(self.static_dir, candidate))
+                if path.startswith(self.static_dir + os.sep) and os.path.isfile(path):
+                    return path
+        return None
+
+    def digest(self, source_path: str) -> str:
+        """The sha256 of source_path, reused while its (size, mtime, inode) stays the same."""
+        stat = list(stat_key(os.stat(source_path)))
+        remembered = self.sources.get(source_path)
+        if remembered is not None and remembered[:3] == stat:
+            return remembered[3]
+        digest = file_digest(source_path)
+        # Sources edited just now are hashed again next time, as a second edit may keep the same mtime
+        if stat[1] < time.time_ns() - RACY_WINDOW_NS:
+            self.sources[source_path] = stat + [digest]
+        else:
+            self.sources.pop(source_path, None)
+        return digest
+
+    def key(self, digest: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{digest}".encode()).hexdigest()
+
+    def scan(self) -> List[str]:
+        """Hashes every image under static_dir and returns those that were added, edited or deleted since the
+        remembered digests, so pages using them can be rebuilt under the new names."""
+        previous = {path: entry[3] for path, entry in self.sources.items()}
+        current = {}
+        if os.path.isdir(self.static_dir):
+            for entry in iter_tree(self.static_dir):
+                if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                    path = os.path.normpath(entry.path)
+                    current[path] = self.digest(path)
+        for path in set(self.sources) - set(current):
+            del self.sources[path]
+        return sorted(path for path in set(previous) | set(current) if previous.get(path) != current.get(path))
+
+    def _entry_path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{suffix}")
+
+    def _entry(self, source_path: str, key: str) -> dict:
+        """The cached {"width", "height", "widths"} of an image, processing it first if needed."""
+        try:
+            with open(self._entry_path(key, ".json"), 'r') as f:
+                entry = json.load(f)
+            if all(os.path.isfile(self._entry_path(key, f"-{width}.png")) for width in entry["widths"]):
+                return entry
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        entry = {"width": None, "height": None, "widths": []}
+        if source_path.lower().endswith(".png"):
+            with open(source_path, 'rb') as f:
+                data = f.read()
+            try:
+                image = png_codec.decode(data)
+            except png_codec.PNGError as e:
+                print(f"Not resizing {source_path}: {e}")
+                try:
+                    entry["width"], entry["height"] = png_codec.read_size(data)
+                except png_codec.PNGError:
+                    pass
+            else:
+                entry["width"], entry["height"] = image.width, image.height
+                for width in self.widths:
+                    if width >= image.width:
+                        break
+                    print(f"Resizing image: {source_path} to {width}px")
+                    _write_atomic(self._entry_path(key, f"-{width}.png"),
+                                  png_codec.encode(png_codec.resize(image, width)))
+                    entry["widths"].append(width)
+        save_json(self._entry_path(key, ".json"), entry)
+        self.processed += 1
+        return entry
+
+    def _publish(self, path: str, data_path: str):
+        # Names are content-addressed, so an existing file already holds the right bytes
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            shutil.copyfile(data_path, tmp_path)
+            os.replace(tmp_path, path)
+
+    def props(self, url: str) -> Optional[Dict[str, str]]:
+        """The img attributes replacing src for the image at url, or None if it is not a static image."""
+        source_path = self.source_for(url)
+        if source_path is None:
+            return None
+        key = self.key(self.digest(source_path))
+        entry = self._entry(source_path, key)
+        relative = os.path.relpath(source_path, self.static_dir)
+        stem, ext = os.path.splitext(relative)
+        fingerprint = key[:FINGERPRINT_LENGTH]
+
+        def publish(suffix, data_path):
+            name = f"{stem}.{fingerprint}{suffix}"
+            self._publish(os.path.join(self.output_dir, name), data_path)
+            return self.url_prefix + name.replace(os.sep, "/")
+
+        src = publish(ext, source_path)
+        props = {"src": src}
+        if entry["widths"]:
+            candidates = [f"{publish(f'-{width}w{ext}', self._entry_path(key, f'-{width}.png'))} {width}w"
+                          for width in entry["widths"]]
+            props["srcset"] = ", ".join(candidates + [f"{src} {entry['width']}w"])
+        if entry["width"] is not None:
+            props["width"], props["height"] = str(entry["width"]), str(entry["height"])
+        return props
+
+    def prune(self) -> List[str]:
+        """Deletes published images whose source is gone or has changed since, pruning empty directories."""
+        removed = []
+        if not os.path.isdir(self.output_dir):
+            return removed
+        for entry in iter_tree(self.output_dir):
+            match = _OUTPUT_NAME.match(entry.name)
+            relative = os.path.relpath(os.path.dirname(entry.path), self.output_dir)
+            if match is not None:
+                source_path = os.path.normpath(os.path.join(self.static_dir, relative,
+                                                            match.group("stem") + match.group("ext")))
+                if (os.path.isfile(source_path) and
+                        self.key(self.digest(source_path)).startswith(match.group("fingerprint"))):
+                    continue
+            print(f"Removing stale image: {entry.path}")
+            os.remove(entry.path)
+            removed.append(entry.path)
+        for dirpath, _, _ in sorted(os.walk(self.output_dir), reverse=True):
+            if dirpath != self.output_dir and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+        return removed
+
+    def save(self):
+        save_json(os.path.join(self.cache_dir, "sources.json"), {"version": IMAGE_VERSION, "sources": self.sources},
+                  separators=(",", ":"))
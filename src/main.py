@@ -1,20 +1,55 @@
+import argparse
+import cProfile
+import collections
+import contextlib
+import filecmp
+import functools
+import io
+import itertools
 import os
 import shutil
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from markdown_parser import markdown_to_html_node, extract_title
+from depgraph import DependencyGraph
+from fragment_cache import DEFAULT_MAX_BYTES, FragmentCache
+from front_matter import read_front_matter, split_front_matter, template_value
+from fswalk import TreeSnapshot, iter_tree, stat_key
+from htmlnode import LeafNode, ParentNode
+from image_pipeline import ImagePipeline
+from mapped_source import open_block_reader
+from markdown_parser import BlockReader, block_to_html_node, extract_markdown_images, extract_markdown_links
+from manifest import BuildManifest
+from node_transformer import image_props, text_node_observer
+from profiler import BuildProfiler
+from search_index import DEFAULT_MAX_PART_BYTES, SearchIndex, TermCollector
+from site_metadata import MetadataStore
+from static_sync import sync_static_files
+from template import load_template
+from url_resolver import BasePathResolver
+
+CACHE_DIR = ".ssg-cache"
+MANIFEST_PATH = os.path.join(CACHE_DIR, "manifest.json")
+FRAGMENT_CACHE_DIR = os.path.join(CACHE_DIR, "fragments")
+DEPGRAPH_PATH = os.path.join(CACHE_DIR, "depgraph.json")
+SEARCH_STATE_PATH = os.path.join(CACHE_DIR, "search.json")
+CONTENT_SNAPSHOT_PATH = os.path.join(CACHE_DIR, "content-snapshot.json")
+METADATA_PATH = os.path.join(CACHE_DIR, "metadata.json")
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
 
 def copy_static_files(source_dir, dest_dir):
     if os.path.exists(dest_dir):
         shutil.rmtree(dest_dir)
     os.makedirs(dest_dir)
 
-    files = os.listdir(source_dir)
-    for item in os.listdir(source_dir):
-        source_item_path = os.path.join(source_dir, item)
-        dest_item_path = os.path.join(dest_dir, item)
-        
-        if os.path.isfile(source_item_path):
+    with os.scandir(source_dir) as iterator:
+        entries = list(iterator)
+    for entry in entries:
+        source_item_path = entry.path
+        dest_item_path = os.path.join(dest_dir, entry.name)
+
+        if entry.is_file():
             print(f"Copying file: {source_item_path} to {dest_item_path}")
             shutil.copy(source_item_path, dest_item_path)
         else:
@@ -22,59 +57,617 @@ def copy_static_files(source_dir, dest_dir):
             os.mkdir(dest_item_path)
             copy_static_files(source_item_path, dest_item_path)
 
-def generate_page(from_path, template_path, dest_path, base_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    with open(from_path, 'r') as f:
-        content = f.read()
-    with open(template_path, 'r') as f:
-        template = f.read()
-    
-    html_node = markdown_to_html_node(content)
-    html = html_node.to_html()
-
-    title = extract_title(content)
-
-    html = template.replace("{{ Title }}", title).replace("{{ Content }}", html)
-    html = html.replace('href="/', f'href="{base_path}')
-    html = html.replace('src="/', f'src="{base_path}')
-
-    dirs = dest_path.split("/")
-    for i in range(len(dirs)-1):
-        path = "/".join(dirs[:i+1])
-        if not os.path.exists(path):
-            os.makedirs(path)
-
-    with open(dest_path, 'w') as f:
+class PageResult:
+    """What building a page produced besides the output file."""
+    def __init__(self, title=None, collect_terms=False):
+        self.title = title
+        self.urls = []
+        self.changed = None
+        self.terms = TermCollector() if collect_terms else None
+
+    def __repr__(self) -> str:
+        return f"PageResult(title={self.title!r}, urls={len(self.urls)}, changed={self.changed})"
+
+
+def page_context(front_matter, title, content):
+    """Template slots of a page: every front matter key, plus Title and Content."""
+    context = {key: template_value(value) for key, value in front_matter.items()}
+    context.update(Title=title, Content=content)
+    return context
+
+
+def page_template(front_matter, template_path):
+    """The template a page is rendered with: its front matter template, relative to the default template's
+    directory, or the default template."""
+    name = front_matter.get("template")
+    if name is None:
+        return template_path
+    return os.path.join(os.path.dirname(template_path), str(name))
+
+
+def is_draft(front_matter):
+    return front_matter.get("draft") is True
+
+
+def _block_nodes(blocks, profiler, page, fragment_cache=None, url_resolver=None, result=None):
+    """Turns blocks into HTML nodes lazily, timing the block reading and node building of each pull.
+
+    Blocks found in the fragment cache become a single raw-HTML leaf without any parsing. Cached HTML has
+    its URLs resolved already, so the cache namespace must identify the resolver. If a PageResult is given,
+    the link and image URLs of every block are added to it, cached or not, and so are the search terms of
+    cached blocks, which produce no text nodes. Blocks with images bypass the cache while an image_props hook
+    is set, as the img props it returns depend on the image files rather than the block text.
+    """
+    blocks = iter(blocks)
+    while True:
+        with profiler.phase("markdown_to_blocks", page):
+            block = next(blocks, None)
+        if block is None:
+            return
+        with profiler.phase("block_to_html_node", page):
+            images = extract_markdown_images(block)
+            if result is not None:
+                result.urls.extend(url for _, url in extract_markdown_links(block))
+                result.urls.extend(url for _, url in images)
+            if (fragment_cache is None or not fragment_cache.accepts(block) or
+                    (images and image_props.get() is not None)):
+                node = block_to_html_node(block)
+            else:
+                html = fragment_cache.get(block)
+                if html is None:
+                    html = block_to_html_node(block).to_html(url_resolver)
+                    fragment_cache.put(block, html)
+                elif result is not None and result.terms is not None:
+                    result.terms.add_html(html)
+                node = LeafNode(None, html)
+        yield node
+
+
+def read_source(path):
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def replace_if_changed(tmp_path, dest_path):
+    """Moves tmp_path over dest_path unless dest_path already holds the same bytes. Returns whether it changed.
+
+    Leaving identical outputs untouched keeps their mtimes, so rsync, CDN uploads and git see no change.
+    """
+    try:
+        unchanged = (os.path.getsize(tmp_path) == os.path.getsize(dest_path) and
+                     filecmp.cmp(tmp_path, dest_path, shallow=False))
+    except OSError:
+        unchanged = False
+    if unchanged:
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, dest_path)
+    return True
+
+
+class AtomicOutput:
+    """Context manager yielding a temp file that replaces path on success, unless path already holds the same bytes.
+
+    changed tells, after the block, whether path was replaced.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.changed = None
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.tmp_path, 'w')
+        return self.file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        if exc_type is not None:
+            os.remove(self.tmp_path)
+            return False
+        self.changed = replace_if_changed(self.tmp_path, self.path)
+        return False
+
+
+def write_output(path, html):
+    """Atomically writes html to path if it differs from the current content. Returns whether it changed."""
+    output = AtomicOutput(path)
+    with output as f:
         f.write(html)
+    return output.changed
+
+
+def generate_page(from_path, template_path, dest_path, base_path, profiler=None, fragment_cache=None, source=None,
+                  output=None, collect_terms=False, images=None):
+    """Writes the page for from_path and returns a PageResult with its title, the link and image URLs it
+    references, whether the output changed and, with collect_terms, the counts of its search terms.
+
+    source, if given, is the already read markdown of from_path. output, if given, is called with dest_path and
+    the rendered page instead of the page being streamed into dest_path; its return value is passed on as the
+    changed flag. images, an ImagePipeline, publishes the static images the page shows and rewrites their img tags.
+    """
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    if profiler is None:
+        profiler = BuildProfiler(enabled=False)
+
+    # The source is consumed block by block while the page is written, so memory stays bounded by the
+    # largest block rather than the file. "read" covers opening the file and reading ahead to the title;
+    # the rest of the file is read lazily and counted as part of "markdown_to_blocks".
+    with contextlib.ExitStack() as stack:
+        with profiler.phase("read", from_path):
+            if source is None:
+                reader = stack.enter_context(open_block_reader(from_path))
+            else:
+                front_matter, lines = split_front_matter(io.StringIO(source))
+                reader = BlockReader(lines, front_matter)
+            # The title is needed for the template head, so blocks are buffered until it has been seen, unless
+            # the front matter names it
+            title = reader.front_matter.get("title")
+            leading_blocks = reader.read_until_title() if title is None else []
+        if title is None:
+            title = reader.title
+        if title is None:
+            raise Exception("No h1 header found in the markdown")
+        url_resolver = BasePathResolver(base_path)
+        result = PageResult(template_value(title), collect_terms)
+        if result.terms is not None:
+            # Every text node rendered from here on is counted; the observer is removed when the stack closes
+            stack.callback(text_node_observer.reset, text_node_observer.set(result.terms))
+        if images is not None:
+            stack.callback(image_props.reset, image_props.set(images.props))
+        blocks = itertools.chain(leading_blocks, reader)
+        html_node = ParentNode("div", _block_nodes(blocks, profiler, from_path, fragment_cache, url_resolver, result))
+
+        def write_content(write):
+            with profiler.phase("to_html", from_path):
+                html_node.render_to(write, url_resolver)
+
+        if output is not None:
+            buffer = io.StringIO()
+            with profiler.phase("template fill", from_path):
+                template = load_template(template_path, base_path)
+                template.render_to(buffer.write, page_context(reader.front_matter, result.title, write_content))
+            with profiler.phase("write", from_path):
+                result.changed = output(dest_path, buffer.getvalue())
+            return result
+
+        # Writes are buffered, so "write" covers opening and flushing the file; "template fill" covers the
+        # template itself and "to_html" the rendering of the page content into the buffer. The page is streamed
+        # into a temp file that only replaces the output if its bytes differ.
+        with profiler.phase("write", from_path):
+            output_file = AtomicOutput(dest_path)
+            with output_file as f:
+                with profiler.phase("template fill", from_path):
+                    template = load_template(template_path, base_path)
+                    template.render_to(f.write, page_context(reader.front_matter, result.title, write_content))
+        result.changed = output_file.changed
+    return result
+
+
+class PageBuildError(Exception):
+    """Raised when a page fails to build, carrying the source path that caused it."""
+    def __init__(self, source_path, cause):
+        super().__init__(f"Failed to generate page from {source_path}: {cause}")
+        self.source_path = source_path
+        self.cause = cause
+
+    def __reduce__(self):
+        # Lets the error cross the process pool boundary intact
+        return (PageBuildError, (self.source_path, self.cause))
+
+
+def build_page(job, profiler=None, fragment_cache=None, source=None, output=None, collect_terms=False, images=None):
+    """Generates one (from_path, template_path, dest_path, base_path) job and returns its PageResult."""
+    from_path, template_path, dest_path, base_path = job
+    try:
+        return generate_page(from_path, template_path, dest_path, base_path, profiler, fragment_cache, source, output,
+                             collect_terms, images)
+    except Exception as e:
+        raise PageBuildError(from_path, e) from e
+
+
+def _build_page_in_worker(job, profile, fragment_cache, collect_terms, images):
+    """Process pool entry point. Also returns the worker's measurements so the parent can merge them."""
+    profiler = BuildProfiler(enabled=profile)
+    result = build_page(job, profiler, fragment_cache, collect_terms=collect_terms, images=images)
+    return result, profiler if profile else None
+
+
+def _read_job_source(job):
+    try:
+        return read_source(job[0])
+    except Exception as e:
+        raise PageBuildError(job[0], e) from e
+
 
-def generate_pages_recursively(from_path, template_path, dest_path, base_path):
+def _write_job_output(job, dest_path, html):
+    try:
+        return write_output(dest_path, html)
+    except Exception as e:
+        raise PageBuildError(job[0], e) from e
+
+
+def build_pages_pipelined(jobs, on_built, io_threads=4, max_in_flight=None, profiler=None, fragment_cache=None,
+                          collect_terms=False, images=None):
+    """Builds jobs in order on the calling thread while a thread pool prefetches sources and writes pages.
+
+    At most max_in_flight sources are read ahead and at most max_in_flight rendered pages wait to be written;
+    when either limit is reached the parser blocks, so memory stays bounded. on_built(index, result) is called,
+    in job order, once a page has been written. If several pages fail, the first one in job order is reported.
+    """
+    if max_in_flight is None:
+        max_in_flight = io_threads * 2
+    if profiler is None:
+        profiler = BuildProfiler(enabled=False)
+    jobs = list(jobs)
+    with ThreadPoolExecutor(max_workers=io_threads) as pool:
+        reads = collections.deque()
+        writes = collections.deque()
+        next_read = 0
+
+        def finish_write():
+            index, result, future = writes.popleft()
+            result.changed = future.result()
+            on_built(index, result)
+
+        try:
+            for index, job in enumerate(jobs):
+                while next_read < len(jobs) and len(reads) < max_in_flight:
+                    reads.append(pool.submit(_read_job_source, jobs[next_read]))
+                    next_read += 1
+                # Time spent waiting here and on full write queues is I/O the pipeline failed to hide
+                with profiler.phase("read", job[0]):
+                    source = reads.popleft().result()
+                written = []
+
+                def output(dest_path, html, job=job, written=written):
+                    while len(writes) >= max_in_flight:
+                        finish_write()
+                    written.append(pool.submit(_write_job_output, job, dest_path, html))
+
+                # The write is still pending, so whether the output changed is only known from its future
+                result = build_page(job, profiler, fragment_cache, source, output, collect_terms, images)
+                writes.append((index, result, written[0]))
+            while writes:
+                finish_write()
+        except PageBuildError:
+            # Writes of earlier pages may still fail; those come first in job order
+            for future in reads:
+                future.cancel()
+            while writes:
+                finish_write()
+            raise
+
+
+def page_url(dest_file_path, dest_root):
+    """The root-relative URL a generated page is served at; index.html pages are served as their directory."""
+    relative = os.path.relpath(dest_file_path, dest_root).replace(os.sep, "/")
+    if relative == "index.html":
+        return "/"
+    if relative.endswith("/index.html"):
+        return "/" + relative[:-len("index.html")]
+    return "/" + relative
+
+
+class PageStats:
+    """Counters describing what a page build did."""
+    def __init__(self):
+        self.changed = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.drafts = 0
+
+    def __repr__(self) -> str:
+        return (f"PageStats(changed={self.changed}, unchanged={self.unchanged}, skipped={self.skipped}, "
+                f"drafts={self.drafts})")
+
+
+def collect_pages(from_path, dest_path, snapshot=None):
+    """Mirrors the content tree into (source, destination) pairs, sorted so every build visits pages in the same order.
+
+    The tree is walked with os.scandir, or taken from a TreeSnapshot of from_path when one is given.
+    """
     if os.path.isfile(from_path) and from_path.endswith('.md'):
-        dest_file_path = dest_path.replace('.md', '.html')
-        generate_page(from_path, template_path, dest_file_path, base_path)
-    elif os.path.isdir(from_path):
-        if not os.path.exists(dest_path):
-            os.makedirs(dest_path)
-        
-        for item in os.listdir(from_path):
-            source_item_path = os.path.join(from_path, item)
-            dest_item_path = os.path.join(dest_path, item)
-            generate_pages_recursively(source_item_path, template_path, dest_item_path, base_path)
+        return [(from_path, dest_path.replace('.md', '.html'))]
+    if snapshot is not None:
+        sources = snapshot.paths('.md')
+    else:
+        sources = [entry.path for entry in iter_tree(from_path) if entry.name.endswith('.md')]
+    return [(source_path, os.path.join(dest_path, os.path.relpath(source_path, from_path)).replace('.md', '.html'))
+            for source_path in sources]
 
 
+def generate_pages_recursively(from_path, template_path, dest_path, base_path, manifest=None, jobs=1,
+                               profiler=None, fragment_cache=None, graph=None, changed_paths=(), explain=False,
+                               io_threads=0, search_index=None, snapshot=None, metadata=None, drafts=False,
+                               images=None):
+    """Generates every page under from_path, skipping pages the manifest reports as fresh.
 
-if __name__ == "__main__":
+    With a dependency graph, pages that are fresh themselves are still rebuilt when a page they link to or an
+    asset they use is among the changed paths (changed_paths adds e.g. synced static files); new, edited and
+    deleted sources count as changed. With explain, the reason for every rebuild is printed.
+
+    With jobs > 1 the pages are sharded across a process pool. Results are consumed in source order, so the
+    first failing page in that order is the one reported, no matter which worker finished first. Otherwise,
+    with io_threads > 0 reads and writes run on that many threads while this process parses.
+
+    With a search index, the terms of every rebuilt page replace its previous entry, pages missing from the
+    index are rebuilt and deleted pages are dropped; writing the index is left to the caller. A MetadataStore
+    is kept up to date the same way.
+
+    A TreeSnapshot of from_path provides the pages and their stats; sources whose (size, mtime, inode) match
+    the manifest are not hashed again.
+
+    Only the front matter of each source is read before deciding what to build, and not even that when the
+    manifest recorded it under the same stat. Pages marked draft are left out unless drafts is set, so their
+    earlier outputs count as stale; a template in the front matter replaces template_path for that page.
+
+    An ImagePipeline publishes the images of rebuilt pages; pass its scan() in changed_paths so pages showing an
+    edited image are rebuilt under the new image names.
+
+    Returns PageStats; a rebuilt page whose output bytes did not change counts as unchanged and is not rewritten.
+    """
+    stats = PageStats()
+    pages = []
+    front_matters = {}
+    templates = {}
+    changed = set(changed_paths)
+    for source_path, dest_file_path in collect_pages(from_path, dest_path, snapshot):
+        source_stat = None
+        front_matter = None
+        if manifest is not None:
+            source_stat = snapshot.stat(source_path) if snapshot is not None else stat_key(os.stat(source_path))
+            front_matter = manifest.cached_front_matter(dest_file_path, source_path, source_stat)
+        if front_matter is None:
+            try:
+                front_matter = read_front_matter(source_path)
+            except (OSError, ValueError) as e:
+                raise PageBuildError(source_path, e) from e
+        if is_draft(front_matter) and not drafts:
+            print(f"Skipping draft: {source_path}")
+            stats.drafts += 1
+            continue
+        front_matters[source_path] = front_matter
+        templates[source_path] = page_template(front_matter, template_path)
+        if manifest is None:
+            pages.append((source_path, dest_file_path, None, None, None, "no manifest"))
+            continue
+
+        source_hash = manifest.source_digest(dest_file_path, source_path, source_stat)
+        try:
+            template_hash = manifest.template_digest(templates[source_path])
+        except OSError as e:
+            raise PageBuildError(source_path, e) from e
+        reason = manifest.stale_reason(dest_file_path, source_path, source_hash, template_hash, base_path)
+        if reason in ("new page", "source changed"):
+            changed.add(source_path)
+        pages.append((source_path, dest_file_path, source_hash, template_hash, source_stat, reason))
+
+    if graph is not None:
+        deleted = set(graph.pages) - {os.path.normpath(page[0]) for page in pages}
+        dependents = graph.rebuild_set(changed | deleted)
+        for source_path in deleted:
+            graph.forget(source_path)
+        pages = [page[:5] + (page[5] or dependents.get(os.path.normpath(page[0])),) for page in pages]
+
+    if search_index is not None:
+        search_index.retain(page[0] for page in pages)
+        pages = [page[:5] + (page[5] or (None if page[0] in search_index.pages else "not in search index"),)
+                 for page in pages]
+
+    if metadata is not None:
+        metadata.retain(page[0] for page in pages)
+        pages = [page[:5] + (page[5] or (None if page[0] in metadata.pages else "not in metadata store"),)
+                 for page in pages]
+
+    stale = []
+    for source_path, dest_file_path, source_hash, template_hash, source_stat, reason in pages:
+        if reason is None:
+            print(f"Skipping unchanged page: {source_path}")
+            manifest.mark_seen(dest_file_path)
+            stats.skipped += 1
+            continue
+        if explain:
+            print(f"Rebuilding {source_path}: {reason}")
+        stale.append((source_path, dest_file_path, source_hash, template_hash, source_stat))
+
+    build_jobs = [(source_path, templates[source_path], dest_file_path, base_path)
+                  for source_path, dest_file_path, _, _, _ in stale]
+
+    url_resolver = BasePathResolver(base_path)
+    collect_terms = search_index is not None
+
+    def record(page, result):
+        source_path, dest_file_path, source_hash, template_hash, source_stat = page
+        if result.changed:
+            stats.changed += 1
+        else:
+            print(f"Output unchanged: {dest_file_path}")
+            stats.unchanged += 1
+        if graph is not None:
+            graph.record(source_path, templates[source_path], result.urls)
+        if search_index is not None:
+            search_index.update(source_path, url_resolver(page_url(dest_file_path, dest_path)), result.title,
+                                result.terms.terms)
+        if metadata is not None:
+            mtime_ns = source_stat[1] if source_stat is not None else os.stat(source_path).st_mtime_ns
+            metadata.update(source_path, url_resolver(page_url(dest_file_path, dest_path)), result.title, mtime_ns)
+        if manifest is not None:
+            manifest.record(dest_file_path, source_path, source_hash, template_hash, base_path, source_stat,
+                            front_matters[source_path])
+
+    if jobs > 1 and len(build_jobs) > 1:
+        chunksize = max(1, len(build_jobs) // (jobs * 4))
+        profile = profiler is not None and profiler.enabled
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            worker = functools.partial(_build_page_in_worker, profile=profile, fragment_cache=fragment_cache,
+                                       collect_terms=collect_terms, images=images)
+            results = pool.map(worker, build_jobs, chunksize=chunksize)
+            for page, (result, worker_profiler) in zip(stale, results):
+                if worker_profiler is not None:
+                    profiler.merge(worker_profiler)
+                record(page, result)
+    elif io_threads > 0:
+        build_pages_pipelined(build_jobs, lambda index, result: record(stale[index], result), io_threads,
+                              profiler=profiler, fragment_cache=fragment_cache, collect_terms=collect_terms,
+                              images=images)
+    else:
+        for page, job in zip(stale, build_jobs):
+            record(page, build_page(job, profiler, fragment_cache, collect_terms=collect_terms, images=images))
+    return stats
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "serve":
+        import watch
+        return watch.main(argv[1:])
+    if argv and argv[0] == "daemon":
+        import render_server
+        return render_server.main(argv[1:])
+
+    parser = argparse.ArgumentParser(description="Build the static site from content/ into docs/.")
+    parser.add_argument("basepath", nargs="?", default="/",
+                        help="URL prefix the site is served from (default: /)")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the build manifest and regenerate every page")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes used to generate pages (default: 1)")
+    parser.add_argument("--pipeline", type=int, default=0, metavar="THREADS",
+                        help="read sources ahead and write pages on THREADS I/O threads while parsing "
+                             "(single-process builds only; default: off)")
+    parser.add_argument("--clean-static", action="store_true",
+                        help="delete and recopy the static output instead of syncing it")
+    parser.add_argument("--static-hash", action="store_true",
+                        help="compare static files by content hash instead of size and mtime")
+    parser.add_argument("--static-link", action="store_true",
+                        help="hardlink static files into the output instead of copying them")
+    parser.add_argument("--fragment-cache", metavar="DIR", default=FRAGMENT_CACHE_DIR,
+                        help="directory of the rendered block cache, shareable between machines "
+                             f"(default: {FRAGMENT_CACHE_DIR})")
+    parser.add_argument("--fragment-cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar="MB",
+                        help="size cap of the fragment cache; least recently used entries are evicted (default: 256)")
+    parser.add_argument("--no-fragment-cache", action="store_true", help="parse every block, bypassing the cache")
+    parser.add_argument("--no-search-index", action="store_true",
+                        help="do not emit the client-side search index into docs/search/")
+    parser.add_argument("--search-part-size", type=int, default=DEFAULT_MAX_PART_BYTES // 1024, metavar="KB",
+                        help="size budget of each search index file; larger shards are split by term range "
+                             f"(default: {DEFAULT_MAX_PART_BYTES // 1024})")
+    parser.add_argument("--site-url", default="", metavar="URL",
+                        help="origin the site is published at, e.g. https://user.github.io, required for the "
+                             "absolute URLs of sitemap.xml and feed.xml (default: neither is written)")
+    parser.add_argument("--drafts", action="store_true",
+                        help="also build pages whose front matter sets draft: true")
+    parser.add_argument("--explain", action="store_true",
+                        help="print why each page is rebuilt (changed source, template, linked page or asset)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print wall and CPU time per build phase and the slowest pages")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N",
+                        help="number of slowest pages to report (default: 10)")
+    parser.add_argument("--profile-json", metavar="PATH",
+                        help="write the profile report as JSON to PATH (implies --profile)")
+    parser.add_argument("--cprofile", metavar="PATH",
+                        help="write a cProfile dump of the build to PATH")
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.pipeline < 0:
+        parser.error("--pipeline must not be negative")
+    if args.pipeline and args.jobs > 1:
+        parser.error("--pipeline cannot be combined with --jobs")
+
+    profiler = BuildProfiler(enabled=args.profile or args.profile_json is not None)
+    cprofiler = cProfile.Profile() if args.cprofile else None
+    if cprofiler is not None:
+        cprofiler.enable()
+    try:
+        return build(args, profiler)
+    finally:
+        if cprofiler is not None:
+            cprofiler.disable()
+            cprofiler.dump_stats(args.cprofile)
+        if profiler.enabled:
+            print(profiler.report(args.profile_top))
+            if args.profile_json:
+                profiler.write_json(args.profile_json, args.profile_top)
+
+
+def build(args, profiler):
+    """Runs one build with the parsed command line arguments and returns the exit status."""
     source_dir = "static"
     dest_dir = "docs/static"
 
-    basepath = "/"
+    changed_assets = []
+    with profiler.phase("static copy"):
+        if args.clean_static:
+            copy_static_files(source_dir, dest_dir)
+        else:
+            stats = sync_static_files(source_dir, dest_dir, use_hash=args.static_hash, link=args.static_link)
+            print(f"Static files: {stats.copied} copied, {stats.unchanged} unchanged, {stats.removed} removed")
+            changed_assets = stats.changed
+
+    fragment_cache = None
+    if not args.no_fragment_cache:
+        fragment_cache = FragmentCache(args.fragment_cache, args.fragment_cache_size * 1024 * 1024,
+                                       namespace=repr(BasePathResolver(args.basepath)))
 
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    
-    copy_static_files(source_dir, dest_dir)
+    content_dir = "content/"
+    manifest = BuildManifest.load(MANIFEST_PATH, force=args.full)
+    graph = DependencyGraph.load(DEPGRAPH_PATH, content_dir, source_dir)
+    snapshot = TreeSnapshot.scan(content_dir, TreeSnapshot.load(CONTENT_SNAPSHOT_PATH, content_dir))
+    search_index = None
+    if not args.no_search_index:
+        search_index = SearchIndex.load(SEARCH_STATE_PATH, os.path.join("docs", "search"),
+                                        max_part_bytes=args.search_part_size * 1024, base_path=args.basepath)
+    metadata = MetadataStore.load(METADATA_PATH, "docs", site_url=args.site_url, base_path=args.basepath)
+    images = ImagePipeline.load(IMAGE_CACHE_DIR, static_dir=source_dir, output_dir=os.path.join("docs", "assets"))
+    try:
+        stats = generate_pages_recursively(
+            from_path=content_dir,
+            template_path="template.html",
+            dest_path="docs",
+            base_path=args.basepath,
+            manifest=manifest,
+            jobs=args.jobs,
+            profiler=profiler,
+            fragment_cache=fragment_cache,
+            graph=graph,
+            changed_paths=changed_assets + images.scan(),
+            explain=args.explain,
+            io_threads=args.pipeline,
+            search_index=search_index,
+            snapshot=snapshot,
+            metadata=metadata,
+            drafts=args.drafts,
+            images=images)
+    except PageBuildError as e:
+        manifest.save()
+        graph.save()
+        metadata.save()
+        if search_index is not None:
+            search_index.save()
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Pages: {stats.changed} changed, {stats.unchanged} unchanged, {stats.skipped} skipped, "
+          f"{stats.drafts} drafts")
+    manifest.remove_stale_outputs("docs")
+    manifest.save()
+    graph.save()
+    snapshot.save(CONTENT_SNAPSHOT_PATH)
+    # Only after a successful build: pages that failed to pick up an edited image must see it as changed again
+    images.prune()
+    images.save()
+    if search_index is not None:
+        print(f"Search index: {search_index.write(write_output)} shard(s) rewritten")
+        search_index.save()
+    if metadata.write(write_output):
+        print(f"Site metadata: {', '.join(metadata.outputs())} regenerated")
+    metadata.save()
+    return 0
 
-    generate_pages_recursively(
-        from_path="content/",
-        template_path="template.html",
-        dest_path="docs",
-        base_path=basepath)
\ No newline at end of file
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from state import load_json, save_json
+
+MANIFEST_VERSION = 2
+# A source modified this close to being recorded may change again without its mtime moving
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def file_digest(path: str, chunk_size: int = 1 << 16) -> str:
+    """Returns the sha256 hex digest of a file, read in chunks so large sources are never loaded whole."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """On-disk record of the source, template and base path that produced each generated page.
+
+    A page whose inputs all hash the same as in the previous build is fresh and can be skipped.
+    Outputs that were not seen during the current build belong to deleted sources and get removed.
+    """
+    def __init__(self, path: str, entries: Dict[str, Dict[str, str]] = None, force: bool = False):
+        self.path = path
+        self.entries = entries if entries is not None else {}
+        self.force = force
+        self.seen = set()
+        self._template_digests = {}
+
+    @classmethod
+    def load(cls, path: str, force: bool = False) -> 'BuildManifest':
+        """Loads the manifest at path; without a usable one every page is built.
+
+        With force=True every page is considered stale, but the previous entries are kept so outputs of
+        deleted sources are still cleaned up.
+        """
+        data = load_json(path, MANIFEST_VERSION)
+        if data is None:
+            return cls(path, force=force)
+        return cls(path, data.get("entries", {}), force=force)
+
+    def template_digest(self, template_path: str) -> str:
+        """Digest of the template, computed once per build since every page shares it.
+
+        The cached digest is keyed on the file's mtime and size, so long-running processes notice edits.
+        """
+        stat = os.stat(template_path)
+        key = (template_path, stat.st_mtime_ns, stat.st_size)
+        if key not in self._template_digests:
+            self._template_digests[key] = file_digest(template_path)
+        return self._template_digests[key]
+
+    def _unchanged_entry(self, dest_path: str, source_path: str, source_stat: Tuple[int, int, int] = None):
+        """The entry of dest_path if it was recorded from source_path with the same (size, mtime_ns, inode)."""
+        entry = self.entries.get(dest_path)
+        if (source_stat is not None and entry is not None and entry.get("source") == source_path and
+                entry.get("source_stat") == list(source_stat)):
+            return entry
+        return None
+
+    def source_digest(self, dest_path: str, source_path: str, source_stat: Tuple[int, int, int] = None) -> str:
+        """Digest of the source, reused from the manifest when its (size, mtime_ns, inode) is unchanged."""
+        entry = self._unchanged_entry(dest_path, source_path, source_stat)
+        if entry is not None:
+            return entry["source_hash"]
+        return file_digest(source_path)
+
+    def cached_front_matter(self, dest_path: str, source_path: str,
+                            source_stat: Tuple[int, int, int] = None) -> Optional[dict]:
+        """The recorded front matter of the source if its stat is unchanged, else None (read it again)."""
+        entry = self._unchanged_entry(dest_path, source_path, source_stat)
+        if entry is not None:
+            return entry.get("front_matter")
+        return None
+
+    def is_fresh(self, dest_path: str, source_path: str, source_hash: str, template_hash: str, base_path: str) -> bool:
+        return self.stale_reason(dest_path, source_path, source_hash, template_hash, base_path) is None
+
+    def stale_reason(self, dest_path: str, source_path: str, source_hash: str, template_hash: str,
+                     base_path: str) -> Optional[str]:
+        """Returns why the page must be rebuilt, or None if it is fresh."""
+        if self.force:
+            return "full build requested"
+        entry = self.entries.get(dest_path)
+        if entry is None:
+            return "new page"
+        if not os.path.isfile(dest_path):
+            return "output missing"
+        if entry.get("source") != source_path or entry.get("source_hash") != source_hash:
+            return "source changed"
+        if entry.get("template_hash") != template_hash:
+            return "template changed"
+        if entry.get("base_path") != base_path:
+            return "base path changed"
+        return None
+
+    def mark_seen(self, dest_path: str):
+        self.seen.add(dest_path)
+
+    def record(self, dest_path: str, source_path: str, source_hash: str, template_hash: str, base_path: str,
+               source_stat: Tuple[int, int, int] = None, front_matter: dict = None):
+        self.entries[dest_path] = {
+            "source": source_path,
+            "source_hash": source_hash,
+            "template_hash": template_hash,
+            "base_path": base_path,
+        }
+        if front_matter is not None:
+            self.entries[dest_path]["front_matter"] = front_matter
+        # Sources edited just now are hashed again next time, as a second edit may keep the same mtime
+        if source_stat is not None and source_stat[1] < time.time_ns() - RACY_WINDOW_NS:
+            self.entries[dest_path]["source_stat"] = list(source_stat)
+        self.mark_seen(dest_path)
+
+    def remove_stale_outputs(self, output_root: str) -> List[str]:
+        """Deletes outputs whose source disappeared since the last build, pruning directories left empty."""
+        removed = []
+        root = os.path.abspath(output_root)
+        for dest_path in sorted(set(self.entries) - self.seen):
+            del self.entries[dest_path]
+            if os.path.isfile(dest_path):
+                print(f"Removing stale output: {dest_path}")
+                os.remove(dest_path)
+                removed.append(dest_path)
+            parent = os.path.dirname(os.path.abspath(dest_path))
+            while parent.startswith(root + os.sep) and os.path.isdir(parent) and not os.listdir(parent):
+                os.rmdir(parent)
+                parent = os.path.dirname(parent)
+        return removed
+
+    def save(self):
+        save_json(self.path, {"version": MANIFEST_VERSION, "entries": self.entries}, indent=1)
@@ -0,0 +1,111 @@
+import codecs
+import contextlib
+import io
+import locale
+import mmap
+import os
+import re
+from typing import Dict, Iterator, List
+
+from front_matter import split_front_matter, split_front_matter_buffer
+from markdown_parser import BlockReader
+
+# Sources below this size are read as text; bench.sh --mmap-crossover puts the break-even at about 8 KiB on Linux
+MMAP_THRESHOLD = 16 * 1024
+DEFAULT_WINDOW = 64 * 1024
+
+_TITLE_PATTERN = re.compile(rb"^# (.*)$", re.MULTILINE)
+
+
+def iter_buffer_blocks(buffer, window: int = DEFAULT_WINDOW, start: int = 0) -> Iterator[str]:
+    """Yields the blocks of a UTF-8 byte buffer (bytes or mmap), from offset start on, exactly as iter_blocks
+    would for its text.
+
+    The buffer is decoded in windows of about window bytes, each cut right before a run of newlines that
+    holds a block separator, and the window is split on "\\n\\n" in one go. Cutting at the start of a run
+    keeps the pairing of separators unchanged, and is safe on the bytes because a newline byte never occurs
+    inside a multi-byte UTF-8 sequence. Memory is bounded by the window plus the largest block.
+    """
+    length = len(buffer)
+    while start < length:
+        # The previous cut left the run of newlines at the start of this window; search past it
+        body = start
+        while body < length and buffer[body] == 10:
+            body += 1
+        cut = buffer.rfind(b"\n\n", body, body + window)
+        if cut == -1:
+            cut = buffer.find(b"\n\n", body)
+        if cut == -1:
+            cut = length
+        else:
+            while buffer[cut - 1] == 10:
+                cut -= 1
+        for block in buffer[start:cut].decode("utf-8").split("\n\n"):
+            if "\n" in block:
+                block = "\n".join(line.strip() for line in block.split("\n"))
+                if block:
+                    yield block.strip()
+            else:
+                block = block.strip()
+                if block:
+                    yield block
+        start = cut
+
+
+class MappedBlockReader:
+    """BlockReader counterpart that maps the source into memory instead of reading it as text.
+
+    The title is found with a single regex scan over the mapped bytes, so no block has to be buffered before
+    the page head can be written. The source must be UTF-8 without carriage returns, see open_block_reader.
+    The document body starts at offset start, after its front matter.
+    """
+    def __init__(self, buffer, start: int = 0, front_matter: Dict[str, object] = None):
+        self.buffer = buffer
+        self.front_matter = front_matter if front_matter is not None else {}
+        match = _TITLE_PATTERN.search(buffer, start)
+        self.title = match.group(1).decode("utf-8").strip() if match else None
+        self._blocks = iter_buffer_blocks(buffer, start=start)
+
+    def __iter__(self) -> Iterator[str]:
+        return self._blocks
+
+    def read_until_title(self) -> List[str]:
+        return []
+
+
+def _reads_as_utf8() -> bool:
+    """Whether open() in text mode decodes as UTF-8 here, so mapped and read sources agree."""
+    return codecs.lookup(locale.getpreferredencoding(False)).name == "utf-8"
+
+
+@contextlib.contextmanager
+def open_block_reader(path: str, threshold: int = MMAP_THRESHOLD):
+    """Opens path for block reading: mapped if it is at least threshold bytes, read as text lines otherwise.
+
+    Front matter is split off the document either way and available as the reader's front_matter. Sources
+    that text mode would treat differently from raw bytes, i.e. ones containing carriage returns (universal
+    newlines) or a non UTF-8 locale encoding, are always read as text, as is anything mmap refuses, so the
+    blocks are identical either way.
+    """
+    with open(path, 'rb') as raw:
+        size = os.fstat(raw.fileno()).st_size
+        buffer = None
+        if size >= threshold and size > 0 and _reads_as_utf8():
+            try:
+                buffer = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                buffer = None
+            if buffer is not None and buffer.find(b"\r") != -1:
+                buffer.close()
+                buffer = None
+        if buffer is not None:
+            try:
+                front_matter, start = split_front_matter_buffer(buffer)
+                yield MappedBlockReader(buffer, start, front_matter)
+            finally:
+                buffer.close()
+            return
+        # Text mode over the same file, decoded like open(path, 'r') would
+        with io.TextIOWrapper(raw) as f:
+            front_matter, lines = split_front_matter(f)
+            yield BlockReader(lines, front_matter)
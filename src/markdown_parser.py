@@ -1,4 +1,5 @@
-from typing import List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import io
 import re
 from enum import Enum
 
@@ -6,6 +7,9 @@ from textnode import TextNode, TextType
 from htmlnode import HTMLNode, LeafNode, ParentNode
 from node_transformer import text_node_to_html_node
 
+# Bump whenever a change alters the HTML produced for some markdown; it invalidates cached fragments
+PARSER_VERSION = "1"
+
 def split_nodes_delimiter(old_nodes: List[TextNode], delimiter: str, text_type: TextType) -> List[TextNode]:
     """Parsing of TextType.TEXT nodes to separated TextNodes of TextType.TEXT, TextType.BOLD, TextType.ITALIC, TextType.CODE."""
     result = []
@@ -41,13 +45,16 @@ def split_nodes_delimiter(old_nodes: List[TextNode], delimiter: str, text_type:
     
     return result
 
+_IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
 def extract_markdown_images(text: str) -> List[Tuple[str,str]]:
     """Extracts regular image links from markdown text."""
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)",text)
+    return _IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text: str) -> List[Tuple[str,str]]:
     """Extracts regular links from markdown text."""
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)",text)
+    return _LINK_PATTERN.findall(text)
 
 def split_nodes_image(old_nodes: List[TextNode]) -> List[TextNode]:
     result = []
@@ -117,31 +124,126 @@ def split_nodes_link(old_nodes: List[TextNode]) -> List[TextNode]:
     
     return result
 
+# Inline markup is recognised by a single scan over the text. The scanner jumps from one candidate
+# opener to the next and slices by index, so every character is visited a constant number of times.
+_INLINE_OPENER = re.compile(r"\*\*|_|`|!\[|\[")
+_INLINE_DELIMITERS = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
+
 def text_to_textnodes(text: str) -> List[TextNode]:
-    """Converts a markdown string to a list of TextNode objects."""
+    """Converts a markdown string to a list of TextNode objects.
+
+    Equivalent to running split_nodes_delimiter for bold, italic and code followed by split_nodes_image
+    and split_nodes_link, but done in one left-to-right pass. The first opener wins, so markup inside
+    code spans, links and image descriptions is kept literally, and unclosed delimiters stay plain text.
+    """
     if not text:
         return []
-    
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    
+
+    nodes = []
+    length = len(text)
+    text_start = 0
+    pos = 0
+    unclosed = set()  # delimiters with no closing occurrence left in the text
+
+    while pos < length:
+        match = _INLINE_OPENER.search(text, pos)
+        if match is None:
+            break
+        opener = match.group()
+        start = match.start()
+
+        if opener in _INLINE_DELIMITERS:
+            end = -1 if opener in unclosed else text.find(opener, match.end())
+            if end == -1:
+                unclosed.add(opener)
+                pos = match.end()
+                continue
+            if start > text_start:
+                nodes.append(TextNode(text[text_start:start], TextType.TEXT))
+            nodes.append(TextNode(text[match.end():end], _INLINE_DELIMITERS[opener]))
+            pos = text_start = end + len(opener)
+            continue
+
+        if opener == "![":
+            found = _IMAGE_PATTERN.match(text, start)
+            text_type = TextType.IMAGE
+        else:
+            found = _LINK_PATTERN.match(text, start)
+            text_type = TextType.LINK
+        if found is None:
+            pos = match.end()
+            continue
+        if start > text_start:
+            nodes.append(TextNode(text[text_start:start], TextType.TEXT))
+        nodes.append(TextNode(found.group(1), text_type, url=found.group(2)))
+        pos = text_start = found.end()
+
+    if text_start < length:
+        nodes.append(TextNode(text[text_start:], TextType.TEXT))
     return nodes
 
+def iter_blocks(lines: Iterable[str]) -> Iterator[str]:
+    """Yields the blocks of a document one at a time from its lines, e.g. an open file.
+
+    Lines keep their trailing newline, as file iteration returns them. The result is exactly what
+    markdown_to_blocks returns for the joined text: an empty line that is followed by a newline ends a
+    block, except right after another such separator (mirroring how str.split("\\n\\n") consumes pairs).
+    Only the current block is held in memory.
+    """
+    current = []
+    separator_allowed = False
+    ends_with_newline = False
+    for line in lines:
+        ends_with_newline = line.endswith("\n")
+        if ends_with_newline:
+            line = line[:-1]
+        if line == "" and separator_allowed and ends_with_newline:
+            block = "\n".join(current)
+            if block:
+                yield block.strip()
+            current = []
+            separator_allowed = False
+            continue
+        current.append(line.strip())
+        separator_allowed = True
+    if ends_with_newline:
+        current.append("")
+    block = "\n".join(current)
+    if block:
+        yield block.strip()
+
 def markdown_to_blocks(markdown: str) -> list[str]:
-    blocks = markdown.split("\n\n")
-    
-    cleaned_blocks = []
-    for block in blocks:
-        lines = block.split("\n")
-        block = "\n".join(map(lambda line: line.strip(), lines))
-        if block:  # Only add non-empty blocks
-            cleaned_blocks.append(block.strip())
-            
-    return cleaned_blocks
+    return list(iter_blocks(io.StringIO(markdown)))
+
+class BlockReader:
+    """Lazily reads the blocks of a document from its lines and picks up the h1 title in the same pass.
+
+    Iterating yields blocks; title is set as soon as the first "# " line has been read. front_matter holds
+    what the caller split off the start of the document, if anything (see front_matter.split_front_matter).
+    """
+    def __init__(self, lines: Iterable[str], front_matter: Dict[str, object] = None):
+        self.title = None
+        self.front_matter = front_matter if front_matter is not None else {}
+        self._blocks = iter_blocks(self._watch_title(lines))
+
+    def _watch_title(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            if self.title is None and line.startswith('# '):
+                self.title = line[2:].strip()
+            yield line
+
+    def __iter__(self) -> Iterator[str]:
+        return self._blocks
+
+    def read_until_title(self) -> List[str]:
+        """Consumes and returns blocks until the title is known (or the document ends)."""
+        blocks = []
+        while self.title is None:
+            block = next(self._blocks, None)
+            if block is None:
+                break
+            blocks.append(block)
+        return blocks
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -151,19 +253,48 @@ class BlockType(Enum):
     ULIST = "unordered_list"
     OLIST = "ordered_list"
 
+_HEADING_PATTERN = re.compile(r"#{1,6} ")
+_OLIST_PATTERN = re.compile(r"\d+\. ")
+
+def _is_code_block(block: str) -> bool:
+    return block.startswith("```") and block.endswith("```")
+
+# Block classifiers indexed by the first character a block must start with, so most paragraphs are
+# classified by a single dict lookup. Classifiers in _GENERIC_CLASSIFIERS apply to any first character and are
+# checked first.
+_CLASSIFIERS_BY_CHAR: Dict[str, List[Tuple[Callable[[str], object], object]]] = {
+    "#": [(_HEADING_PATTERN.match, BlockType.HEADING)],
+    "`": [(_is_code_block, BlockType.CODE)],
+    ">": [(lambda block: block.startswith("> "), BlockType.QUOTE)],
+    "-": [(lambda block: block.startswith("- "), BlockType.ULIST)],
+    **{digit: [(_OLIST_PATTERN.match, BlockType.OLIST)] for digit in "0123456789"},
+}
+_GENERIC_CLASSIFIERS: List[Tuple[Callable[[str], object], object]] = []
+
 def block_to_block_type(block: str) -> BlockType:
-    if re.match(r"^#{1,6} ", block):
-        return BlockType.HEADING
-    elif block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
-    elif block.startswith("> "):
-        return BlockType.QUOTE
-    elif block.startswith("- "):
-        return BlockType.ULIST
-    elif re.match(r"^\d+\. ", block):
-        return BlockType.OLIST
+    for matches, block_type in _GENERIC_CLASSIFIERS:
+        if matches(block):
+            return block_type
+    for matches, block_type in _CLASSIFIERS_BY_CHAR.get(block[:1], ()):
+        if matches(block):
+            return block_type
+    return BlockType.PARAGRAPH
+
+def register_block_type(block_type, matches: Callable[[str], object], handler: Callable[[str], HTMLNode],
+                        first_chars: str = None):
+    """Adds a block type: blocks for which matches(block) is truthy are rendered by handler(block).
+
+    first_chars lists the characters such blocks can start with; it keeps classification a dict lookup
+    and should be given whenever possible. A new classifier is checked before existing ones, so it can
+    specialise a built-in type (e.g. a fenced block with a language tag); classifiers registered without
+    first_chars are checked before all others.
+    """
+    if first_chars:
+        for char in first_chars:
+            _CLASSIFIERS_BY_CHAR.setdefault(char, []).insert(0, (matches, block_type))
     else:
-        return BlockType.PARAGRAPH
+        _GENERIC_CLASSIFIERS.insert(0, (matches, block_type))
+    BLOCK_HANDLERS[block_type] = handler
     
 def markdown_to_html_node(markdown):
     blocks = markdown_to_blocks(markdown)
@@ -175,20 +306,10 @@ def markdown_to_html_node(markdown):
 
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
-    if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
-    if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
-    if block_type == BlockType.CODE:
-        return code_to_html_node(block)
-    if block_type == BlockType.OLIST:
-        return olist_to_html_node(block)
-    if block_type == BlockType.ULIST:
-        return ulist_to_html_node(block)
-    if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
-    raise ValueError("invalid block type")
+    handler = BLOCK_HANDLERS.get(block_to_block_type(block))
+    if handler is None:
+        raise ValueError("invalid block type")
+    return handler(block)
 
 
 def text_to_children(text):
@@ -208,12 +329,7 @@ def paragraph_to_html_node(block):
 
 
 def heading_to_html_node(block):
-    level = 0
-    for char in block:
-        if char == "#":
-            level += 1
-        else:
-            break
+    level = len(block) - len(block.lstrip("#"))
     if level + 1 >= len(block):
         raise ValueError(f"invalid heading level: {level}")
     text = block[level + 1 :]
@@ -263,6 +379,16 @@ def quote_to_html_node(block):
     return ParentNode("blockquote", children)
 
 
+BLOCK_HANDLERS: Dict[object, Callable[[str], HTMLNode]] = {
+    BlockType.PARAGRAPH: paragraph_to_html_node,
+    BlockType.HEADING: heading_to_html_node,
+    BlockType.CODE: code_to_html_node,
+    BlockType.OLIST: olist_to_html_node,
+    BlockType.ULIST: ulist_to_html_node,
+    BlockType.QUOTE: quote_to_html_node,
+}
+
+
 def extract_title(markdown: str) -> str:
     for line in markdown.split('\n'):
         if line.startswith('# '):
@@ -1,7 +1,19 @@
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
 from textnode import TextNode, TextType
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
+# Called with every text node converted in the current context, e.g. to collect search terms while rendering
+text_node_observer: ContextVar[Optional[Callable[[TextNode], None]]] = ContextVar("text_node_observer", default=None)
+# Called with the URL of every image converted in the current context; the img props it returns, if any, replace
+# the plain src, e.g. with a fingerprinted src and a srcset of resized copies
+image_props: ContextVar[Optional[Callable[[str], Optional[Dict[str, str]]]]] = ContextVar("image_props", default=None)
+
 def text_node_to_html_node(text_node: TextNode) -> LeafNode:
+    observer = text_node_observer.get()
+    if observer is not None:
+        observer(text_node)
     match text_node.text_type:
         case TextType.TEXT:
             return LeafNode(tag=None, value=text_node.text)
@@ -20,6 +32,10 @@ def text_node_to_html_node(text_node: TextNode) -> LeafNode:
                 raise ValueError("URL must be provided for IMAGE type")
             if not text_node.text:
                 text_node.text = "Image without description"
-            return LeafNode(tag="img", value="", props={"src": text_node.url, "alt": text_node.text})
+            props = {"src": text_node.url, "alt": text_node.text}
+            resolve_image = image_props.get()
+            if resolve_image is not None:
+                props.update(resolve_image(text_node.url) or {})
+            return LeafNode(tag="img", value="", props=props)
         case _:
             raise ValueError(f"Unsupported TextType: {text_node.text_type}")
@@ -0,0 +1,233 @@
+import itertools
+import operator
+import struct
+import zlib
+from typing import Dict, List
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Color type -> channels per pixel once decoded; palette images are expanded to RGB(A)
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# Chunks describing how to interpret the colors, carried over to resized copies
+COLOR_CHUNKS = (b"cHRM", b"gAMA", b"iCCP", b"sRGB")
+
+_MASK = (255).__and__
+# Filter type heuristic of libpng: the smallest sum of the filtered bytes read as signed values wins
+_SIGNED_MAGNITUDE = tuple(value if value < 128 else 256 - value for value in range(256))
+
+
+class PNGError(ValueError):
+    """Raised for files that are not PNGs, are corrupt, or use a feature this codec does not support."""
+
+
+class Image:
+    """Decoded 8-bit image: rows of interleaved samples, channels 1 (gray), 2 (gray+alpha), 3 (RGB) or 4 (RGBA).
+
+    chunks holds the raw color chunks (gAMA, sRGB, ...) of the source, so encoding keeps its colors.
+    """
+    __slots__ = ("width", "height", "channels", "rows", "chunks")
+
+    def __init__(self, width: int, height: int, channels: int, rows: List[bytes], chunks: Dict[bytes, bytes] = None):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows = rows
+        self.chunks = chunks if chunks is not None else {}
+
+    def __repr__(self) -> str:
+        return f"Image({self.width}x{self.height}, channels={self.channels})"
+
+
+def read_size(data: bytes):
+    """The (width, height) in the IHDR chunk of a PNG, without decoding it."""
+    if data[:8] != SIGNATURE or data[12:16] != b"IHDR":
+        raise PNGError("not a PNG file")
+    return struct.unpack(">II", data[16:24])
+
+
+def _chunks(data: bytes):
+    if data[:8] != SIGNATURE:
+        raise PNGError("not a PNG file")
+    position = 8
+    while position + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        if len(body) != length:
+            raise PNGError(f"truncated {kind.decode('latin-1')} chunk")
+        yield kind, body
+        if kind == b"IEND":
+            return
+        position += 12 + length
+    raise PNGError("missing IEND chunk")
+
+
+def _unfilter(data: bytes, width: int, height: int, bpp: int) -> List[bytes]:
+    """Reverses the per-row filters. None, Sub and Up run entirely in C through map and accumulate; Average and
+    Paeth depend on the byte just reconstructed, so they take a Python loop."""
+    stride = width * bpp
+    if len(data) < (stride + 1) * height:
+        raise PNGError("image data is truncated")
+    rows = []
+    previous = bytes(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        filter_type = data[start]
+        line = data[start + 1:start + 1 + stride]
+        if filter_type == 0:
+            row = line
+        elif filter_type == 1:
+            row = bytearray(stride)
+            for channel in range(bpp):
+                row[channel::bpp] = bytes(map(_MASK, itertools.accumulate(line[channel::bpp])))
+            row = bytes(row)
+        elif filter_type == 2:
+            row = bytes(map(_MASK, map(operator.add, line, previous)))
+        elif filter_type == 3:
+            row = bytearray(line)
+            for x in range(stride):
+                left = row[x - bpp] if x >= bpp else 0
+                row[x] = (row[x] + ((left + previous[x]) >> 1)) & 255
+            row = bytes(row)
+        elif filter_type == 4:
+            row = bytearray(line)
+            for x in range(stride):
+                if x >= bpp:
+                    a, c = row[x - bpp], previous[x - bpp]
+                else:
+                    a = c = 0
+                b = previous[x]
+                pa, pb, pc = abs(b - c), abs(a - c), abs(a + b - c - c)
+                row[x] = (row[x] + (a if pa <= pb and pa <= pc else b if pb <= pc else c)) & 255
+            row = bytes(row)
+        else:
+            raise PNGError(f"unknown filter type {filter_type}")
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def _expand_color_key(rows: List[bytes], transparency: bytes, channels: int, sample_bytes: int) -> List[bytes]:
+    """Adds an alpha channel to gray or RGB rows, clear for the pixels matching the tRNS color and opaque for the
+    rest. Samples are compared at full depth, before 16-bit images are reduced to 8 bits."""
+    if len(transparency) != 2 * channels:
+        raise PNGError("tRNS chunk has the wrong length")
+    # tRNS stores every sample in 2 bytes; at depth 8 only the low byte can match
+    key = transparency if sample_bytes == 2 else transparency[1::2] if not any(transparency[::2]) else None
+    clear, opaque = bytes(sample_bytes), b"\xff" * sample_bytes
+    pixel_bytes = channels * sample_bytes
+    expanded = []
+    for row in rows:
+        pixels = (row[x:x + pixel_bytes] for x in range(0, len(row), pixel_bytes))
+        expanded.append(b"".join(pixel + (clear if pixel == key else opaque) for pixel in pixels))
+    return expanded
+
+
+def decode(data: bytes) -> Image:
+    """Decodes a non-interlaced PNG of bit depth 8 or 16 into an 8-bit Image; palettes, and the transparent
+    color of gray or RGB images, are expanded."""
+    header = None
+    palette = transparency = None
+    compressed = []
+    chunks = {}
+    for kind, body in _chunks(data):
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"PLTE":
+            palette = body
+        elif kind == b"tRNS":
+            transparency = body
+        elif kind == b"IDAT":
+            compressed.append(body)
+        elif kind in COLOR_CHUNKS:
+            chunks[kind] = body
+    if header is None:
+        raise PNGError("missing IHDR chunk")
+    width, height, depth, color_type, _, _, interlace = header
+    if color_type not in _CHANNELS:
+        raise PNGError(f"unknown color type {color_type}")
+    if depth not in (8, 16) or (color_type == 3 and depth != 8):
+        raise PNGError(f"bit depth {depth} is not supported")
+    if interlace:
+        raise PNGError("interlaced images are not supported")
+    channels = _CHANNELS[color_type]
+    sample_bytes = depth // 8
+    try:
+        raw = zlib.decompress(b"".join(compressed))
+    except zlib.error as e:
+        raise PNGError(f"corrupt image data: {e}") from None
+    rows = _unfilter(raw, width, height, channels * sample_bytes)
+    if transparency is not None and color_type in (0, 2):
+        rows = _expand_color_key(rows, transparency, channels, sample_bytes)
+        channels += 1
+    if sample_bytes == 2:
+        # Keep the most significant byte of every sample
+        rows = [row[::2] for row in rows]
+    if color_type == 3:
+        if palette is None:
+            raise PNGError("missing PLTE chunk")
+        entries = [palette[i:i + 3] for i in range(0, len(palette), 3)]
+        if transparency is not None:
+            alpha = transparency + b"\xff" * (len(entries) - len(transparency))
+            entries = [entry + alpha[i:i + 1] for i, entry in enumerate(entries)]
+        # Out of range indices are an error in the file; show them as black rather than failing
+        entries += [bytes(len(entries[0]) if entries else 3)] * (256 - len(entries))
+        rows = [b"".join(map(entries.__getitem__, row)) for row in rows]
+        channels = len(entries[0])
+    return Image(width, height, channels, rows, chunks)
+
+
+def _box_ranges(source_size: int, target_size: int):
+    """For every target pixel, the [start, end) span of source pixels it averages."""
+    return [((i * source_size) // target_size, max(((i + 1) * source_size) // target_size,
+                                                   (i * source_size) // target_size + 1))
+            for i in range(target_size)]
+
+
+def resize(image: Image, width: int) -> Image:
+    """Scales image down to width, keeping its aspect ratio, by averaging the box of source pixels behind every
+    target pixel. Rows are reduced horizontally with C-level slice sums, then averaged vertically."""
+    if width >= image.width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    channels = image.channels
+    columns = _box_ranges(image.width, width)
+    # Channel-major span slices of every target pixel, in the interleaved order of the output row
+    spans = [(start * channels + channel, end * channels, end - start)
+             for start, end in columns for channel in range(channels)]
+    rows = []
+    for start, end in _box_ranges(image.height, height):
+        sums = None
+        for row in image.rows[start:end]:
+            reduced = [sum(row[first:last:channels]) for first, last, _ in spans]
+            sums = reduced if sums is None else list(map(operator.add, sums, reduced))
+        count = end - start
+        rows.append(bytes((total + (span * count) // 2) // (span * count)
+                          for total, (_, _, span) in zip(sums, spans)))
+    return Image(width, height, channels, rows, image.chunks)
+
+
+def _chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def encode(image: Image, level: int = 9) -> bytes:
+    """Encodes image as a PNG, choosing None, Sub or Up per row by the smallest sum of signed filtered bytes.
+    All three filters run in C; Paeth would need a Python loop per byte and rarely wins by much on resized
+    images."""
+    bpp = image.channels
+    color_type = {1: 0, 2: 4, 3: 2, 4: 6}[bpp]
+    previous = bytes(image.width * bpp)
+    filtered = []
+    for row in image.rows:
+        candidates = (
+            (0, row),
+            (1, bytes(map(_MASK, map(operator.sub, row, bytes(bpp) + row[:-bpp])))),
+            (2, bytes(map(_MASK, map(operator.sub, row, previous)))),
+        )
+        filter_type, line = min(candidates, key=lambda candidate: sum(map(_SIGNED_MAGNITUDE.__getitem__,
+                                                                           candidate[1])))
+        filtered.append(bytes((filter_type,)) + line)
+        previous = row
+    header = struct.pack(">IIBBBBB", image.width, image.height, 8, color_type, 0, 0, 0)
+    return b"".join([SIGNATURE, _chunk(b"IHDR", header)]
+                    + [_chunk(kind, image.chunks[kind]) for kind in COLOR_CHUNKS if kind in image.chunks]
+                    + [_chunk(b"IDAT", zlib.compress(b"".join(filtered), level)), _chunk(b"IEND", b"")])
@@ -0,0 +1,110 @@
+import json
+import time
+from typing import Dict, List
+
+PHASES = ("static copy", "read", "markdown_to_blocks", "block_to_html_node", "to_html", "template fill", "write")
+
+
+class _Phase:
+    """Times one phase. Time spent in nested phases is subtracted, so every phase reports its own work only."""
+    __slots__ = ("profiler", "name", "page", "wall_start", "cpu_start", "child_wall", "child_cpu")
+
+    def __init__(self, profiler: 'BuildProfiler', name: str, page: str):
+        self.profiler = profiler
+        self.name = name
+        self.page = page
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+
+    def __enter__(self):
+        self.profiler._stack.append(self)
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        stack = self.profiler._stack
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        self.profiler._add(self.name, self.page, wall - self.child_wall, cpu - self.child_cpu)
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class BuildProfiler:
+    """Collects wall and CPU time per build phase and per page.
+
+    A disabled profiler hands out a shared no-op context manager, so instrumented code costs next to
+    nothing when profiling is off.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.pages: Dict[str, float] = {}
+        self._stack: List[_Phase] = []
+
+    def phase(self, name: str, page: str = None):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name, page)
+
+    def _add(self, name: str, page: str, wall: float, cpu: float):
+        totals = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0})
+        totals["wall"] += wall
+        totals["cpu"] += cpu
+        totals["calls"] += 1
+        if page is not None:
+            self.pages[page] = self.pages.get(page, 0.0) + wall
+
+    def merge(self, other: 'BuildProfiler'):
+        """Adds the measurements of another profiler, e.g. one returned by a worker process."""
+        for name, totals in other.phases.items():
+            mine = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0})
+            for key in mine:
+                mine[key] += totals[key]
+        for page, wall in other.pages.items():
+            self.pages[page] = self.pages.get(page, 0.0) + wall
+
+    def slowest_pages(self, top: int) -> List[tuple]:
+        return sorted(self.pages.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+    def _ordered_phases(self) -> List[str]:
+        return [name for name in PHASES if name in self.phases] + sorted(set(self.phases) - set(PHASES))
+
+    def report(self, top: int = 10) -> str:
+        lines = [f"{'phase':<20} {'wall (s)':>10} {'cpu (s)':>10} {'calls':>8}"]
+        for name in self._ordered_phases():
+            totals = self.phases[name]
+            lines.append(f"{name:<20} {totals['wall']:>10.4f} {totals['cpu']:>10.4f} {totals['calls']:>8}")
+        if self.pages:
+            lines.append(f"Slowest {min(top, len(self.pages))} pages:")
+            for page, wall in self.slowest_pages(top):
+                lines.append(f"  {wall:>8.4f} s  {page}")
+        return "\n".join(lines)
+
+    def to_dict(self, top: int = 10) -> dict:
+        return {
+            "phases": {name: dict(self.phases[name]) for name in self._ordered_phases()},
+            "slowest_pages": [{"page": page, "wall": wall} for page, wall in self.slowest_pages(top)],
+            "total_wall": sum(totals["wall"] for totals in self.phases.values()),
+        }
+
+    def write_json(self, path: str, top: int = 10):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(top), f, indent=2)
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence
+
+# Kept in sync with main.CACHE_DIR; main is not imported so that the client starts fast
+DEFAULT_SOCKET_PATH = os.path.join(".ssg-cache", "render.sock")
+
+
+class RenderError(Exception):
+    """Raised when the render server answers a request with an error."""
+
+
+def encode(message: dict) -> bytes:
+    """One request or response per line; JSON escapes newlines inside strings, so a line is a whole message."""
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class RenderClient:
+    """Connection to a render server (see render_server.py). Requests on one connection are answered in order."""
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 60.0):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        try:
+            self.socket.connect(socket_path)
+        except OSError:
+            self.socket.close()
+            raise
+        self.file = self.socket.makefile('rwb')
+
+    def request(self, message: dict) -> dict:
+        self.file.write(encode(message))
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise RenderError("connection closed by the render server")
+        response = json.loads(line)
+        if "error" in response:
+            raise RenderError(response["error"])
+        return response
+
+    def render(self, markdown: str) -> str:
+        return self.request({"op": "render", "markdown": markdown})["html"]
+
+    def build(self, paths: Iterable[str]):
+        """Rebuilds the pages and assets that changes to paths affect, like the watch mode of the dev server."""
+        # The server may run from another directory
+        self.request({"op": "build", "paths": [os.path.abspath(path) for path in paths]})
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def measure_latency(socket_path: str, documents: Sequence[str], clients: int, requests: int) -> List[float]:
+    """Sends requests render requests from each of clients concurrent connections; returns every latency in seconds."""
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def run(offset):
+        measured = []
+        try:
+            with RenderClient(socket_path) as client:
+                for number in range(requests):
+                    markdown = documents[(offset + number) % len(documents)]
+                    start = time.perf_counter()
+                    client.render(markdown)
+                    measured.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(e)
+        with lock:
+            latencies.extend(measured)
+
+    threads = [threading.Thread(target=run, args=(offset,)) for offset in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return latencies
+
+
+def percentiles(latencies: Sequence[float], points: Iterable[float] = (50, 90, 99)) -> Dict[float, float]:
+    """Nearest-rank percentiles of latencies."""
+    ordered = sorted(latencies)
+    return {point: ordered[max(0, -(-len(ordered) * point // 100) - 1)] for point in points}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render through a running render server instead of a cold start.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help=f"server socket (default: {DEFAULT_SOCKET_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    render = commands.add_parser("render", help="print the HTML of a markdown file (- for stdin)")
+    render.add_argument("file")
+    build = commands.add_parser("build", help="rebuild the pages affected by changes to the given paths")
+    build.add_argument("paths", nargs="+")
+    bench = commands.add_parser("bench", help="report render latency percentiles under concurrent load")
+    bench.add_argument("files", nargs="+", help="markdown files to render in turn")
+    bench.add_argument("--clients", type=int, default=8, help="concurrent connections (default: 8)")
+    bench.add_argument("--requests", type=int, default=200, help="requests per connection (default: 200)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "render":
+            if args.file == "-":
+                markdown = sys.stdin.read()
+            else:
+                with open(args.file, 'r') as f:
+                    markdown = f.read()
+            with RenderClient(args.socket) as client:
+                sys.stdout.write(client.render(markdown) + "\n")
+        elif args.command == "build":
+            start = time.perf_counter()
+            with RenderClient(args.socket) as client:
+                client.build(args.paths)
+            print(f"Rebuilt {len(args.paths)} changed path(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        else:
+            documents = []
+            for path in args.files:
+                with open(path, 'r') as f:
+                    documents.append(f.read())
+            start = time.perf_counter()
+            latencies = measure_latency(args.socket, documents, args.clients, args.requests)
+            elapsed = time.perf_counter() - start
+            print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.2f} s "
+                  f"({len(latencies) / elapsed:.0f} requests/s)")
+            print("  ".join(f"p{point}: {seconds * 1000:.2f} ms" for point, seconds in percentiles(latencies).items())
+                  + f"  max: {max(latencies) * 1000:.2f} ms")
+    except (OSError, RenderError) as e:
+        print(f"Render server error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
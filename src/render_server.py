@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+
+from main import PageBuildError
+from render_client import DEFAULT_SOCKET_PATH, encode
+from renderer import MarkdownRenderer
+from watch import DevSite
+
+
+class RenderService:
+    """Answers render server requests, independently of the transport.
+
+    Requests are dicts with an "op": "render" takes "markdown" and answers {"html": ...}, "build" takes the
+    changed "paths" and rebuilds what they affect like the watch mode of the dev server, "ping" answers {}.
+    Renders run concurrently on the shared MarkdownRenderer; builds are serialized, since the site state
+    they update is not thread-safe.
+    """
+    def __init__(self, site: DevSite, renderer: MarkdownRenderer = None):
+        self.site = site
+        self.renderer = renderer if renderer is not None else MarkdownRenderer(site.base_path)
+        self._build_lock = threading.Lock()
+
+    def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "render":
+            return {"html": self.renderer.render(request["markdown"])}
+        if op == "build":
+            with self._build_lock:
+                self.site.apply_changes(self._site_path(path) for path in request["paths"])
+                self.site.save()
+            return {}
+        if op == "ping":
+            return {}
+        raise ValueError(f"unknown op: {op!r}")
+
+    def _site_path(self, path: str) -> str:
+        """Clients send absolute paths; the site compares them with its own, possibly relative, directories."""
+        if os.path.isabs(self.site.content_dir):
+            return os.path.abspath(path)
+        return os.path.relpath(os.path.abspath(path))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.service.handle(json.loads(line))
+            except PageBuildError as e:
+                response = {"error": str(e)}
+            except Exception as e:
+                response = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(encode(response))
+            self.wfile.flush()
+
+
+class RenderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves a RenderService on a Unix domain socket, one thread per connection.
+
+    The protocol is one JSON object per line in each direction (see render_client.py). A leftover socket
+    file of a server that is gone is replaced; one that still accepts connections, or a path that is not a
+    socket, is an error.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: RenderService):
+        self.service = service
+        _remove_stale_socket(socket_path)
+        directory = os.path.dirname(socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        super().__init__(socket_path, _RequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.server_address)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(socket_path: str):
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    # Anything else refuses connections too; it is never ours to delete
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{socket_path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"a render server is already listening on {socket_path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py daemon",
+                                     description="Keep the renderer warm and serve render and build requests.")
+    parser.add_argument("basepath", nargs="?", default="/",
+                        help="URL prefix the site is served from (default: /)")
+    parser.add_argument("--site-url", default="", metavar="URL",
+                        help="origin the site is published at, as for builds, so sitemap.xml and feed.xml stay "
+                             "the same (default: neither is written)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH,
+                        help=f"Unix socket to listen on (default: {DEFAULT_SOCKET_PATH})")
+    args = parser.parse_args(argv)
+
+    site = DevSite(base_path=args.basepath, site_url=args.site_url)
+    try:
+        server = RenderServer(args.socket, RenderService(site))
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Render server listening on {args.socket}, press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        site.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import io
+import threading
+from collections import OrderedDict
+from typing import Iterable, List
+
+from front_matter import DELIMITERS, split_front_matter
+from markdown_parser import block_to_html_node, markdown_to_blocks
+from url_resolver import BasePathResolver
+
+DEFAULT_MAX_CACHED_BYTES = 32 * 1024 * 1024
+
+
+class MarkdownRenderer:
+    """Renders in-memory markdown documents to HTML, keeping its configuration and caches warm between calls.
+
+    Meant for long-running services such as CMS previews, which render the same blocks over and over: the
+    rendered HTML of every block is kept in an in-memory LRU cache of up to max_cached_bytes characters, so
+    each distinct block is parsed once. The output of render is exactly
+    markdown_to_html_node(body).to_html(url_resolver), where body is the markdown after its front matter, if
+    any, as in the pages the build writes.
+
+    A renderer can be shared between threads. The parser keeps no mutable state of its own, and the cache is
+    only touched under a lock; blocks are parsed outside of it. Cache hits produce no text nodes, so a
+    node_transformer text_node_observer only sees blocks rendered for the first time.
+    """
+    def __init__(self, base_path: str = "/", max_cached_bytes: int = DEFAULT_MAX_CACHED_BYTES):
+        self.url_resolver = BasePathResolver(base_path)
+        self.max_cached_bytes = max_cached_bytes
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def render_block(self, block: str) -> str:
+        with self._lock:
+            html = self._cache.get(block)
+            if html is not None:
+                self._cache.move_to_end(block)
+                self.hits += 1
+                return html
+            self.misses += 1
+        html = block_to_html_node(block).to_html(self.url_resolver)
+        with self._lock:
+            if block not in self._cache:
+                self._cache[block] = html
+                self._size += len(block) + len(html)
+                while self._size > self.max_cached_bytes:
+                    evicted, evicted_html = self._cache.popitem(last=False)
+                    self._size -= len(evicted) + len(evicted_html)
+        return html
+
+    def render(self, markdown: str) -> str:
+        if markdown[:3] in DELIMITERS:
+            _, lines = split_front_matter(io.StringIO(markdown))
+            markdown = "".join(lines)
+        return "".join(["<div>", *map(self.render_block, markdown_to_blocks(markdown)), "</div>"])
+
+    def render_many(self, documents: Iterable[str]) -> List[str]:
+        """Renders every document, in order. Blocks shared between documents are parsed once."""
+        return [self.render(markdown) for markdown in documents]
+
+    def __repr__(self) -> str:
+        return (f"MarkdownRenderer({self.url_resolver.base_path!r}, cached={len(self._cache)}, hits={self.hits}, "
+                f"misses={self.misses})")
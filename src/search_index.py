@@ -0,0 +1,181 @@
+import json
+import os
+import posixpath
+import re
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from state import load_json, save_json
+from textnode import TextNode, TextType
+
+SEARCH_INDEX_VERSION = 1
+DEFAULT_MAX_PART_BYTES = 256 * 1024
+
+_TERM_PATTERN = re.compile(r"\w{2,32}")
+_TAG_PATTERN = re.compile(r"<[^>]*>")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TERM_PATTERN.findall(text.lower())
+
+
+class TermCollector:
+    """Counts the terms of the text nodes a page renders, for use as the node_transformer text_node_observer.
+
+    Image alt texts are not indexed. Blocks served from the fragment cache never produce text nodes, so their
+    HTML is added with add_html instead; stripping the tags yields the same terms.
+    """
+    def __init__(self):
+        self.terms = Counter()
+
+    def __call__(self, text_node: TextNode):
+        if text_node.text_type != TextType.IMAGE:
+            self.terms.update(tokenize(text_node.text))
+
+    def add_html(self, html: str):
+        self.terms.update(tokenize(_TAG_PATTERN.sub(" ", html)))
+
+
+def shard_for(url: str, base_path: str = "/") -> str:
+    """Pages are sharded by the directory holding them below base_path, with ~ separating nested directories:
+    /blog/2024/post/ and /blog/2024/notes.html share the blog~2024 shard. Top-level pages, including directory
+    index pages such as /blog/, share the _root shard."""
+    if url.startswith(base_path):
+        url = url[len(base_path):]
+    directory = posixpath.dirname(url.strip("/"))
+    return directory.replace("/", "~") if directory else "_root"
+
+
+class SearchIndex:
+    """Inverted index of the site for client-side search, kept up to date incrementally between builds.
+
+    The term counts of every page are persisted in state_path, so a build only re-indexes the pages it
+    rebuilds and rewrites only the shards those pages belong to. Each shard is written to output_dir as a
+    pages file ([url, title] per page id) and one or more term files mapping terms to flat
+    [page id, frequency, ...] postings. Term files are split by term range to stay under max_part_bytes;
+    index.json lists the first term of every part so a client fetches exactly one file per query term.
+    Page URLs are stored with base_path applied, but sharded by their path below it.
+    """
+    def __init__(self, state_path: str, output_dir: str, max_terms_per_page: int = 256,
+                 max_part_bytes: int = DEFAULT_MAX_PART_BYTES, base_path: str = "/", pages: Dict[str, dict] = None):
+        self.state_path = state_path
+        self.base_path = base_path
+        self.output_dir = output_dir
+        self.max_terms_per_page = max_terms_per_page
+        self.max_part_bytes = max_part_bytes
+        self.pages = pages if pages is not None else {}
+        self.dirty = set()
+
+    @classmethod
+    def load(cls, state_path: str, output_dir: str, **options) -> 'SearchIndex':
+        """Loads the persisted term counts and the shards still due; without them every shard is rewritten on
+        the next write."""
+        data = load_json(state_path, SEARCH_INDEX_VERSION)
+        if data is None:
+            index = cls(state_path, output_dir, **options)
+            # Rewrite every shard so leftovers of an older format disappear
+            index.dirty.add(None)
+            return index
+        index = cls(state_path, output_dir, pages=data.get("pages", {}), **options)
+        # A failed build saves the term counts without writing their shards, so those are still due
+        index.dirty.update(data.get("dirty", [None]))
+        return index
+
+    def update(self, source_path: str, url: str, title: str, terms: Counter):
+        """Replaces the entry of a page, keeping its max_terms_per_page most frequent terms."""
+        previous = self.pages.get(source_path)
+        if previous is not None:
+            self.dirty.add(shard_for(previous["url"], self.base_path))
+        kept = sorted(terms.items(), key=lambda item: (-item[1], item[0]))[:self.max_terms_per_page]
+        self.pages[source_path] = {"url": url, "title": title, "terms": dict(kept)}
+        self.dirty.add(shard_for(url, self.base_path))
+
+    def retain(self, source_paths: Iterable[str]):
+        """Drops the pages whose source is not in source_paths, i.e. deleted pages."""
+        keep = set(source_paths)
+        for source_path in sorted(set(self.pages) - keep):
+            self.remove(source_path)
+
+    def remove(self, source_path: str):
+        entry = self.pages.pop(source_path, None)
+        if entry is not None:
+            self.dirty.add(shard_for(entry["url"], self.base_path))
+
+    def shards(self) -> Dict[str, List[dict]]:
+        shards = {}
+        for entry in self.pages.values():
+            shards.setdefault(shard_for(entry["url"], self.base_path), []).append(entry)
+        for entries in shards.values():
+            entries.sort(key=lambda entry: entry["url"])
+        return shards
+
+    def _parts(self, entries: List[dict]) -> List[Dict[str, list]]:
+        postings = {}
+        for page_id, entry in enumerate(entries):
+            for term, frequency in entry["terms"].items():
+                postings.setdefault(term, []).extend((page_id, frequency))
+        parts = [{}]
+        size = 2
+        for term in sorted(postings):
+            term_size = len(_dumps({term: postings[term]}))
+            if parts[-1] and size + term_size > self.max_part_bytes:
+                parts.append({})
+                size = 2
+            parts[-1][term] = postings[term]
+            size += term_size
+        return parts
+
+    def write(self, write_file) -> int:
+        """Writes the dirty shards and index.json through write_file(path, text); returns the number of shards written.
+
+        write_file is expected to leave identical files untouched, so an unchanged shard costs no disk churn.
+        """
+        shards = self.shards()
+        previous = self._read_listing()
+        rewrite_all = None in self.dirty
+        listing = {}
+        written = 0
+        existing = set(os.listdir(self.output_dir)) if os.path.isdir(self.output_dir) else set()
+        for shard in sorted(shards):
+            if not rewrite_all and shard not in self.dirty and shard in previous:
+                listing[shard] = previous[shard]
+                continue
+            entries = shards[shard]
+            parts = self._parts(entries)
+            listing[shard] = {"pages": f"{shard}.pages.json",
+                              "terms": [[min(part) if part else "", f"{shard}.{number}.json"]
+                                        for number, part in enumerate(parts)]}
+            written += 1
+            write_file(os.path.join(self.output_dir, f"{shard}.pages.json"),
+                       _dumps([[entry["url"], entry["title"]] for entry in entries]))
+            for number, part in enumerate(parts):
+                write_file(os.path.join(self.output_dir, f"{shard}.{number}.json"), _dumps(part))
+        wanted = {"index.json"} | {file for shard in listing.values()
+                                   for file in [shard["pages"]] + [name for _, name in shard["terms"]]}
+        for name in sorted(existing - wanted):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.output_dir, name))
+        write_file(os.path.join(self.output_dir, "index.json"),
+                   _dumps({"version": SEARCH_INDEX_VERSION, "shards": listing}))
+        self.dirty.clear()
+        return written
+
+    def _read_listing(self) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(self.output_dir, "index.json"), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != SEARCH_INDEX_VERSION:
+            return {}
+        return data.get("shards", {})
+
+    def save(self):
+        # None stands for every shard and is stored as null
+        dirty = sorted(self.dirty, key=lambda shard: (shard is not None, shard or ""))
+        save_json(self.state_path, {"version": SEARCH_INDEX_VERSION, "dirty": dirty, "pages": self.pages},
+                  separators=(",", ":"))
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
@@ -0,0 +1,151 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+from xml.sax.saxutils import escape, quoteattr
+
+from state import load_json, save_json
+
+METADATA_VERSION = 1
+DEFAULT_FEED_ENTRIES = 20
+
+
+def _timestamp(mtime_ns: int) -> str:
+    """RFC 3339 UTC timestamp, as both sitemaps and Atom expect."""
+    return datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class MetadataStore:
+    """Per-page metadata (URL, title, source mtime) collected during builds, persisted between them.
+
+    The aggregate outputs sitemap.xml, feed.xml (Atom, most recently updated pages first) and nav.json (the
+    page tree by URL) are regenerated from the store alone, so a build that changes one page updates them
+    without reading any other page. URLs are stored with the base path applied; site_url, e.g.
+    https://user.github.io, is prefixed where crawlers and feed readers need absolute URLs. Sitemap locations
+    and Atom ids must be absolute, so without a site_url only nav.json is written.
+    """
+
+    def __init__(self, state_path: str, output_dir: str, site_url: str = "", base_path: str = "/",
+                 feed_entries: int = DEFAULT_FEED_ENTRIES, pages: Dict[str, dict] = None):
+        self.state_path = state_path
+        self.output_dir = output_dir
+        self.site_url = site_url.rstrip("/")
+        self.base_path = base_path
+        self.feed_entries = feed_entries
+        self.pages = pages if pages is not None else {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, state_path: str, output_dir: str, **options) -> 'MetadataStore':
+        """Loads the persisted metadata. The outputs are regenerated on the next write if there was none or it
+        was written with other options.
+        """
+        data = load_json(state_path, METADATA_VERSION)
+        if data is None:
+            store = cls(state_path, output_dir, **options)
+            store.dirty = True
+            return store
+        store = cls(state_path, output_dir, pages=data.get("pages", {}), **options)
+        # A failed build saves the store without writing the outputs, so they are still due
+        store.dirty = data.get("dirty", True) or data.get("options") != store._options()
+        return store
+
+    def _options(self) -> dict:
+        return {"site_url": self.site_url, "base_path": self.base_path, "feed_entries": self.feed_entries}
+
+    def update(self, source_path: str, url: str, title: str, mtime_ns: int):
+        entry = {"url": url, "title": title, "updated": mtime_ns}
+        if self.pages.get(source_path) != entry:
+            self.pages[source_path] = entry
+            self.dirty = True
+
+    def retain(self, source_paths: Iterable[str]):
+        """Drops the pages whose source is not in source_paths, i.e. deleted pages."""
+        keep = set(source_paths)
+        for source_path in sorted(set(self.pages) - keep):
+            self.remove(source_path)
+
+    def remove(self, source_path: str):
+        if self.pages.pop(source_path, None) is not None:
+            self.dirty = True
+
+    def _entries(self) -> List[dict]:
+        return sorted(self.pages.values(), key=lambda entry: entry["url"])
+
+    def sitemap(self) -> str:
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for entry in self._entries():
+            lines.append(f"<url><loc>{escape(self.site_url + entry['url'])}</loc>"
+                         f"<lastmod>{_timestamp(entry['updated'])}</lastmod></url>")
+        lines.append("</urlset>")
+        return "\n".join(lines) + "\n"
+
+    def feed(self) -> str:
+        """Atom feed of the feed_entries most recently updated pages, titled after the home page."""
+        entries = sorted(self._entries(), key=lambda entry: -entry["updated"])[:self.feed_entries]
+        home = self.site_url + self.base_path
+        title = next((entry["title"] for entry in self.pages.values() if entry["url"] == self.base_path), home)
+        updated = _timestamp(entries[0]["updated"] if entries else 0)
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<feed xmlns="http://www.w3.org/2005/Atom">',
+                 f"<title>{escape(title)}</title>",
+                 f"<id>{escape(home)}</id>",
+                 f"<link href={quoteattr(home)}/>",
+                 f"<link rel=\"self\" href={quoteattr(home + 'feed.xml')}/>",
+                 f"<updated>{updated}</updated>",
+                 f"<author><name>{escape(title)}</name></author>"]
+        for entry in entries:
+            url = self.site_url + entry["url"]
+            lines.append(f"<entry><title>{escape(entry['title'])}</title><id>{escape(url)}</id>"
+                         f"<link href={quoteattr(url)}/><updated>{_timestamp(entry['updated'])}</updated></entry>")
+        lines.append("</feed>")
+        return "\n".join(lines) + "\n"
+
+    def nav(self) -> dict:
+        """The pages as a tree following their URL paths; directories without an index page have no url."""
+        root = {"title": None, "url": None, "children": {}}
+        for entry in self._entries():
+            node = root
+            relative = entry["url"][len(self.base_path):] if entry["url"].startswith(self.base_path) else entry["url"]
+            for segment in relative.strip("/").split("/") if relative.strip("/") else ():
+                node = node["children"].setdefault(segment, {"title": segment, "url": None, "children": {}})
+            node["title"], node["url"] = entry["title"], entry["url"]
+        return _nav_node(root)
+
+    def outputs(self) -> List[str]:
+        """Names of the files write produces."""
+        return ["sitemap.xml", "feed.xml", "nav.json"] if self.site_url else ["nav.json"]
+
+    def write(self, write_file) -> bool:
+        """Regenerates the outputs through write_file(path, text) if any page changed; returns whether it did.
+
+        write_file is expected to leave identical files untouched, like the search index writer.
+        """
+        if not self.dirty and all(os.path.isfile(os.path.join(self.output_dir, name)) for name in self.outputs()):
+            return False
+        absolute = {"sitemap.xml": self.sitemap, "feed.xml": self.feed}
+        if self.site_url:
+            for name, render in absolute.items():
+                write_file(os.path.join(self.output_dir, name), render())
+        else:
+            print("Skipping sitemap.xml and feed.xml: they need absolute URLs, set the site URL (--site-url)")
+            for name in absolute:
+                path = os.path.join(self.output_dir, name)
+                if os.path.isfile(path):
+                    os.remove(path)
+        write_file(os.path.join(self.output_dir, "nav.json"),
+                   json.dumps(self.nav(), separators=(",", ":"), ensure_ascii=False))
+        self.dirty = False
+        return True
+
+    def save(self):
+        save_json(self.state_path, {"version": METADATA_VERSION, "options": self._options(), "dirty": self.dirty,
+                                    "pages": self.pages}, separators=(",", ":"))
+
+
+def _nav_node(node: dict) -> dict:
+    result = {"title": node["title"], "url": node["url"]}
+    if node["children"]:
+        result["children"] = [_nav_node(child) for _, child in sorted(node["children"].items())]
+    return result
@@ -0,0 +1,31 @@
+import json
+import os
+from typing import Optional
+
+
+def load_json(path: str, version: int) -> Optional[dict]:
+    """The JSON object save_json wrote to path with the given version, or None if the file is missing,
+    unreadable or from another version. Persisted build state starts over empty in that case."""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data
+
+
+def save_json(path: str, data: dict, **dump_options):
+    """Writes data as JSON to path atomically, so an interrupted build never leaves a truncated file behind.
+
+    The temp file is named after the process, so a build and the render daemon saving the same state at once
+    cannot write into each other's temp file; the last rename wins.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, sort_keys=True, **dump_options)
+    os.replace(tmp_path, path)
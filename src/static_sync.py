@@ -0,0 +1,150 @@
+import errno
+import os
+import shutil
+
+from manifest import file_digest
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# ioctl request number of FICLONE on Linux (_IOW(0x94, 9, int)), used for copy-on-write reflinks
+FICLONE = 0x40049409
+
+
+class SyncStats:
+    """Counters describing what a sync actually did, plus the source paths of every copied or removed file."""
+    def __init__(self):
+        self.copied = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.changed = []
+
+    def __repr__(self) -> str:
+        return f"SyncStats(copied={self.copied}, unchanged={self.unchanged}, removed={self.removed})"
+
+
+def is_up_to_date(source_path: str, dest_path: str, use_hash: bool = False, source_stat: os.stat_result = None,
+                  dest_stat: os.stat_result = None) -> bool:
+    """Checks whether dest_path already holds the bytes of source_path.
+
+    Hardlinks to the source are always up to date. Otherwise sizes must match and then either the
+    mtimes (which every sync copies over) or, with use_hash, the content digests. Stats the caller already
+    has, e.g. from os.scandir entries, are reused.
+    """
+    if dest_stat is None:
+        try:
+            dest_stat = os.stat(dest_path)
+        except FileNotFoundError:
+            return False
+    if source_stat is None:
+        source_stat = os.stat(source_path)
+    if (dest_stat.st_dev, dest_stat.st_ino) == (source_stat.st_dev, source_stat.st_ino):
+        return True
+    if dest_stat.st_size != source_stat.st_size:
+        return False
+    if use_hash:
+        return file_digest(source_path) == file_digest(dest_path)
+    return dest_stat.st_mtime_ns == source_stat.st_mtime_ns
+
+
+def copy_file(source_path: str, dest_path: str, link: bool = False):
+    """Copies a file without rewriting bytes in user space where the filesystem allows it.
+
+    Tries, in order: a hardlink (only with link=True), a reflink, os.copy_file_range and finally a plain copy.
+    The copy goes to a temporary file that replaces dest_path, so a hardlinked destination is never
+    modified in place (which would modify the source too).
+    """
+    tmp_path = f"{dest_path}.sync-tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    if link:
+        try:
+            os.link(source_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return
+        except OSError:
+            pass
+    with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        if not _reflink(src, dst) and not _copy_file_range(src, dst):
+            src.seek(0)
+            dst.seek(0)
+            dst.truncate()
+            shutil.copyfileobj(src, dst)
+    shutil.copystat(source_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+
+def _reflink(src, dst) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src, dst) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+    remaining = os.fstat(src.fileno()).st_size
+    try:
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except OSError as e:
+        if e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+            return False
+        raise
+    return remaining == 0
+
+
+def sync_static_files(source_dir: str, dest_dir: str, use_hash: bool = False, link: bool = False,
+                      stats: SyncStats = None) -> SyncStats:
+    """Makes dest_dir mirror source_dir, copying only changed files and deleting stale ones."""
+    if stats is None:
+        stats = SyncStats()
+    if os.path.isfile(dest_dir) or os.path.islink(dest_dir):
+        os.remove(dest_dir)
+    os.makedirs(dest_dir, exist_ok=True)
+
+    # One listing per directory; DirEntry types are free and each stat is taken at most once
+    with os.scandir(source_dir) as iterator:
+        source_entries = {entry.name: entry for entry in iterator}
+    with os.scandir(dest_dir) as iterator:
+        dest_entries = {entry.name: entry for entry in iterator}
+    for item in sorted(set(dest_entries) - set(source_entries)):
+        dest_item_path = dest_entries[item].path
+        print(f"Removing stale file: {dest_item_path}")
+        if dest_entries[item].is_dir(follow_symlinks=False):
+            shutil.rmtree(dest_item_path)
+        else:
+            os.remove(dest_item_path)
+        stats.removed += 1
+        stats.changed.append(os.path.join(source_dir, item))
+
+    for item in sorted(source_entries):
+        source_entry = source_entries[item]
+        source_item_path = source_entry.path
+        dest_item_path = os.path.join(dest_dir, item)
+        dest_entry = dest_entries.get(item)
+
+        if source_entry.is_file():
+            if dest_entry is not None and dest_entry.is_dir():
+                shutil.rmtree(dest_item_path)
+                dest_entry = None
+            if dest_entry is not None and is_up_to_date(source_item_path, dest_item_path, use_hash,
+                                                        source_entry.stat(), dest_entry.stat()):
+                stats.unchanged += 1
+                continue
+            print(f"Copying file: {source_item_path} to {dest_item_path}")
+            copy_file(source_item_path, dest_item_path, link)
+            stats.copied += 1
+            stats.changed.append(source_item_path)
+        else:
+            sync_static_files(source_item_path, dest_item_path, use_hash, link, stats)
+    return stats
@@ -0,0 +1,76 @@
+import os
+import re
+from typing import Callable, Dict, List, Tuple
+
+_SLOT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class TemplateError(Exception):
+    """Raised when a template refers to a slot the render context does not provide."""
+
+
+def rewrite_root_urls(html: str, base_path: str) -> str:
+    """Prefixes root-relative href and src attributes with the base path the site is served from."""
+    if base_path == "/":
+        return html
+    return html.replace('href="/', f'href="{base_path}').replace('src="/', f'src="{base_path}')
+
+
+class Template:
+    """A template parsed once into a list of literal and slot segments.
+
+    Slots are written as {{ name }}. Rendering walks the segments a single time, so a page costs one
+    pass over the template no matter how many variables it has.
+    """
+    def __init__(self, source: str, base_path: str = "/"):
+        self.segments: List[Tuple[bool, str]] = []
+        position = 0
+        for match in _SLOT.finditer(source):
+            if match.start() > position:
+                self.segments.append((False, rewrite_root_urls(source[position:match.start()], base_path)))
+            self.segments.append((True, match.group(1)))
+            position = match.end()
+        if position < len(source):
+            self.segments.append((False, rewrite_root_urls(source[position:], base_path)))
+        self.slots = {name for is_slot, name in self.segments if is_slot}
+
+    def render_to(self, write: Callable[[str], object], context: Dict[str, object]):
+        """Writes the filled template to write.
+
+        A slot value with a render_to method (such as an HTMLNode) is streamed into write, a callable is
+        called with write, and anything else is written as a string.
+        """
+        for is_slot, text in self.segments:
+            if not is_slot:
+                write(text)
+                continue
+            if text not in context:
+                raise TemplateError(f"Unknown template slot: {{{{ {text} }}}}")
+            value = context[text]
+            if hasattr(value, "render_to"):
+                value.render_to(write)
+            elif callable(value):
+                value(write)
+            else:
+                write(str(value))
+
+    def render(self, context: Dict[str, object]) -> str:
+        parts = []
+        self.render_to(parts.append, context)
+        return "".join(parts)
+
+
+_template_cache: Dict[Tuple[str, str], Tuple[Tuple[int, int], Template]] = {}
+
+
+def load_template(path: str, base_path: str = "/") -> Template:
+    """Returns the parsed template at path, re-reading it only when the file changed on disk."""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get((path, base_path))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, 'r') as f:
+        template = Template(f.read(), base_path)
+    _template_cache[(path, base_path)] = (signature, template)
+    return template
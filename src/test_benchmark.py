@@ -0,0 +1,41 @@
+import json
+import os
+import tempfile
+import unittest
+
+import front_matter
+import main
+import mapped_source
+from benchmark import (INLINE_SAMPLE, chained_text_to_textnodes, compare, load_results, make_paragraph, save_results,
+                       simulated_io_latency)
+from markdown_parser import text_to_textnodes
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_compare_flags_regressions_above_threshold(self):
+        baseline = {"a/build": 1.0, "b/build": 1.0, "c/build": 1.0}
+        results = {"a/build": 1.1, "b/build": 1.5, "c/build": 0.5, "d/build": 9.0}
+        self.assertEqual(compare(results, baseline, 0.2), [("b/build", 1.0, 1.5)])
+
+    def test_results_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.json")
+            save_results(path, {"a/build": 0.5}, 0.25)
+            self.assertEqual(load_results(path), {"a/build": 0.5})
+            with open(path) as f:
+                self.assertEqual(json.load(f)["scale"], 0.25)
+
+    def test_simulated_io_latency_is_undone(self):
+        modules = (main, mapped_source, front_matter)
+        with simulated_io_latency(0):
+            self.assertTrue(all("open" in vars(module) for module in modules))
+        self.assertFalse(any("open" in vars(module) for module in modules))
+
+    def test_reference_pipeline_matches(self):
+        self.assertEqual(len(make_paragraph(5000)), 5000)
+        paragraph = make_paragraph(len(INLINE_SAMPLE) * 10)
+        self.assertEqual(chained_text_to_textnodes(paragraph), text_to_textnodes(paragraph))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+from corpus import CORPORA, CorpusGenerator, generate_corpus, write_corpus
+from markdown_parser import extract_title, markdown_to_html_node
+
+
+class TestCorpus(unittest.TestCase):
+    def test_same_seed_same_corpus(self):
+        self.assertEqual(generate_corpus("small-pages", 0.05), generate_corpus("small-pages", 0.05))
+        self.assertNotEqual(generate_corpus("small-pages", 0.05, seed=1), generate_corpus("small-pages", 0.05))
+
+    def test_every_kind_renders(self):
+        for kind in CORPORA:
+            documents = generate_corpus(kind, 0.02)
+            self.assertGreaterEqual(len(documents), 1)
+            for path, markdown in documents.items():
+                self.assertTrue(path.endswith("index.md"))
+                self.assertEqual(extract_title(markdown).split()[0], kind)
+                self.assertTrue(markdown_to_html_node(markdown).to_html().startswith("<div><h1>"))
+
+    def test_deep_nesting_paths_are_unique_and_deep(self):
+        documents = generate_corpus("deep-nesting", 1)
+        self.assertEqual(len(documents), CORPORA["deep-nesting"][0])
+        self.assertEqual(max(path.count(os.sep) for path in documents), 31)
+
+    def test_code_block(self):
+        block = CorpusGenerator().code_block(3)
+        self.assertTrue(block.startswith("```\n") and block.endswith("\n```"))
+        self.assertEqual(block.count("\n"), 4)
+
+    def test_write_corpus(self):
+        documents = generate_corpus("huge-pages", 0.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            write_corpus(tmp, documents)
+            for path, markdown in documents.items():
+                with open(os.path.join(tmp, path)) as f:
+                    self.assertEqual(f.read(), markdown)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from depgraph import DependencyGraph, resolve_url
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = lambda *parts: os.path.join(self.tmp.name, *parts)
+        for relative in (("content", "index.md"), ("content", "blog", "index.md"), ("content", "about.md"),
+                         ("static", "images", "logo.png"), ("static", "index.css")):
+            os.makedirs(os.path.dirname(self.path(*relative)), exist_ok=True)
+            with open(self.path(*relative), 'w') as f:
+                f.write("x")
+        self.graph = DependencyGraph(self.path("cache", "depgraph.json"), self.path("content"), self.path("static"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resolve_url(self):
+        content, static = self.path("content"), self.path("static")
+        self.assertEqual(resolve_url("/blog", content, static), self.path("content", "blog", "index.md"))
+        self.assertEqual(resolve_url("/blog/#top", content, static), self.path("content", "blog", "index.md"))
+        self.assertEqual(resolve_url("/about", content, static), self.path("content", "about.md"))
+        self.assertEqual(resolve_url("/", content, static), self.path("content", "index.md"))
+        self.assertEqual(resolve_url("/images/logo.png", content, static), self.path("static", "images", "logo.png"))
+        self.assertEqual(resolve_url("/static/index.css", content, static), self.path("static", "index.css"))
+        for url in ("https://example.com/blog", "//cdn/blog", "blog", "/missing"):
+            self.assertIsNone(resolve_url(url, content, static))
+
+    def test_rebuild_set(self):
+        index = self.path("content", "index.md")
+        blog = self.path("content", "blog", "index.md")
+        self.graph.record(index, self.path("template.html"), ["/blog", "/images/logo.png", "/", "https://x.org"])
+        self.graph.record(blog, self.path("template.html"), [])
+        self.assertEqual(self.graph.pages[index]["pages"], [blog])
+        self.assertEqual(self.graph.rebuild_set([blog]),
+                         {blog: "source changed", index: f"linked page {blog} changed"})
+        self.assertEqual(self.graph.rebuild_set([self.path("static", "images", "logo.png")]),
+                         {index: f"asset {self.path('static', 'images', 'logo.png')} changed"})
+        self.assertEqual(set(self.graph.rebuild_set([self.path("template.html")])), {index, blog})
+        self.assertEqual(self.graph.rebuild_set([self.path("static", "index.css")]), {})
+
+    def test_save_and_load(self):
+        index = self.path("content", "index.md")
+        self.graph.record(index, self.path("template.html"), ["/about"])
+        self.graph.save()
+        loaded = DependencyGraph.load(self.graph.path, self.path("content"), self.path("static"))
+        self.assertEqual(loaded.pages, self.graph.pages)
+        self.assertEqual(loaded.dependents(self.path("content", "about.md")), {index: "pages"})
+
+    def test_load_missing_or_outdated(self):
+        self.assertEqual(DependencyGraph.load(self.path("missing.json")).pages, {})
+        with open(self.path("old.json"), 'w') as f:
+            f.write('{"version": 0, "pages": {"a": {}}}')
+        self.assertEqual(DependencyGraph.load(self.path("old.json")).pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+import unittest
+
+from fragment_cache import FragmentCache
+from main import generate_pages_recursively
+from markdown_parser import PARSER_VERSION
+
+BLOCK = "A paragraph with **bold** text that is long enough to be cached. " * 4
+
+
+class TestFragmentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "fragments")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        cache = FragmentCache(self.root)
+        self.assertIsNone(cache.get(BLOCK))
+        cache.put(BLOCK, "<p>html</p>")
+        self.assertEqual(cache.get(BLOCK), "<p>html</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_layout_is_versioned_and_content_addressed(self):
+        cache = FragmentCache(self.root)
+        cache.put(BLOCK, "<p>html</p>")
+        key = cache.key(BLOCK)
+        self.assertEqual(cache.path_for(key), os.path.join(self.root, f"v{PARSER_VERSION}", key[:2], f"{key}.html"))
+        self.assertTrue(os.path.isfile(cache.path_for(key)))
+        self.assertEqual(FragmentCache(self.root).get(BLOCK), "<p>html</p>")
+
+    def test_namespaces_do_not_collide(self):
+        FragmentCache(self.root, namespace="a").put(BLOCK, "<p>a</p>")
+        self.assertIsNone(FragmentCache(self.root, namespace="b").get(BLOCK))
+
+    def test_min_block_size(self):
+        cache = FragmentCache(self.root)
+        self.assertFalse(cache.accepts("short"))
+        self.assertTrue(cache.accepts(BLOCK))
+
+    def test_evicts_least_recently_used(self):
+        cache = FragmentCache(self.root, max_bytes=2500)
+        blocks = [f"{BLOCK} {i}" for i in range(3)]
+        for block in blocks:
+            cache.put(block, "x" * 1000)
+            time.sleep(0.01)
+        self.assertLessEqual(cache.disk_usage(), 2500)
+        self.assertIsNone(cache.get(blocks[0]))
+        self.assertIsNotNone(cache.get(blocks[2]))
+
+    def test_warm_build_uses_cache_and_matches_cold_build(self):
+        content = os.path.join(self.tmp.name, "content")
+        os.makedirs(content)
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, 'w') as f:
+            f.write("{{ Title }}{{ Content }}")
+        with open(os.path.join(content, "index.md"), 'w') as f:
+            f.write(f"# Title\n\n{BLOCK}\n\n- short\n\n{BLOCK}")
+
+        outputs = []
+        for name in ("plain", "cold", "warm"):
+            cache = None if name == "plain" else FragmentCache(self.root)
+            dest = os.path.join(self.tmp.name, name)
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursively(content, template, dest, "/", fragment_cache=cache)
+            with open(os.path.join(dest, "index.html")) as f:
+                outputs.append(f.read())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import io
+import os
+import tempfile
+import unittest
+
+from front_matter import (FrontMatterError, parse_front_matter, read_front_matter, split_front_matter,
+                          split_front_matter_buffer, template_value)
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_yaml_subset(self):
+        lines = ["title: Hello # comment\n", "draft: true\n", "count: 3\n", "ratio: 1.5\n", "date: 2024-05-01\n",
+                 "\n", "# a comment line\n", "tags:\n", "  - one\n", '  - "two, three"\n', "inline: [a, 'b', 4]\n",
+                 "empty:\n", "quoted: \"say \\\"hi\\\"\"\n"]
+        self.assertEqual(parse_front_matter(lines, "yaml"), {
+            "title": "Hello", "draft": True, "count": 3, "ratio": 1.5, "date": "2024-05-01",
+            "tags": ["one", "two, three"], "inline": ["a", "b", 4], "empty": None, "quoted": 'say "hi"'})
+
+    def test_toml_subset(self):
+        lines = ['title = "Hello"\n', "draft = false\n", "date = 2024-05-01T10:00:00Z\n",
+                 'tags = ["a", "b"] # comment\n', "template = 'post.html'\n"]
+        self.assertEqual(parse_front_matter(lines, "toml"), {
+            "title": "Hello", "draft": False, "date": "2024-05-01T10:00:00Z", "tags": ["a", "b"],
+            "template": "post.html"})
+
+    def test_errors_name_the_line(self):
+        for lines, syntax, message in ((["title = Hello\n"], "toml", "line 2: strings must be quoted"),
+                                       (["a: 1\n", "  b: 2\n"], "yaml", "line 3: nested values"),
+                                       (["tags: [a, [b]]\n"], "yaml", "nested lists"),
+                                       (['title: "open\n'], "yaml", "unterminated string"),
+                                       (["just text\n"], "yaml", "expected key: value")):
+            with self.assertRaisesRegex(FrontMatterError, message):
+                parse_front_matter(lines, syntax)
+
+    def test_split_leaves_the_body(self):
+        front_matter, lines = split_front_matter(io.StringIO("---\ntitle: T\n---\n# Heading\n\nBody\n"))
+        self.assertEqual((front_matter, "".join(lines)), ({"title": "T"}, "# Heading\n\nBody\n"))
+        front_matter, lines = split_front_matter(io.StringIO("# Heading\n---\n"))
+        self.assertEqual((front_matter, "".join(lines)), ({}, "# Heading\n---\n"))
+        self.assertEqual(split_front_matter(io.StringIO(""))[0], {})
+        with self.assertRaisesRegex(FrontMatterError, "never closed"):
+            split_front_matter(io.StringIO("+++\ntitle = 'T'\n"))
+
+    def test_buffer_split_matches_text_split(self):
+        for text in ("---\ntitle: Ünïcode\n---\nbody", "+++\nn = 1\n+++", "---\n---\n\n# T", "# T\n\nbody",
+                     "----\nnot: front matter\n", ""):
+            front_matter, lines = split_front_matter(io.StringIO(text))
+            data = text.encode()
+            buffer_front_matter, offset = split_front_matter_buffer(data)
+            self.assertEqual((buffer_front_matter, data[offset:].decode()), (front_matter, "".join(lines)), text)
+
+    def test_read_front_matter_stops_at_header(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            with open(path, 'wb') as f:
+                # The body is not valid UTF-8, so reading past the header would fail
+                f.write(b"---\ndraft: true\n---\n" + b"\n" * (1 << 16) + b"\xff\xfe")
+            self.assertEqual(read_front_matter(path), {"draft": True})
+
+    def test_template_value(self):
+        self.assertEqual([template_value(value) for value in (None, True, 3, ["a", 1])], ["", "true", "3", "a, 1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from fswalk import TreeSnapshot, iter_tree
+
+OLD_NS = 10**18
+
+
+class TestFsWalk(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.path = lambda *parts: os.path.join(self.root, *parts)
+        for relative in (("b.md",), ("a", "z.md"), ("a", "y", "x.md"), ("a-b.md",)):
+            self.write(self.path(*relative), "x")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def age_directories(self):
+        """Moves every directory mtime far into the past, out of the racy window of the next scan."""
+        for dirpath, _, _ in os.walk(self.root):
+            os.utime(dirpath, ns=(OLD_NS, OLD_NS))
+
+    def test_iter_tree_depth_first_by_name(self):
+        self.assertEqual([os.path.relpath(entry.path, self.root) for entry in iter_tree(self.root)],
+                         [os.path.join("a", "y", "x.md"), os.path.join("a", "z.md"), "a-b.md", "b.md"])
+        self.assertEqual(list(iter_tree(self.path("missing"))), [])
+
+    def test_snapshot_matches_walk_order_and_stats(self):
+        snapshot = TreeSnapshot.scan(self.root)
+        self.assertEqual(snapshot.paths(".md"), [entry.path for entry in iter_tree(self.root)])
+        stat = os.stat(self.path("b.md"))
+        self.assertEqual(snapshot.stat(self.path("b.md")), (stat.st_size, stat.st_mtime_ns, stat.st_ino))
+
+    def test_diff(self):
+        before = TreeSnapshot.scan(self.root)
+        self.write(self.path("a", "z.md"), "longer")
+        self.write(self.path("a", "new.md"), "x")
+        os.remove(self.path("b.md"))
+        after = TreeSnapshot.scan(self.root, before)
+        self.assertEqual(before.diff(after), ({os.path.join("a", "new.md")}, {"b.md"}, {os.path.join("a", "z.md")}))
+        self.assertEqual(before.changed_paths(after),
+                         {self.path("a", "new.md"), self.path("b.md"), self.path("a", "z.md")})
+
+    def test_unchanged_directories_are_not_listed_again(self):
+        self.age_directories()
+        first = TreeSnapshot.scan(self.root)
+        self.assertEqual(first.listed, 3)
+        self.write(self.path("a", "y", "x.md"), "edited in place")
+        os.utime(self.path("a", "y"), ns=(OLD_NS, OLD_NS))
+        second = TreeSnapshot.scan(self.root, first)
+        self.assertEqual(second.listed, 0)
+        self.assertEqual(first.diff(second), (set(), set(), {os.path.join("a", "y", "x.md")}))
+
+        self.write(self.path("a", "y", "w.md"), "x")
+        third = TreeSnapshot.scan(self.root, second)
+        self.assertEqual(third.listed, 1)
+        self.assertIn(os.path.join("a", "y", "w.md"), third.files)
+
+    def test_recently_modified_directories_are_listed_again(self):
+        first = TreeSnapshot.scan(self.root)
+        self.assertEqual(TreeSnapshot.scan(self.root, first).listed, 3)
+
+    def test_save_and_load(self):
+        self.age_directories()
+        snapshot = TreeSnapshot.scan(self.root)
+        snapshot.save(self.path("cache", "snapshot.json"))
+        loaded = TreeSnapshot.load(self.path("cache", "snapshot.json"), self.root)
+        self.assertEqual(loaded.files, snapshot.files)
+        # Only the root, which gained cache/, and cache/ itself are listed
+        self.assertEqual(TreeSnapshot.scan(self.root, loaded).listed, 2)
+        self.assertEqual(TreeSnapshot.load(self.path("cache", "snapshot.json"), self.path("a")).files, {})
+        self.assertEqual(TreeSnapshot.load(self.path("missing.json"), self.root).files, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,5 @@
+import io
+
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
 import unittest
@@ -72,5 +74,62 @@ class TestHTMLNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             ParentNode(None, [LeafNode("p", "test")]).to_html()
 
+    def test_parent_children_none_error(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", None).to_html()
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_leaf_and_parent_fields(self):
+        leaf = LeafNode("a", "x", {"href": "/"})
+        self.assertEqual((leaf.tag, leaf.value, leaf.children, leaf.props), ("a", "x", None, {"href": "/"}))
+        parent = ParentNode("p", [leaf])
+        self.assertEqual((parent.tag, parent.value, parent.children, parent.props), ("p", None, [leaf], None))
+        self.assertEqual(repr(parent), "HTMLNode(p, None, [HTMLNode(a, x, None, {'href': '/'})], None)")
+
+    # Streaming rendering testing
+    def test_iter_html_fragments(self):
+        parent = ParentNode("ul", [ParentNode("li", [LeafNode("b", "one")]), LeafNode("li", "two")])
+        self.assertEqual(list(parent.iter_html()), ["<ul>", "<li>", "<b>one</b>", "</li>", "<li>two</li>", "</ul>"])
+
+    def test_render_to_string_io(self):
+        parent = ParentNode("p", [LeafNode(None, "a "), LeafNode("a", "link", {"href": "/x"})], {"class": "c"})
+        buffer = io.StringIO()
+        parent.render_to(buffer.write)
+        self.assertEqual(buffer.getvalue(), parent.to_html())
+        self.assertEqual(buffer.getvalue(), '<p class="c">a <a href="/x">link</a></p>')
+
+    def test_render_deep_nesting(self):
+        node = LeafNode(None, "deep")
+        for _ in range(50000):
+            node = ParentNode("blockquote", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<blockquote>" * 3))
+        self.assertEqual(len(html), 50000 * len("<blockquote></blockquote>") + len("deep"))
+
+    def test_render_lazy_children(self):
+        parent = ParentNode("ol", (LeafNode("li", str(i)) for i in range(3)))
+        self.assertEqual(parent.to_html(), "<ol><li>0</li><li>1</li><li>2</li></ol>")
+
+    def test_url_resolver_only_touches_url_props(self):
+        resolver = lambda url: "/base" + url
+        parent = ParentNode("p", [
+            LeafNode("a", "link", {"href": "/a", "title": "/not-a-url"}),
+            LeafNode("img", "", {"src": "/b.png"}),
+            LeafNode("code", 'href="/c"'),
+        ], {"class": "/x"})
+        self.assertEqual(parent.to_html(resolver),
+                         '<p class="/x"><a href="/base/a" title="/not-a-url">link</a><img src="/base/b.png"></img>'
+                         '<code>href="/c"</code></p>')
+        self.assertNotIn("/base", parent.to_html())
+
+    def test_url_resolver_maps_every_srcset_url(self):
+        node = LeafNode("img", "", {"src": "/a.png", "srcset": "/a-480w.png 480w, /a.png 960w, https://x/y.png"})
+        self.assertEqual(node.to_html(lambda url: "/base" + url if url.startswith("/") else url),
+                         '<img src="/base/a.png" srcset="/base/a-480w.png 480w, /base/a.png 960w, https://x/y.png">'
+                         '</img>')
+
 if __name__ == "__main__":
     unittest.main()
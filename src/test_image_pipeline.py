@@ -0,0 +1,112 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import png_codec
+from image_pipeline import ImagePipeline
+from png_codec import Image
+
+
+def write_png(path, width, height, shade=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = [bytes((x + y + shade) % 256 for x in range(width) for _ in range(3)) for y in range(height)]
+    with open(path, 'wb') as f:
+        f.write(png_codec.encode(Image(width, height, 3, rows)))
+    # Old enough for its digest to be remembered
+    os.utime(path, ns=(10**18, 10**18))
+
+
+class TestImagePipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = lambda *parts: os.path.join(self.tmp.name, *parts)
+        write_png(self.path("static", "images", "photo.png"), 40, 20)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pipeline(self):
+        return ImagePipeline.load(self.path("cache"), static_dir=self.path("static"),
+                                  output_dir=self.path("docs", "assets"), widths=(10, 20, 80))
+
+    def props(self, pipeline, url):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return pipeline.props(url)
+
+    def published(self):
+        return sorted(os.listdir(self.path("docs", "assets", "images")))
+
+    def test_png_gets_fingerprinted_names_and_smaller_copies(self):
+        pipeline = self.pipeline()
+        props = self.props(pipeline, "/images/photo.png")
+        fingerprint = pipeline.key(pipeline.digest(self.path("static", "images", "photo.png")))[:12]
+        src = f"/assets/images/photo.{fingerprint}.png"
+        self.assertEqual(props, {"src": src, "width": "40", "height": "20",
+                                 "srcset": f"/assets/images/photo.{fingerprint}-10w.png 10w, "
+                                           f"/assets/images/photo.{fingerprint}-20w.png 20w, {src} 40w"})
+        self.assertEqual(self.published(), [f"photo.{fingerprint}-10w.png", f"photo.{fingerprint}-20w.png",
+                                            f"photo.{fingerprint}.png"])
+        with open(self.path("docs", "assets", "images", f"photo.{fingerprint}-10w.png"), 'rb') as f:
+            self.assertEqual(png_codec.read_size(f.read()), (10, 5))
+        self.assertEqual(self.props(pipeline, "/static/images/photo.png"), props)
+        self.assertEqual(pipeline.processed, 1)
+
+    def test_cached_images_are_not_processed_again(self):
+        pipeline = self.pipeline()
+        props = self.props(pipeline, "/images/photo.png")
+        pipeline.save()
+        os.rename(self.path("docs"), self.path("old-docs"))
+        pipeline = self.pipeline()
+        self.assertEqual((self.props(pipeline, "/images/photo.png"), pipeline.processed), (props, 0))
+        self.assertEqual(len(self.published()), 3)
+
+    def test_other_formats_are_only_fingerprinted(self):
+        os.makedirs(self.path("static", "icons"))
+        with open(self.path("static", "icons", "logo.svg"), 'w') as f:
+            f.write("<svg/>")
+        props = self.props(self.pipeline(), "/icons/logo.svg?v=1")
+        self.assertRegex(props["src"], r"^/assets/icons/logo\.[0-9a-f]{12}\.svg$")
+        self.assertEqual(list(props), ["src"])
+        for url in ("https://example.com/a.png", "//cdn/a.png", "/images/missing.png", "/images/../../x.png",
+                    "relative.png"):
+            self.assertIsNone(self.props(self.pipeline(), url), url)
+
+    def test_edited_image_is_scanned_as_changed_and_old_names_pruned(self):
+        pipeline = self.pipeline()
+        source = self.path("static", "images", "photo.png")
+        self.assertEqual(pipeline.scan(), [source])
+        old = self.props(pipeline, "/images/photo.png")
+        self.assertEqual(pipeline.scan(), [])
+        write_png(source, 40, 20, shade=1)
+        os.utime(source, ns=(10**18 + 1, 10**18 + 1))
+        self.assertEqual(pipeline.scan(), [source])
+        new = self.props(pipeline, "/images/photo.png")
+        self.assertNotEqual(new["src"], old["src"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            removed = pipeline.prune()
+        self.assertEqual(len(removed), 3)
+        self.assertEqual(len(self.published()), 3)
+        os.remove(source)
+        self.assertEqual(pipeline.scan(), [source])
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline.prune()
+        self.assertFalse(os.path.exists(self.path("docs", "assets", "images")))
+
+    def test_unsupported_png_is_published_unresized(self):
+        with open(self.path("static", "images", "photo.png"), 'r+b') as f:
+            data = bytearray(f.read())
+            # Flag the image as interlaced
+            data[28] = 1
+            f.seek(0)
+            f.write(data)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            props = self.pipeline().props("/images/photo.png")
+        self.assertIn("interlaced images are not supported", output.getvalue())
+        self.assertEqual((sorted(props), props["width"]), (["height", "src", "width"], "40"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,300 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from depgraph import DependencyGraph
+from fragment_cache import FragmentCache
+from image_pipeline import ImagePipeline
+from main import build_pages_pipelined, collect_pages, generate_pages_recursively, PageBuildError, write_output
+from manifest import BuildManifest
+from search_index import SearchIndex
+from site_metadata import MetadataStore
+from markdown_parser import markdown_to_html_node
+from test_image_pipeline import write_png
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, 'w') as f:
+            f.write('<title>{{ Title }}</title><link href="/index.css" />{{ Content }}')
+        for i in range(12):
+            self.write_page(os.path.join("blog", f"post{i:02}", "index.md"),
+                            f"# Post {i}\n\nSome **bold** text and a [link](/blog/post{i:02}).\n\n- one\n- two")
+        self.write_page("index.md", "# Home\n\n![logo](/images/logo.png)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_page(self, relative_path, text):
+        path = os.path.join(self.content, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def build(self, dest_name, jobs, io_threads=0):
+        dest = os.path.join(self.root, dest_name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(self.content, self.template, dest, "/repo/", jobs=jobs, io_threads=io_threads)
+        return dest
+
+    def read_tree(self, root):
+        files = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, 'rb') as f:
+                    files[os.path.relpath(path, root)] = f.read()
+        return files
+
+    def test_collect_pages_sorted(self):
+        pages = collect_pages(self.content, "docs")
+        self.assertEqual(pages[0], (os.path.join(self.content, "blog", "post00", "index.md"),
+                                    os.path.join("docs", "blog", "post00", "index.html")))
+        self.assertEqual(pages[-1], (os.path.join(self.content, "index.md"), os.path.join("docs", "index.html")))
+        self.assertEqual(pages, sorted(pages))
+
+    def test_parallel_output_identical_to_serial(self):
+        serial = self.read_tree(self.build("serial", jobs=1))
+        parallel = self.read_tree(self.build("parallel", jobs=3))
+        self.assertEqual(len(serial), 13)
+        self.assertEqual(serial, parallel)
+
+    def test_pipelined_output_identical_to_serial(self):
+        serial = self.read_tree(self.build("serial", jobs=1))
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        dest = os.path.join(self.root, "pipelined")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(self.content, self.template, dest, "/repo/", manifest, io_threads=2)
+        self.assertEqual(serial, self.read_tree(dest))
+        self.assertEqual(len(manifest.entries), 13)
+
+    def test_pipeline_bounds_pages_in_flight(self):
+        jobs = [(os.path.join(self.content, "index.md"), self.template, os.path.join(self.root, "out", f"{i}.html"), "/")
+                for i in range(20)]
+        built = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_pages_pipelined(jobs, lambda index, result: built.append((index, result.changed)), io_threads=2, max_in_flight=3)
+        self.assertEqual(built, [(index, True) for index in range(20)])
+        self.assertEqual(len(os.listdir(os.path.join(self.root, "out"))), 20)
+
+    def rebuild_stats(self, dest, jobs=1, io_threads=0):
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = generate_pages_recursively(self.content, self.template, dest, "/repo/", jobs=jobs,
+                                               io_threads=io_threads)
+        return stats.changed, stats.unchanged, stats.skipped
+
+    def test_identical_output_is_not_rewritten(self):
+        dest = self.build("docs", jobs=1)
+        index = os.path.join(dest, "index.html")
+        os.utime(index, ns=(0, 0))
+        self.write_page(os.path.join("blog", "post00", "index.md"), "# Post 0\n\nEdited")
+        self.assertEqual(self.rebuild_stats(dest), (1, 12, 0))
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+        self.assertFalse([name for name in os.listdir(os.path.join(dest, "blog", "post00")) if name.endswith(".tmp")])
+
+    def test_unchanged_outputs_counted_in_every_mode(self):
+        dest = self.build("docs", jobs=1)
+        self.assertEqual(self.rebuild_stats(dest, jobs=2), (0, 13, 0))
+        self.assertEqual(self.rebuild_stats(dest, io_threads=2), (0, 13, 0))
+
+    def test_page_matches_markdown_to_html_node(self):
+        markdown = "Intro before the title\n\n# Title\n\n> quote\n> more\n\n```\ncode\n```\n\n1. a\n2. b\n"
+        self.write_page("index.md", markdown)
+        dest = self.build("docs", jobs=1)
+        with open(os.path.join(dest, "index.html")) as f:
+            html = f.read()
+        expected = markdown_to_html_node(markdown).to_html().replace('href="/', 'href="/repo/')
+        self.assertEqual(html, f'<title>Title</title><link href="/repo/index.css" />{expected}')
+
+    def test_base_path_leaves_code_samples_alone(self):
+        self.write_page("index.md", '# Title\n\n```\n<a href="/x">x</a>\n```\n\n[y](/y) ![z](/z.png)')
+        dest = self.build("docs", jobs=1)
+        with open(os.path.join(dest, "index.html")) as f:
+            html = f.read()
+        self.assertIn('<code><a href="/x">x</a>\n</code>', html)
+        self.assertIn('<a href="/repo/y">y</a>', html)
+        self.assertIn('src="/repo/z.png"', html)
+
+    def test_front_matter_title_template_and_variables(self):
+        with open(os.path.join(self.root, "post.html"), 'w') as f:
+            f.write("<title>{{ Title }}</title><time>{{ date }}</time><p>{{ tags }}</p>{{ Content }}")
+        self.write_page("index.md", "---\ntitle: Front Title\ntemplate: post.html\ndate: 2024-05-01\n"
+                                    "tags: [a, b]\n---\nNo heading here")
+        dest = self.build("docs", jobs=1)
+        with open(os.path.join(dest, "index.html")) as f:
+            self.assertEqual(f.read(), "<title>Front Title</title><time>2024-05-01</time><p>a, b</p>"
+                                       "<div><p>No heading here</p></div>")
+
+    def test_drafts_are_skipped_and_their_outputs_removed(self):
+        dest = os.path.join(self.root, "docs")
+        manifest_path = os.path.join(self.root, "manifest.json")
+
+        def build(drafts=False):
+            manifest = BuildManifest.load(manifest_path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = generate_pages_recursively(self.content, self.template, dest, "/", manifest, drafts=drafts)
+                manifest.remove_stale_outputs(dest)
+            manifest.save()
+            return stats
+
+        build()
+        post = os.path.join(dest, "blog", "post03", "index.html")
+        self.write_page(os.path.join("blog", "post03", "index.md"), "+++\ndraft = true\n+++\n# Post 3")
+        self.assertEqual((build().drafts, os.path.exists(post)), (1, False))
+        self.assertEqual((build(drafts=True).drafts, os.path.exists(post)), (0, True))
+        self.assertEqual((build().drafts, os.path.exists(post)), (1, False))
+
+    def test_invalid_front_matter_fails_the_page(self):
+        self.write_page(os.path.join("blog", "post04", "index.md"), "---\ntitle = wrong syntax\n---\n# T")
+        with self.assertRaises(PageBuildError) as ctx:
+            self.build("docs", jobs=1)
+        self.assertEqual(ctx.exception.source_path, os.path.join(self.content, "blog", "post04", "index.md"))
+
+    def test_dependency_graph_rebuilds_linking_pages(self):
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        graph = DependencyGraph(os.path.join(self.root, "depgraph.json"), self.content, os.path.join(self.root, "static"))
+        self.write_page("about.md", "# About\n\nBack [home](/)")
+
+        def build(**kwargs):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                generate_pages_recursively(self.content, self.template, dest, "/", manifest, graph=graph,
+                                           explain=True, **kwargs)
+            return output.getvalue()
+
+        build()
+        self.write_page("index.md", "# Home\n\nNew home")
+        output = build()
+        self.assertEqual(output.count("Generating page"), 2)
+        self.assertIn(f"Rebuilding {os.path.join(self.content, 'index.md')}: source changed", output)
+        self.assertIn(f"Rebuilding {os.path.join(self.content, 'about.md')}: linked page", output)
+
+        os.remove(os.path.join(self.content, "index.md"))
+        output = build()
+        self.assertEqual(output.count("Generating page"), 1)
+        self.assertNotIn(os.path.join(self.content, "index.md"), graph.pages)
+
+    def test_search_index_same_with_warm_fragment_cache(self):
+        self.write_page("index.md", "# Home\n\n" + "A long paragraph about **hobbits** and [rivendell](/r). " * 10)
+        cache = FragmentCache(os.path.join(self.root, "fragments"), min_block_size=0)
+        dest = os.path.join(self.root, "docs")
+        indexes = []
+        for run in range(2):
+            index = SearchIndex(os.path.join(self.root, f"search{run}.json"), os.path.join(dest, "search"),
+                                base_path="/repo/")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursively(self.content, self.template, dest, "/repo/", fragment_cache=cache,
+                                           search_index=index)
+            indexes.append(index.pages)
+        self.assertGreater(cache.hits, 0)
+        self.assertEqual(indexes[0], indexes[1])
+        home = indexes[0][os.path.join(self.content, "index.md")]
+        self.assertEqual((home["url"], home["title"], home["terms"]["hobbits"]), ("/repo/", "Home", 10))
+        self.assertEqual(indexes[0][os.path.join(self.content, "blog", "post03", "index.md")]["url"],
+                         "/repo/blog/post03/")
+        self.assertEqual(sorted(index.shards()), ["_root", "blog"])
+
+    def test_search_index_recovers_from_failed_build(self):
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        state_path = os.path.join(self.root, "search.json")
+
+        def build():
+            index = SearchIndex.load(state_path, os.path.join(dest, "search"))
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_pages_recursively(self.content, self.template, dest, "/", manifest,
+                                               search_index=index)
+                    index.write(write_output)
+            finally:
+                manifest.save()
+                index.save()
+
+        self.write_page("index.md", "# Home\n\nzulu")
+        build()
+        self.write_page("index.md", "# Home\n\nyankee")
+        self.write_page("zz.md", "no title")
+        with self.assertRaises(PageBuildError):
+            build()
+        os.remove(os.path.join(self.content, "zz.md"))
+        build()
+        with open(os.path.join(dest, "search", "_root.0.json")) as f:
+            terms = json.load(f)
+        self.assertIn("yankee", terms)
+        self.assertNotIn("zulu", terms)
+
+    def test_images_published_in_every_mode(self):
+        write_png(os.path.join(self.root, "static", "images", "logo.png"), 30, 10)
+        self.write_page("about.md", "# About\n\n" + "A long paragraph with a logo. " * 10 + "![logo](/images/logo.png)")
+        cache = FragmentCache(os.path.join(self.root, "fragments"))
+        outputs = []
+        for jobs, io_threads in ((1, 0), (3, 0), (1, 2)):
+            dest = os.path.join(self.root, f"docs-{jobs}-{io_threads}")
+            images = ImagePipeline(os.path.join(self.root, "images"), os.path.join(self.root, "static"),
+                                   os.path.join(dest, "assets"), widths=(15,))
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursively(self.content, self.template, dest, "/repo/", jobs=jobs,
+                                           io_threads=io_threads, fragment_cache=cache, images=images)
+            outputs.append(self.read_tree(dest))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        fingerprint = images.key(images.digest(os.path.join(self.root, "static", "images", "logo.png")))[:12]
+        src = f"/repo/assets/images/logo.{fingerprint}.png"
+        self.assertIn(f'<img src="{src}" alt="logo" srcset="/repo/assets/images/logo.{fingerprint}-15w.png 15w, '
+                      f'{src} 30w" width="30" height="10"></img>', outputs[0]["about.html"].decode())
+        self.assertIn(os.path.join("assets", "images", f"logo.{fingerprint}-15w.png"), outputs[0])
+        # Blocks showing images are never served from the fragment cache
+        self.assertEqual(cache.hits, 0)
+
+    def test_metadata_store_updates_incrementally(self):
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+
+        def build(metadata):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                generate_pages_recursively(self.content, self.template, dest, "/repo/", manifest, metadata=metadata)
+            return output.getvalue()
+
+        metadata = MetadataStore(os.path.join(self.root, "metadata.json"), dest, base_path="/repo/")
+        self.assertEqual(build(metadata).count("Generating page"), 13)
+        self.assertEqual(metadata.pages[os.path.join(self.content, "index.md")]["url"], "/repo/")
+        metadata.save()
+
+        self.write_page(os.path.join("blog", "post05", "index.md"), "# Renamed")
+        os.remove(os.path.join(self.content, "blog", "post07", "index.md"))
+        metadata = MetadataStore.load(os.path.join(self.root, "metadata.json"), dest, base_path="/repo/")
+        self.assertEqual(build(metadata).count("Generating page"), 1)
+        self.assertEqual(len(metadata.pages), 12)
+        self.assertEqual(metadata.pages[os.path.join(self.content, "blog", "post05", "index.md")]["title"], "Renamed")
+        self.assertTrue(metadata.dirty)
+
+        # Pages missing from the store are rebuilt to learn their titles
+        metadata = MetadataStore(os.path.join(self.root, "other.json"), dest, base_path="/repo/")
+        self.assertEqual(build(metadata).count("Generating page"), 12)
+
+    def test_page_without_title_fails(self):
+        self.write_page("index.md", "no title")
+        with self.assertRaises(PageBuildError):
+            self.build("docs", jobs=1)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "docs", "index.html")))
+
+    def test_parallel_error_reports_first_failing_source(self):
+        self.write_page(os.path.join("blog", "post03", "index.md"), "no title here")
+        self.write_page(os.path.join("blog", "post09", "index.md"), "no title either")
+        for jobs, io_threads in ((1, 0), (4, 0), (1, 3)):
+            with self.assertRaises(PageBuildError) as ctx:
+                self.build(f"out{jobs}-{io_threads}", jobs=jobs, io_threads=io_threads)
+            self.assertEqual(ctx.exception.source_path, os.path.join(self.content, "blog", "post03", "index.md"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from manifest import BuildManifest, file_digest
+from main import generate_pages_recursively
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, "cache", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def build(self, force=False):
+        manifest = BuildManifest.load(self.manifest_path, force=force)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(self.content, self.template, self.docs, "/", manifest)
+            manifest.remove_stale_outputs(self.docs)
+        manifest.save()
+        return manifest
+
+    def output_mtimes(self):
+        return {path: os.stat(os.path.join(self.docs, path)).st_mtime_ns
+                for path in ("index.html", os.path.join("blog", "index.html"))}
+
+    def test_file_digest(self):
+        path = os.path.join(self.root, "a.txt")
+        self.write(path, "hello")
+        self.assertEqual(file_digest(path), "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824")
+
+    def test_load_missing_manifest(self):
+        manifest = BuildManifest.load(os.path.join(self.root, "missing.json"))
+        self.assertEqual(manifest.entries, {})
+
+    def test_load_corrupt_manifest(self):
+        self.write(self.manifest_path.replace("cache/", ""), "{not json")
+        manifest = BuildManifest.load(self.manifest_path.replace("cache/", ""))
+        self.assertEqual(manifest.entries, {})
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        before = self.output_mtimes()
+        manifest = self.build()
+        self.assertEqual(before, self.output_mtimes())
+        self.assertEqual(len(manifest.entries), 2)
+
+    def test_changed_source_is_rebuilt(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        self.build()
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertIn("Changed", f.read())
+
+    def test_template_change_invalidates_all(self):
+        manifest = self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        fresh = BuildManifest.load(self.manifest_path)
+        dest = os.path.join(self.docs, "index.html")
+        entry = manifest.entries[dest]
+        self.assertFalse(fresh.is_fresh(dest, entry["source"], entry["source_hash"],
+                                        fresh.template_digest(self.template), "/"))
+
+    def test_base_path_change_invalidates(self):
+        manifest = self.build()
+        dest = os.path.join(self.docs, "index.html")
+        entry = manifest.entries[dest]
+        self.assertTrue(manifest.is_fresh(dest, entry["source"], entry["source_hash"], entry["template_hash"], "/"))
+        self.assertFalse(manifest.is_fresh(dest, entry["source"], entry["source_hash"], entry["template_hash"], "/repo/"))
+
+    def test_stale_reason(self):
+        manifest = self.build()
+        dest = os.path.join(self.docs, "index.html")
+        entry = manifest.entries[dest]
+        args = (entry["source"], entry["source_hash"], entry["template_hash"])
+        self.assertIsNone(manifest.stale_reason(dest, *args, "/"))
+        self.assertEqual(manifest.stale_reason(dest, entry["source"], "other", entry["template_hash"], "/"),
+                         "source changed")
+        self.assertEqual(manifest.stale_reason(dest, entry["source"], entry["source_hash"], "other", "/"),
+                         "template changed")
+        self.assertEqual(manifest.stale_reason(dest, *args, "/repo/"), "base path changed")
+        self.assertEqual(manifest.stale_reason(dest + ".new", *args, "/"), "new page")
+        os.remove(dest)
+        self.assertEqual(manifest.stale_reason(dest, *args, "/"), "output missing")
+
+    def test_source_digest_reused_while_stat_unchanged(self):
+        source = os.path.join(self.content, "index.md")
+        os.utime(source, ns=(10**18, 10**18))
+        manifest = self.build()
+        dest = os.path.join(self.docs, "index.html")
+        stat = os.stat(source)
+        source_stat = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        self.assertEqual(manifest.entries[dest]["source_stat"], list(source_stat))
+        # Same size and mtime: the stored digest is trusted without reading the file
+        self.write(source, "# Home\n\nWelcomE")
+        os.utime(source, ns=(10**18, 10**18))
+        self.assertEqual(manifest.source_digest(dest, source, source_stat), manifest.entries[dest]["source_hash"])
+        self.assertNotEqual(manifest.source_digest(dest, source, (0, 0, 0)), manifest.entries[dest]["source_hash"])
+
+    def test_front_matter_cached_while_stat_unchanged(self):
+        source = os.path.join(self.content, "index.md")
+        self.write(source, "---\ntemplate: template.html\n---\n# Home")
+        os.utime(source, ns=(10**18, 10**18))
+        manifest = self.build()
+        dest = os.path.join(self.docs, "index.html")
+        stat = os.stat(source)
+        source_stat = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        self.assertEqual(manifest.cached_front_matter(dest, source, source_stat), {"template": "template.html"})
+        self.assertIsNone(manifest.cached_front_matter(dest, source, (0, 0, 0)))
+
+    def test_recently_modified_source_stat_not_recorded(self):
+        manifest = self.build()
+        self.assertNotIn("source_stat", manifest.entries[os.path.join(self.docs, "index.html")])
+
+    def test_force_rebuilds_everything(self):
+        manifest = self.build()
+        dest = os.path.join(self.docs, "index.html")
+        entry = manifest.entries[dest]
+        forced = BuildManifest.load(self.manifest_path, force=True)
+        self.assertFalse(forced.is_fresh(dest, entry["source"], entry["source_hash"], entry["template_hash"], "/"))
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        manifest = self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "index.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+        self.assertEqual(list(manifest.entries), [os.path.join(self.docs, "index.html")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from mapped_source import MappedBlockReader, iter_buffer_blocks, open_block_reader
+from markdown_parser import BlockReader, markdown_to_blocks
+
+PIECES = ["\n", "\n\n", " ", "\t", "\xa0", "a", "é", "# ", "#", "```", "- "]
+
+
+class TestMappedSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text, newline=None):
+        path = os.path.join(self.tmp.name, "page.md")
+        with open(path, 'w', encoding="utf-8", newline=newline) as f:
+            f.write(text)
+        return path
+
+    def read(self, path, threshold):
+        with open_block_reader(path, threshold) as reader:
+            blocks = reader.read_until_title()
+            return type(reader), reader.title, blocks + list(reader)
+
+    def test_buffer_blocks_match_markdown_to_blocks(self):
+        rng = random.Random(0)
+        documents = ["", "\n", "\n\n\n", "x\n", "x\n\n", "  \n  ", "a\n\n\nb\n\n\n\n c \n"]
+        documents += ["".join(rng.choice(PIECES) for _ in range(rng.randint(0, 40))) for _ in range(2000)]
+        for markdown in documents:
+            for window in (1, 3, 64 * 1024):
+                self.assertEqual(list(iter_buffer_blocks(markdown.encode(), window)), markdown_to_blocks(markdown),
+                                 (markdown, window))
+
+    def test_mapped_reader_matches_block_reader(self):
+        markdown = "intro\n\n# The   Title  \n\n" + "para  \n  graph é\n\n```\n  code\n```\n\n" * 200
+        path = self.write(markdown)
+        reference = BlockReader(io.StringIO(markdown))
+        expected = reference.read_until_title() + list(reference)
+        self.assertEqual(self.read(path, 0), (MappedBlockReader, "The   Title", expected))
+        self.assertEqual(self.read(path, float("inf")), (BlockReader, "The   Title", expected))
+
+    def test_front_matter_is_split_off_either_way(self):
+        path = self.write("---\ntitle: Front\n---\nbody\n\n# Heading\n")
+        for threshold in (0, float("inf")):
+            with open_block_reader(path, threshold) as reader:
+                blocks = reader.read_until_title()
+                self.assertEqual((reader.front_matter, reader.title, blocks + list(reader)),
+                                 ({"title": "Front"}, "Heading", ["body", "# Heading"]))
+
+    def test_small_empty_and_carriage_return_sources_are_read_as_text(self):
+        self.assertEqual(self.read(self.write("# T\n\nbody\n"), 1024)[0], BlockReader)
+        self.assertEqual(self.read(self.write(""), 0), (BlockReader, None, []))
+        path = self.write("# T\n\nline\none\n\ntwo\n", newline="\r\n")
+        self.assertEqual(self.read(path, 0), (BlockReader, "T", ["# T", "line\none", "two"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 from textnode import TextNode, TextType
 from markdown_parser import *
+import io
 import unittest
 
 
@@ -288,6 +289,40 @@ class TestHTMLNode(unittest.TestCase):
         result = text_to_textnodes(input)
         self.assertEqual(output, result)
 
+    def test_textnodes_match_chained_passes(self):
+        inputs = [
+            "plain text only",
+            "**bold** at start and _italic_ at end",
+            "`code` then ![img](/a.png)![img2](/b.png) and [a](/x)[b](/y)",
+            "an ! exclamation and [brackets] without a url",
+        ]
+        for text in inputs:
+            nodes = [TextNode(text, TextType.TEXT)]
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_link(split_nodes_image(nodes))
+            self.assertEqual(nodes, text_to_textnodes(text))
+
+    def test_textnodes_code_keeps_markup(self):
+        result = text_to_textnodes("run `a_b **c**` now")
+        self.assertEqual([TextNode("run ", TextType.TEXT),
+                          TextNode("a_b **c**", TextType.CODE),
+                          TextNode(" now", TextType.TEXT)], result)
+
+    def test_textnodes_link_url_with_underscore(self):
+        result = text_to_textnodes("see [the docs](https://example.com/a_b_c)")
+        self.assertEqual([TextNode("see ", TextType.TEXT),
+                          TextNode("the docs", TextType.LINK, "https://example.com/a_b_c")], result)
+
+    def test_textnodes_unclosed_delimiters(self):
+        result = text_to_textnodes("a **b _c_")
+        self.assertEqual([TextNode("a **b ", TextType.TEXT), TextNode("c", TextType.ITALIC)], result)
+
+    def test_textnodes_broken_image_is_text(self):
+        result = text_to_textnodes("![alt](/x.png and [ok](/y)")
+        self.assertEqual([TextNode("![alt](/x.png and ", TextType.TEXT), TextNode("ok", TextType.LINK, "/y")], result)
+
     # Test cases for markdown_to_blocks function
     def test_markdown_to_blocks(self):
         md = """
@@ -334,6 +369,31 @@ class TestHTMLNode(unittest.TestCase):
         blocks = markdown_to_blocks(md)
         self.assertEqual(blocks, ["Block 1", "Block 2"])
 
+    def test_iter_blocks_from_file_lines(self):
+        md = "# Title\n\n\n\nfirst   \n  second\n\n\n\n\n- a\n- b\n\n"
+        self.assertEqual(list(iter_blocks(io.StringIO(md))), markdown_to_blocks(md))
+        self.assertEqual(markdown_to_blocks(md), ["# Title", "first\nsecond", "- a\n- b"])
+
+    def test_iter_blocks_is_lazy(self):
+        def lines():
+            yield "# Title\n"
+            yield "\n"
+            yield "body\n"
+            raise AssertionError("read past the requested block")
+        self.assertEqual(next(iter_blocks(lines())), "# Title")
+
+    def test_block_reader_title(self):
+        reader = BlockReader(io.StringIO("intro\n\n# The Title \n\nbody\n\n# Other"))
+        self.assertEqual(reader.read_until_title(), ["intro", "# The Title"])
+        self.assertEqual(reader.title, "The Title")
+        self.assertEqual(list(reader), ["body", "# Other"])
+        self.assertEqual(reader.title, "The Title")
+
+    def test_block_reader_no_title(self):
+        reader = BlockReader(io.StringIO("## Sub\n\ntext"))
+        self.assertEqual(reader.read_until_title(), ["## Sub", "text"])
+        self.assertIsNone(reader.title)
+
     def test_block_to_block_type(self):
         self.assertEqual(block_to_block_type("# Heading level 1"), BlockType.HEADING)
         self.assertEqual(block_to_block_type("## Heading level 2"), BlockType.HEADING)
@@ -414,6 +474,38 @@ This is the same paragraph on a new line
         block = "paragraph"
         self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
+    def test_block_type_dispatch(self):
+        self.assertEqual(block_to_block_type("####### seven"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("#nospace"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("12. twelve"), BlockType.OLIST)
+        self.assertEqual(block_to_block_type("```\nunclosed"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type(""), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_html_node("### Third").to_html(), "<h3>Third</h3>")
+
+    def test_register_block_type(self):
+        import markdown_parser
+        saved = ({char: list(items) for char, items in markdown_parser._CLASSIFIERS_BY_CHAR.items()},
+                 list(markdown_parser._GENERIC_CLASSIFIERS), dict(BLOCK_HANDLERS))
+        try:
+            register_block_type("rule", lambda block: block == "---", lambda block: LeafNode("hr", ""), "-")
+            register_block_type("note", lambda block: block.startswith("NOTE:"),
+                                lambda block: ParentNode("aside", text_to_children(block[5:].strip())))
+            register_block_type("banner", lambda block: block.startswith("# !"),
+                                lambda block: LeafNode("strong", block[3:].strip()))
+            self.assertEqual(block_to_block_type("---"), "rule")
+            # Classifiers without first_chars specialise built-in types too
+            self.assertEqual(block_to_block_type("# ! Closed"), "banner")
+            self.assertEqual(block_to_block_type("# Open"), BlockType.HEADING)
+            self.assertEqual(block_to_block_type("- item"), BlockType.ULIST)
+            html = markdown_to_html_node("---\n\nNOTE: **careful**\n\n- item").to_html()
+            self.assertEqual(html, "<div><hr></hr><aside><b>careful</b></aside><ul><li>item</li></ul></div>")
+        finally:
+            markdown_parser._CLASSIFIERS_BY_CHAR.clear()
+            markdown_parser._CLASSIFIERS_BY_CHAR.update(saved[0])
+            markdown_parser._GENERIC_CLASSIFIERS[:] = saved[1]
+            BLOCK_HANDLERS.clear()
+            BLOCK_HANDLERS.update(saved[2])
+
     def test_extract_title(self):
         md = "# Title\n\nThis is a paragraph"
         title = extract_title(md)
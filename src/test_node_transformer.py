@@ -1,7 +1,7 @@
 import unittest
 
 from textnode import TextNode, TextType
-from node_transformer import text_node_to_html_node
+from node_transformer import image_props, text_node_to_html_node
 
 
 class TestNodeTransformer(unittest.TestCase):
@@ -32,6 +32,18 @@ class TestNodeTransformer(unittest.TestCase):
         self.assertEqual(html_node.props.get("src"), "https://example.com/image.jpg")
         self.assertEqual(html_node.props.get("alt"), "Alt text")
 
+    def test_image_props_hook(self):
+        node = TextNode("Alt text", TextType.IMAGE, url="/photo.png")
+        token = image_props.set(lambda url: {"src": "/photo.abc.png", "width": "10"} if url == "/photo.png" else None)
+        try:
+            html_node = text_node_to_html_node(node)
+            other = text_node_to_html_node(TextNode("Other", TextType.IMAGE, url="/other.png"))
+        finally:
+            image_props.reset(token)
+        self.assertEqual(html_node.props, {"src": "/photo.abc.png", "alt": "Alt text", "width": "10"})
+        self.assertEqual(other.props, {"src": "/other.png", "alt": "Other"})
+        self.assertEqual(text_node_to_html_node(node).props, {"src": "/photo.png", "alt": "Alt text"})
+
     def test_unknown_type(self):
         node = TextNode("This is unknown", None)
         with self.assertRaises(ValueError):
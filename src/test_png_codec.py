@@ -0,0 +1,103 @@
+import struct
+import unittest
+import zlib
+
+import png_codec
+from png_codec import Image, PNGError
+
+
+def _reference_filter(filter_type, row, previous, bpp):
+    """Straightforward per-byte PNG filter, to check the decoder against every filter type."""
+    out = bytearray()
+    for x, value in enumerate(row):
+        a = row[x - bpp] if x >= bpp else 0
+        b = previous[x]
+        c = previous[x - bpp] if x >= bpp else 0
+        if filter_type == 0:
+            predictor = 0
+        elif filter_type == 1:
+            predictor = a
+        elif filter_type == 2:
+            predictor = b
+        elif filter_type == 3:
+            predictor = (a + b) // 2
+        else:
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            predictor = a if pa <= pb and pa <= pc else b if pb <= pc else c
+        out.append((value - predictor) & 255)
+    return bytes(out)
+
+
+def _png(width, height, depth, color_type, raw, extra=(), interlace=0):
+    header = struct.pack(">IIBBBBB", width, height, depth, color_type, 0, 0, interlace)
+    chunks = [(b"IHDR", header), *extra, (b"IDAT", zlib.compress(raw)), (b"IEND", b"")]
+    return png_codec.SIGNATURE + b"".join(struct.pack(">I", len(body)) + kind + body +
+                                          struct.pack(">I", zlib.crc32(kind + body)) for kind, body in chunks)
+
+
+def _gradient(width, height, channels):
+    return [bytes((x * 7 + y * 13 + channel * 50) % 256 for x in range(width) for channel in range(channels))
+            for y in range(height)]
+
+
+class TestPNGCodec(unittest.TestCase):
+    def test_decodes_every_filter_type(self):
+        rows = _gradient(9, 10, 3)
+        previous = bytes(len(rows[0]))
+        raw = b""
+        for y, row in enumerate(rows):
+            raw += bytes((y % 5,)) + _reference_filter(y % 5, row, previous, 3)
+            previous = row
+        image = png_codec.decode(_png(9, 10, 8, 2, raw))
+        self.assertEqual((image.width, image.height, image.channels, image.rows), (9, 10, 3, rows))
+
+    def test_round_trip(self):
+        for channels in (1, 2, 3, 4):
+            image = Image(7, 5, channels, _gradient(7, 5, channels), {b"gAMA": struct.pack(">I", 45455)})
+            decoded = png_codec.decode(png_codec.encode(image))
+            self.assertEqual((decoded.channels, decoded.rows, decoded.chunks), (channels, image.rows, image.chunks))
+
+    def test_palette_and_16_bit(self):
+        palette = (b"PLTE", bytes([255, 0, 0, 0, 255, 0]))
+        image = png_codec.decode(_png(3, 1, 8, 3, b"\0\0\1\0", [palette, (b"tRNS", b"\x80")]))
+        self.assertEqual((image.channels, image.rows), (4, [b"\xff\0\0\x80\0\xff\0\xff\xff\0\0\x80"]))
+        image = png_codec.decode(_png(2, 1, 16, 0, b"\0\x12\x34\xab\xcd"))
+        self.assertEqual((image.channels, image.rows), (1, [b"\x12\xab"]))
+
+    def test_transparent_color_becomes_alpha(self):
+        image = png_codec.decode(_png(3, 1, 8, 0, b"\0\x10\x20\x10", [(b"tRNS", b"\0\x10")]))
+        self.assertEqual((image.channels, image.rows), (2, [b"\x10\0\x20\xff\x10\0"]))
+        raw = b"\0" + bytes([1, 2, 3, 1, 2, 4])
+        image = png_codec.decode(_png(2, 1, 8, 2, raw, [(b"tRNS", b"\0\1\0\2\0\3")]))
+        self.assertEqual((image.channels, image.rows), (4, [b"\1\2\3\0\1\2\4\xff"]))
+        # 16-bit samples are compared in full: 0x1234 is transparent, 0x12ff is not
+        image = png_codec.decode(_png(2, 1, 16, 0, b"\0\x12\x34\x12\xff", [(b"tRNS", b"\x12\x34")]))
+        self.assertEqual((image.channels, image.rows), (2, [b"\x12\0\x12\xff"]))
+        # The alpha channel survives resizing and encoding
+        image = png_codec.decode(_png(4, 2, 8, 0, b"\0\0\0\x50\x50" * 2, [(b"tRNS", b"\0\0")]))
+        resized = png_codec.decode(png_codec.encode(png_codec.resize(image, 2)))
+        self.assertEqual((resized.channels, resized.rows), (2, [b"\0\0\x50\xff"]))
+        with self.assertRaisesRegex(PNGError, "tRNS"):
+            png_codec.decode(_png(1, 1, 8, 2, b"\0\0\0\0", [(b"tRNS", b"\0\0")]))
+
+    def test_resize_averages_boxes(self):
+        image = Image(4, 2, 1, [bytes([0, 10, 20, 40]), bytes([10, 20, 30, 50])])
+        resized = png_codec.resize(image, 2)
+        self.assertEqual((resized.width, resized.height, resized.rows), (2, 1, [bytes([10, 35])]))
+        self.assertIs(png_codec.resize(image, 4), image)
+
+    def test_unsupported_and_corrupt_files(self):
+        with self.assertRaisesRegex(PNGError, "not a PNG"):
+            png_codec.decode(b"GIF89a")
+        with self.assertRaisesRegex(PNGError, "interlaced"):
+            png_codec.decode(_png(1, 1, 8, 0, b"\0\0", interlace=1))
+        with self.assertRaisesRegex(PNGError, "bit depth 4"):
+            png_codec.decode(_png(2, 1, 4, 0, b"\0\0"))
+        with self.assertRaisesRegex(PNGError, "truncated"):
+            png_codec.decode(_png(4, 4, 8, 0, b"\0\0"))
+        self.assertEqual(png_codec.read_size(_png(3, 2, 8, 0, b"")), (3, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
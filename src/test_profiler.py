@@ -0,0 +1,75 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from main import generate_pages_recursively
+from profiler import BuildProfiler, PHASES
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_disabled_profiler_records_nothing(self):
+        profiler = BuildProfiler(enabled=False)
+        with profiler.phase("read", "a.md"):
+            pass
+        self.assertEqual(profiler.phases, {})
+        self.assertEqual(profiler.pages, {})
+
+    def test_nested_phases_are_exclusive(self):
+        profiler = BuildProfiler()
+        with profiler.phase("write", "a.md"):
+            with profiler.phase("to_html", "a.md"):
+                time.sleep(0.02)
+        self.assertGreaterEqual(profiler.phases["to_html"]["wall"], 0.02)
+        self.assertLess(profiler.phases["write"]["wall"], 0.02)
+        self.assertAlmostEqual(profiler.pages["a.md"],
+                               profiler.phases["to_html"]["wall"] + profiler.phases["write"]["wall"])
+
+    def test_merge_and_slowest_pages(self):
+        first = BuildProfiler()
+        first._add("read", "a.md", 0.5, 0.1)
+        second = BuildProfiler()
+        second._add("read", "b.md", 1.0, 0.2)
+        second._add("read", "a.md", 0.1, 0.1)
+        first.merge(second)
+        self.assertEqual(first.phases["read"]["calls"], 3)
+        self.assertEqual([page for page, _ in first.slowest_pages(2)], ["b.md", "a.md"])
+        self.assertEqual(len(first.slowest_pages(1)), 1)
+
+    def test_report_and_json(self):
+        profiler = BuildProfiler()
+        profiler._add("read", "a.md", 0.25, 0.125)
+        self.assertIn("Slowest 1 pages:", profiler.report())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            profiler.write_json(path)
+            with open(path) as f:
+                data = json.load(f)
+        self.assertEqual(data["phases"]["read"], {"wall": 0.25, "cpu": 0.125, "calls": 1})
+        self.assertEqual(data["slowest_pages"], [{"page": "a.md", "wall": 0.25}])
+
+    def test_build_records_every_page_phase(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            template = os.path.join(tmp, "template.html")
+            with open(template, 'w') as f:
+                f.write("{{ Title }}{{ Content }}")
+            for name in ("a", "b", "c"):
+                with open(os.path.join(content, f"{name}.md"), 'w') as f:
+                    f.write(f"# {name}\n\n**text**")
+            for jobs in (1, 2):
+                profiler = BuildProfiler()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_pages_recursively(content, template, os.path.join(tmp, "docs"), "/",
+                                               jobs=jobs, profiler=profiler)
+                self.assertEqual(set(profiler.phases), set(PHASES) - {"static copy"})
+                self.assertEqual(profiler.phases["read"]["calls"], 3)
+                self.assertEqual(len(profiler.pages), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
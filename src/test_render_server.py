@@ -0,0 +1,98 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+from markdown_parser import markdown_to_html_node
+from render_client import RenderClient, RenderError, measure_latency, percentiles
+from render_server import RenderServer, RenderService
+from url_resolver import BasePathResolver
+from watch import DevSite
+
+
+class TestRenderServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.path = lambda *parts: os.path.join(self.root, *parts)
+        self.write(self.path("template.html"), "<title>{{ Title }}</title>{{ Content }}")
+        self.write(self.path("content", "index.md"), "# Home\n\nWelcome")
+        os.makedirs(self.path("static"))
+        self.site = DevSite(self.path("content"), self.path("static"), self.path("docs"), self.path("template.html"),
+                            base_path="/repo/", manifest_path=self.path("cache", "manifest.json"),
+                            graph_path=self.path("cache", "depgraph.json"),
+                            search_state_path=self.path("cache", "search.json"),
+                            metadata_path=self.path("cache", "metadata.json"),
+                            image_cache_dir=self.path("cache", "images"))
+        self.socket_path = self.path("cache", "render.sock")
+        self.server = RenderServer(self.socket_path, RenderService(self.site))
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.01,))
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def test_render(self):
+        markdown = "# Title\n\nA [link](/docs) and `code`\n\n- one\n- two"
+        with RenderClient(self.socket_path) as client:
+            self.assertEqual(client.render(markdown),
+                             markdown_to_html_node(markdown).to_html(BasePathResolver("/repo/")))
+            self.assertEqual(client.request({"op": "ping"}), {})
+            with self.assertRaisesRegex(RenderError, "unknown op"):
+                client.request({"op": "explode"})
+            # The connection stays usable after an error
+            self.assertEqual(client.render("x"), "<div><p>x</p></div>")
+
+    def test_build_rebuilds_changed_pages(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with RenderClient(self.socket_path) as client:
+                client.build([self.path("content", "index.md")])
+                self.write(self.path("content", "about.md"), "no title")
+                with self.assertRaisesRegex(RenderError, "No h1 header"):
+                    client.build([self.path("content", "about.md")])
+        with open(self.path("docs", "index.html")) as f:
+            self.assertEqual(f.read(), "<title>Home</title><div><h1>Home</h1><p>Welcome</p></div>")
+        self.assertTrue(os.path.isfile(self.path("cache", "manifest.json")))
+
+    def test_concurrent_clients(self):
+        documents = [f"# Page {number}\n\nBody [link](/p{number})" for number in range(5)]
+        latencies = measure_latency(self.socket_path, documents, clients=4, requests=25)
+        self.assertEqual(len(latencies), 100)
+
+    def test_second_server_on_live_socket_is_refused(self):
+        with self.assertRaisesRegex(OSError, "already listening"):
+            RenderServer(self.socket_path, RenderService(self.site))
+
+    def test_stale_socket_is_replaced(self):
+        stale = self.path("stale.sock")
+        server = RenderServer(stale, RenderService(self.site))
+        server.socket.close()
+        server = RenderServer(stale, RenderService(self.site))
+        server.server_close()
+        self.assertFalse(os.path.exists(stale))
+
+    def test_path_that_is_not_a_socket_is_kept(self):
+        self.write(self.path("notes.txt"), "keep me")
+        with self.assertRaisesRegex(OSError, "not a socket"):
+            RenderServer(self.path("notes.txt"), RenderService(self.site))
+        with open(self.path("notes.txt")) as f:
+            self.assertEqual(f.read(), "keep me")
+
+    def test_percentiles(self):
+        latencies = [number / 100 for number in range(1, 101)]
+        self.assertEqual(percentiles(latencies), {50: 0.5, 90: 0.9, 99: 0.99})
+        self.assertEqual(percentiles([0.3]), {50: 0.3, 90: 0.3, 99: 0.3})
+
+
+if __name__ == "__main__":
+    unittest.main()
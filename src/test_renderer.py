@@ -0,0 +1,62 @@
+import threading
+import unittest
+
+from corpus import generate_corpus
+from front_matter import FrontMatterError
+from markdown_parser import markdown_to_html_node
+from renderer import MarkdownRenderer
+from url_resolver import BasePathResolver
+
+
+class TestMarkdownRenderer(unittest.TestCase):
+    def setUp(self):
+        self.documents = list(generate_corpus("link-heavy", 0.1).values()) + list(
+            generate_corpus("code-heavy", 0.1).values())
+
+    def expected(self, base_path="/"):
+        return [markdown_to_html_node(markdown).to_html(BasePathResolver(base_path)) for markdown in self.documents]
+
+    def test_render_many_matches_markdown_to_html_node(self):
+        renderer = MarkdownRenderer("/repo/")
+        self.assertEqual(renderer.render_many(self.documents), self.expected("/repo/"))
+        self.assertEqual(renderer.render(""), "<div></div>")
+
+    def test_front_matter_is_left_out(self):
+        renderer = MarkdownRenderer()
+        self.assertEqual(renderer.render("---\ntemplate: alt.html\n---\n# A\n\nBody"),
+                         markdown_to_html_node("# A\n\nBody").to_html())
+        # Like the build, an unclosed header is an error rather than a page showing it
+        with self.assertRaises(FrontMatterError):
+            renderer.render("---\n# A")
+
+    def test_repeated_blocks_are_rendered_once(self):
+        renderer = MarkdownRenderer()
+        renderer.render_many(["# Title\n\nSame [link](/a)", "Same [link](/a)\n\nOther"])
+        self.assertEqual((renderer.hits, renderer.misses), (1, 3))
+        self.assertEqual(renderer.render("Same [link](/a)"), '<div><p>Same <a href="/a">link</a></p></div>')
+
+    def test_cache_stays_within_max_cached_bytes(self):
+        renderer = MarkdownRenderer(max_cached_bytes=2000)
+        self.assertEqual(renderer.render_many(self.documents), self.expected())
+        self.assertLessEqual(renderer._size, 2000)
+        self.assertEqual(renderer._size, sum(len(block) + len(html) for block, html in renderer._cache.items()))
+
+    def test_shared_between_threads(self):
+        renderer = MarkdownRenderer(max_cached_bytes=20000)
+        expected = self.expected()
+        results = [None] * 8
+
+        def render(index):
+            results[index] = renderer.render_many(self.documents[index:] + self.documents[:index])
+
+        threads = [threading.Thread(target=render, args=(index,)) for index in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for index, result in enumerate(results):
+            self.assertEqual(result, expected[index:] + expected[:index])
+
+
+if __name__ == "__main__":
+    unittest.main()
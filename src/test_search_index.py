@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from main import write_output
+from markdown_parser import markdown_to_html_node
+from node_transformer import text_node_observer
+from search_index import SearchIndex, TermCollector, shard_for, tokenize
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = lambda *parts: os.path.join(self.tmp.name, *parts)
+        self.index = SearchIndex(self.path("state.json"), self.path("search"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(self.path("search", name)) as f:
+            return json.load(f)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Hello, World! a b2 élan"), ["hello", "world", "b2", "élan"])
+
+    def test_shard_for(self):
+        self.assertEqual(shard_for("/"), "_root")
+        self.assertEqual(shard_for("/about.html"), "_root")
+        self.assertEqual(shard_for("/blog/"), "_root")
+        self.assertEqual(shard_for("/blog/post/"), "blog")
+        self.assertEqual(shard_for("/blog/notes.html"), "blog")
+        self.assertEqual(shard_for("/blog/2024/post/"), "blog~2024")
+        self.assertEqual(shard_for("/repo/blog/post/"), "repo~blog")
+        self.assertEqual(shard_for("/repo/blog/post/", "/repo/"), "blog")
+        self.assertEqual(shard_for("/repo/about.html", "/repo/"), "_root")
+        self.assertEqual(shard_for("/repo/", "/repo/"), "_root")
+
+    def test_base_path_urls_shard_by_directory(self):
+        index = SearchIndex(self.path("state.json"), self.path("search"), base_path="/repo/")
+        index.update("content/index.md", "/repo/", "Home", Counter(home=1))
+        index.update("content/blog/a.md", "/repo/blog/a/", "A", Counter(post=1))
+        self.assertEqual(index.write(write_output), 2)
+        self.assertEqual(sorted(self.read("index.json")["shards"]), ["_root", "blog"])
+        self.assertEqual(self.read("blog.pages.json"), [["/repo/blog/a/", "A"]])
+
+    def test_collector_matches_cached_html(self):
+        markdown = "# Title\n\nSome **bold** and [a link](/x) with ![alt text](/i.png)\n\n- one\n- two _three_"
+        collector = TermCollector()
+        token = text_node_observer.set(collector)
+        try:
+            html = markdown_to_html_node(markdown).to_html()
+        finally:
+            text_node_observer.reset(token)
+        from_html = TermCollector()
+        from_html.add_html(html)
+        self.assertEqual(collector.terms, from_html.terms)
+        self.assertNotIn("alt", collector.terms)
+        self.assertEqual(collector.terms["link"], 1)
+
+    def test_write_shards(self):
+        self.index.update("content/index.md", "/", "Home", Counter(home=2, welcome=1))
+        self.index.update("content/blog/a.md", "/blog/a/", "A", Counter(post=3, alpha=1))
+        self.index.update("content/blog/b.md", "/blog/b/", "B", Counter(post=1))
+        self.assertEqual(self.index.write(write_output), 2)
+        listing = self.read("index.json")["shards"]
+        self.assertEqual(sorted(listing), ["_root", "blog"])
+        self.assertEqual(self.read("blog.pages.json"), [["/blog/a/", "A"], ["/blog/b/", "B"]])
+        self.assertEqual(self.read("blog.0.json"), {"alpha": [0, 1], "post": [0, 3, 1, 1]})
+
+    def test_part_size_budget(self):
+        index = SearchIndex(self.path("state.json"), self.path("search"), max_part_bytes=200)
+        index.update("content/blog/a.md", "/blog/a/", "A", Counter({f"term{i:03}": 1 for i in range(60)}))
+        index.write(write_output)
+        parts = self.read("index.json")["shards"]["blog"]["terms"]
+        self.assertGreater(len(parts), 1)
+        terms = {}
+        for first, name in parts:
+            part = self.read(name)
+            self.assertLessEqual(os.path.getsize(self.path("search", name)), 200)
+            self.assertEqual(min(part), first)
+            terms.update(part)
+        self.assertEqual(len(terms), 60)
+
+    def test_max_terms_per_page(self):
+        index = SearchIndex(self.path("state.json"), self.path("search"), max_terms_per_page=2)
+        index.update("content/index.md", "/", "Home", Counter(a1=1, b1=5, c1=3))
+        self.assertEqual(index.pages["content/index.md"]["terms"], {"b1": 5, "c1": 3})
+
+    def test_incremental_rewrites_only_dirty_shards(self):
+        self.index.update("content/index.md", "/", "Home", Counter(home=1))
+        self.index.update("content/blog/a.md", "/blog/a/", "A", Counter(post=1))
+        self.index.write(write_output)
+        self.index.save()
+        loaded = SearchIndex.load(self.path("state.json"), self.path("search"))
+        self.assertEqual(loaded.pages, self.index.pages)
+        loaded.update("content/blog/a.md", "/blog/a/", "A", Counter(edited=1))
+        self.assertEqual(loaded.write(write_output), 1)
+        self.assertEqual(self.read("blog.0.json"), {"edited": [0, 1]})
+
+        loaded.retain(["content/index.md"])
+        loaded.write(write_output)
+        self.assertEqual(sorted(os.listdir(self.path("search"))), ["_root.0.json", "_root.pages.json", "index.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from site_metadata import MetadataStore
+
+DAY_NS = 86400 * 10**9
+
+
+class TestMetadataStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.written = {}
+        self.store = self.make_store()
+        self.store.update("content/index.md", "/repo/", "Home & Garden", DAY_NS)
+        self.store.update("content/blog/index.md", "/repo/blog/", "Blog", 3 * DAY_NS)
+        self.store.update("content/blog/post.md", "/repo/blog/post.html", "Post", 2 * DAY_NS)
+        self.store.update("content/docs/a/index.md", "/repo/docs/a/", "A", 0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_store(self, **options):
+        return MetadataStore.load(os.path.join(self.root, "metadata.json"), os.path.join(self.root, "docs"),
+                                  site_url="https://example.com/", base_path="/repo/", feed_entries=2, **options)
+
+    def write_file(self, path, text):
+        self.written[os.path.basename(path)] = text
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def test_sitemap(self):
+        sitemap = self.store.sitemap()
+        self.assertIn("<url><loc>https://example.com/repo/</loc><lastmod>1970-01-02T00:00:00Z</lastmod></url>", sitemap)
+        self.assertLess(sitemap.index("/repo/blog/"), sitemap.index("/repo/blog/post.html"))
+        self.assertEqual(sitemap.count("<url>"), 4)
+
+    def test_feed_lists_most_recent_pages(self):
+        feed = self.store.feed()
+        self.assertIn("<title>Home &amp; Garden</title>", feed)
+        self.assertIn("<updated>1970-01-04T00:00:00Z</updated>", feed)
+        self.assertEqual(feed.count("<entry>"), 2)
+        self.assertLess(feed.index("<title>Blog</title>"), feed.index("<title>Post</title>"))
+        self.assertIn('<link href="https://example.com/repo/blog/post.html"/>', feed)
+
+    def test_nav_follows_url_paths(self):
+        self.assertEqual(self.store.nav(), {
+            "title": "Home & Garden", "url": "/repo/",
+            "children": [
+                {"title": "Blog", "url": "/repo/blog/", "children": [
+                    {"title": "Post", "url": "/repo/blog/post.html"}]},
+                {"title": "docs", "url": None, "children": [{"title": "A", "url": "/repo/docs/a/"}]},
+            ]})
+
+    def test_outputs_rewritten_only_when_pages_change(self):
+        self.assertTrue(self.store.write(self.write_file))
+        self.assertEqual(sorted(self.written), ["feed.xml", "nav.json", "sitemap.xml"])
+        self.store.save()
+
+        store = self.make_store()
+        store.update("content/blog/post.md", "/repo/blog/post.html", "Post", 2 * DAY_NS)
+        self.assertFalse(store.write(self.write_file))
+        store.update("content/blog/post.md", "/repo/blog/post.html", "Edited", 2 * DAY_NS)
+        store.retain(["content/blog/post.md", "content/index.md"])
+        self.written.clear()
+        self.assertTrue(store.write(self.write_file))
+        self.assertEqual(json.loads(self.written["nav.json"])["children"][0]["children"][0]["title"], "Edited")
+        self.assertEqual(self.written["sitemap.xml"].count("<url>"), 2)
+
+    def test_sitemap_and_feed_need_site_url(self):
+        self.store.write(self.write_file)
+        self.store.save()
+        store = MetadataStore.load(self.store.state_path, self.store.output_dir, base_path="/repo/", feed_entries=2)
+        self.written.clear()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertTrue(store.write(self.write_file))
+        self.assertIn("Skipping sitemap.xml and feed.xml", output.getvalue())
+        self.assertEqual(sorted(self.written), ["nav.json"])
+        self.assertEqual(os.listdir(os.path.join(self.root, "docs")), ["nav.json"])
+        store.save()
+        self.assertFalse(MetadataStore.load(store.state_path, store.output_dir, base_path="/repo/",
+                                            feed_entries=2).write(self.write_file))
+
+    def test_unwritten_or_reconfigured_store_rewrites(self):
+        self.store.save()
+        self.assertTrue(self.make_store().dirty)
+        self.store.write(self.write_file)
+        self.store.save()
+        self.assertFalse(self.make_store().dirty)
+        self.assertTrue(MetadataStore.load(self.store.state_path, self.store.output_dir, base_path="/repo/").dirty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+from state import load_json, save_json
+
+
+class TestState(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_load_json(self):
+        path = os.path.join(self.root, "state", "data.json")
+        save_json(path, {"version": 3, "items": [1]})
+        self.assertEqual(load_json(path, 3), {"version": 3, "items": [1]})
+        self.assertIsNone(load_json(path, 4))
+        self.assertIsNone(load_json(os.path.join(self.root, "missing.json"), 3))
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["data.json"])
+
+    def test_load_corrupt_or_foreign_json(self):
+        path = os.path.join(self.root, "data.json")
+        for text in ("{not json", "[1, 2]"):
+            with open(path, 'w') as f:
+                f.write(text)
+            self.assertIsNone(load_json(path, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from static_sync import copy_file, is_up_to_date, sync_static_files
+
+
+class TestStaticSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs", "static")
+        self.write(os.path.join(self.source, "index.css"), "body {}")
+        self.write(os.path.join(self.source, "images", "a.png"), "png-a")
+        self.write(os.path.join(self.source, "images", "b.png"), "png-b")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def sync(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sync_static_files(self.source, self.dest, **kwargs)
+
+    def test_first_sync_copies_everything(self):
+        stats = self.sync()
+        self.assertEqual((stats.copied, stats.unchanged, stats.removed), (3, 0, 0))
+        self.assertEqual(self.read(os.path.join(self.dest, "images", "b.png")), "png-b")
+
+    def test_second_sync_copies_nothing(self):
+        self.sync()
+        before = os.stat(os.path.join(self.dest, "index.css")).st_ino
+        stats = self.sync()
+        self.assertEqual((stats.copied, stats.unchanged, stats.removed), (0, 3, 0))
+        self.assertEqual(before, os.stat(os.path.join(self.dest, "index.css")).st_ino)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        self.write(os.path.join(self.source, "index.css"), "body { color: red }")
+        stats = self.sync()
+        self.assertEqual(stats.copied, 1)
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body { color: red }")
+
+    def test_stale_files_and_directories_are_removed(self):
+        self.sync()
+        os.remove(os.path.join(self.source, "images", "a.png"))
+        self.write(os.path.join(self.dest, "old", "x.css"), "stale")
+        stats = self.sync()
+        self.assertEqual(stats.removed, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "a.png")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "old")))
+
+    def test_hash_mode_ignores_mtime(self):
+        self.sync()
+        source_file = os.path.join(self.source, "index.css")
+        os.utime(source_file, ns=(0, 0))
+        self.assertFalse(is_up_to_date(source_file, os.path.join(self.dest, "index.css")))
+        self.assertTrue(is_up_to_date(source_file, os.path.join(self.dest, "index.css"), use_hash=True))
+
+    def test_link_mode_shares_inode(self):
+        self.sync(link=True)
+        source_stat = os.stat(os.path.join(self.source, "index.css"))
+        dest_stat = os.stat(os.path.join(self.dest, "index.css"))
+        self.assertEqual(source_stat.st_ino, dest_stat.st_ino)
+        self.assertEqual(self.sync(link=True).copied, 0)
+
+    def test_copy_over_hardlink_leaves_source_intact(self):
+        source_file = os.path.join(self.source, "index.css")
+        dest_file = os.path.join(self.tmp.name, "linked.css")
+        os.link(source_file, dest_file)
+        other = os.path.join(self.source, "images", "a.png")
+        copy_file(other, dest_file)
+        self.assertEqual(self.read(source_file), "body {}")
+        self.assertEqual(self.read(dest_file), "png-a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, TemplateError, load_template, rewrite_root_urls
+
+
+class TestTemplate(unittest.TestCase):
+    def test_parse_segments(self):
+        template = Template("<title>{{ Title }}</title><main>{{Content}}</main>")
+        self.assertEqual(template.segments, [(False, "<title>"), (True, "Title"), (False, "</title><main>"),
+                                             (True, "Content"), (False, "</main>")])
+        self.assertEqual(template.slots, {"Title", "Content"})
+
+    def test_render_variables(self):
+        template = Template("{{ Title }} on {{ date }}: {{ description }}")
+        result = template.render({"Title": "Post", "date": "2024-01-01", "description": "About"})
+        self.assertEqual(result, "Post on 2024-01-01: About")
+
+    def test_render_streams_nodes(self):
+        template = Template("<article>{{ Content }}</article>")
+        buffer = io.StringIO()
+        template.render_to(buffer.write, {"Content": ParentNode("p", [LeafNode("b", "hi")])})
+        self.assertEqual(buffer.getvalue(), "<article><p><b>hi</b></p></article>")
+
+    def test_render_callable(self):
+        template = Template("[{{ nav }}]")
+        self.assertEqual(template.render({"nav": lambda write: write("menu")}), "[menu]")
+
+    def test_values_are_not_rescanned(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(template.render({"Title": "{{ Content }}", "Content": "{{ Title }}"}),
+                         "<title>{{ Content }}</title>{{ Title }}")
+
+    def test_unknown_slot_raises(self):
+        template = Template("{{ Title }} {{ missing }}")
+        with self.assertRaises(TemplateError):
+            template.render({"Title": "x"})
+
+    def test_base_path_applied_to_literals(self):
+        template = Template('<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/repo/")
+        self.assertEqual(template.render({"Content": '<a href="/x">'}),
+                         '<link href="/repo/index.css" /><img src="/repo/a.png" /><a href="/x">')
+
+    def test_rewrite_root_urls(self):
+        self.assertEqual(rewrite_root_urls('<a href="/a">', "/"), '<a href="/a">')
+        self.assertEqual(rewrite_root_urls('<a href="/a"><img src="/b">', "/r/"), '<a href="/r/a"><img src="/r/b">')
+
+    def test_load_template_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, 'w') as f:
+                f.write("A {{ Title }}")
+            first = load_template(path)
+            self.assertIs(first, load_template(path))
+            with open(path, 'w') as f:
+                f.write("Longer {{ Title }}")
+            self.assertEqual(load_template(path).render({"Title": "x"}), "Longer x")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -39,6 +39,12 @@ class TestTextNode(unittest.TestCase):
         example = "TextNode(This is a text node, link, https://www.boot.dev)"
         self.assertEqual(repr(node), example)
 
+    def test_slots_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from url_resolver import BasePathResolver
+
+
+class TestBasePathResolver(unittest.TestCase):
+    def test_root_relative(self):
+        resolver = BasePathResolver("/repo/")
+        self.assertEqual(resolver("/blog/post"), "/repo/blog/post")
+        self.assertEqual(resolver("/"), "/repo/")
+
+    def test_default_base_is_identity(self):
+        self.assertEqual(BasePathResolver()("/images/a.png"), "/images/a.png")
+
+    def test_other_urls_untouched(self):
+        resolver = BasePathResolver("/repo/")
+        for url in ("https://example.com/a", "//cdn.example.com/a.js", "relative/page", "#section", "mailto:a@b.c"):
+            self.assertEqual(resolver(url), url)
+
+
+if __name__ == "__main__":
+    unittest.main()
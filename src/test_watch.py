@@ -0,0 +1,169 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from test_image_pipeline import write_png
+from watch import DevSite, InotifyWatcher, PollingWatcher
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.path = lambda *parts: os.path.join(self.root, *parts)
+        self.write(self.path("template.html"), "<title>{{ Title }}</title>{{ Content }}")
+        self.write(self.path("content", "index.md"), "# Home\n\nWelcome")
+        self.write(self.path("content", "blog", "index.md"), "# Blog\n\nPosts")
+        self.write(self.path("static", "index.css"), "body {}")
+        self.site = DevSite(self.path("content"), self.path("static"), self.path("docs"), self.path("template.html"),
+                            manifest_path=self.path("cache", "manifest.json"),
+                            graph_path=self.path("cache", "depgraph.json"),
+                            search_state_path=self.path("cache", "search.json"),
+                            metadata_path=self.path("cache", "metadata.json"),
+                            image_cache_dir=self.path("cache", "images"), site_url="https://example.com")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.site.full_build()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def apply(self, *paths):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.site.apply_changes(paths)
+        return output.getvalue()
+
+    def test_full_build(self):
+        self.assertIn("<p>Posts</p>", self.read(self.path("docs", "blog", "index.html")))
+        self.assertEqual(self.read(self.path("docs", "static", "index.css")), "body {}")
+
+    def test_page_change_rebuilds_only_that_page(self):
+        self.write(self.path("content", "blog", "index.md"), "# Blog\n\nNew post")
+        output = self.apply(self.path("content", "blog", "index.md"))
+        self.assertEqual(output.count("Generating page"), 1)
+        self.assertIn("<p>New post</p>", self.read(self.path("docs", "blog", "index.html")))
+
+    def test_deleted_page_removes_output(self):
+        os.remove(self.path("content", "blog", "index.md"))
+        self.apply(self.path("content", "blog", "index.md"))
+        self.assertFalse(os.path.exists(self.path("docs", "blog", "index.html")))
+        self.assertNotIn(self.path("docs", "blog", "index.html"), self.site.manifest.entries)
+
+    def test_linked_page_change_rebuilds_linking_pages(self):
+        self.write(self.path("content", "index.md"), "# Home\n\nSee the [blog](/blog)")
+        self.apply(self.path("content", "index.md"))
+        os.remove(self.path("content", "blog", "index.md"))
+        output = self.apply(self.path("content", "blog", "index.md"))
+        self.assertIn(f"Rebuilding {self.path('content', 'index.md')}: linked page", output)
+        self.assertEqual(output.count("Generating page"), 1)
+        self.assertEqual(self.site.graph.dependents(self.path("content", "blog", "index.md")), {})
+
+    def test_page_change_updates_search_index(self):
+        self.write(self.path("content", "blog", "post.md"), "# Post\n\nMithril")
+        self.apply(self.path("content", "blog", "post.md"))
+        with open(self.path("docs", "search", "blog.0.json")) as f:
+            self.assertIn("mithril", f.read())
+        os.remove(self.path("content", "blog", "post.md"))
+        self.apply(self.path("content", "blog", "post.md"))
+        self.assertFalse(os.path.exists(self.path("docs", "search", "blog.0.json")))
+
+    def test_deferred_aggregate_writes(self):
+        self.write(self.path("content", "blog", "post.md"), "# Post\n\nMithril")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.site.apply_changes([self.path("content", "blog", "post.md")], defer_aggregates=True)
+        self.assertIn("<p>Mithril</p>", self.read(self.path("docs", "blog", "post.html")))
+        self.assertFalse(os.path.exists(self.path("docs", "search", "blog.0.json")))
+        self.assertNotIn("/blog/post.html", self.read(self.path("docs", "sitemap.xml")))
+        self.site.write_aggregates()
+        self.assertIn("mithril", self.read(self.path("docs", "search", "blog.0.json")))
+        self.assertIn("/blog/post.html", self.read(self.path("docs", "sitemap.xml")))
+
+    def test_page_change_updates_site_metadata(self):
+        self.write(self.path("content", "blog", "index.md"), "# Journal\n\nPosts")
+        self.apply(self.path("content", "blog", "index.md"))
+        self.assertIn("<title>Journal</title>", self.read(self.path("docs", "feed.xml")))
+        self.assertIn("<id>https://example.com/blog/</id>", self.read(self.path("docs", "feed.xml")))
+        self.assertIn('"title":"Journal"', self.read(self.path("docs", "nav.json")))
+        os.remove(self.path("content", "blog", "index.md"))
+        self.apply(self.path("content", "blog", "index.md"))
+        self.assertNotIn("/blog/", self.read(self.path("docs", "sitemap.xml")))
+
+    def test_page_turned_draft_removes_output(self):
+        self.write(self.path("content", "blog", "index.md"), "---\ndraft: true\n---\n# Blog")
+        self.apply(self.path("content", "blog", "index.md"))
+        self.assertFalse(os.path.exists(self.path("docs", "blog", "index.html")))
+        self.assertNotIn("/blog/", self.read(self.path("docs", "sitemap.xml")))
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.write(self.path("template.html"), "<h1>{{ Title }}</h1>{{ Content }}")
+        output = self.apply(self.path("template.html"))
+        self.assertEqual(output.count("Generating page"), 2)
+        self.assertTrue(self.read(self.path("docs", "index.html")).startswith("<h1>Home</h1>"))
+
+    def test_static_change_copies_asset(self):
+        self.write(self.path("static", "images", "a.png"), "png")
+        self.apply(self.path("static", "images", "a.png"))
+        self.assertEqual(self.read(self.path("docs", "static", "images", "a.png")), "png")
+
+    def test_image_change_renames_it_in_pages_using_it(self):
+        image = self.path("static", "images", "photo.png")
+        write_png(image, 8, 4)
+        self.write(self.path("content", "blog", "index.md"), "# Blog\n\n![photo](/images/photo.png)")
+        self.apply(image, self.path("content", "blog", "index.md"))
+        old = os.listdir(self.path("docs", "assets", "images"))
+        self.assertIn(f'src="/assets/images/{old[0]}"', self.read(self.path("docs", "blog", "index.html")))
+        write_png(image, 8, 4, shade=1)
+        os.utime(image, ns=(10**18 + 1, 10**18 + 1))
+        output = self.apply(image)
+        self.assertIn(f"Rebuilding {self.path('content', 'blog', 'index.md')}: asset", output)
+        new = os.listdir(self.path("docs", "assets", "images"))
+        self.assertNotEqual(new, old)
+        self.assertIn(f'src="/assets/images/{new[0]}"', self.read(self.path("docs", "blog", "index.html")))
+
+    def test_polling_watcher_detects_change(self):
+        watcher = PollingWatcher(self.site.watched_paths, interval=0.01)
+        self.write(self.path("content", "new.md"), "# New")
+        self.assertEqual(watcher.wait(timeout=1), {self.path("content", "new.md")})
+        self.assertEqual(watcher.wait(timeout=0), set())
+
+    def test_page_templates_are_watched(self):
+        self.write(self.path("alt.html"), "<h2>{{ Title }}</h2>{{ Content }}")
+        self.write(self.path("content", "blog", "index.md"), "---\ntemplate: alt.html\n---\n# Blog\n\nPosts")
+        self.apply(self.path("content", "blog", "index.md"))
+        self.assertEqual(self.site.watched_paths, [self.path("content"), self.path("static"), self.path("alt.html"),
+                                                   self.path("template.html")])
+        watcher = PollingWatcher(self.site.watched_paths[:3], interval=0.01)
+        watcher.add(self.path("template.html"))
+        self.write(self.path("alt.html"), "<h3>{{ Title }}</h3>{{ Content }}")
+        self.write(self.path("template.html"), "{{ Title }}{{ Content }}")
+        self.assertEqual(watcher.wait(timeout=1), {self.path("alt.html"), self.path("template.html")})
+
+    @unittest.skipUnless(InotifyWatcher.available(), "inotify is only available on Linux")
+    def test_inotify_watcher_detects_change(self):
+        watcher = InotifyWatcher(self.site.watched_paths)
+        try:
+            self.write(self.path("content", "blog", "index.md"), "# Blog\n\nEdited")
+            self.write(self.path("template.html"), "{{ Title }}{{ Content }}")
+            changed = watcher.wait(timeout=1)
+            self.assertEqual(changed, {self.path("content", "blog", "index.md"), self.path("template.html")})
+            self.write(self.path("alt.html"), "{{ Content }}")
+            watcher.add(self.path("alt.html"))
+            self.write(self.path("alt.html"), "<h2>{{ Title }}</h2>{{ Content }}")
+            self.assertEqual(watcher.wait(timeout=1), {self.path("alt.html")})
+        finally:
+            watcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
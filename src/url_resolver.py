@@ -0,0 +1,19 @@
+class BasePathResolver:
+    """URL resolver that serves root-relative URLs from a base path, e.g. /repo-name/ on GitHub Pages.
+
+    Used as the url_resolver of HTMLNode rendering, so only real href and src attributes are rewritten;
+    text that merely looks like an attribute (in a code sample, say) is left alone.
+    """
+    __slots__ = ("base_path",)
+
+    def __init__(self, base_path: str = "/"):
+        self.base_path = base_path
+
+    def __call__(self, url: str) -> str:
+        # Protocol-relative URLs (//host/path) point to another site
+        if url.startswith("/") and not url.startswith("//"):
+            return self.base_path + url[1:]
+        return url
+
+    def __repr__(self) -> str:
+        return f"BasePathResolver({self.base_path!r})"
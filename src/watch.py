@@ -0,0 +1,371 @@
+import argparse
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Set
+
+from depgraph import DependencyGraph
+from front_matter import read_front_matter
+from main import (DEPGRAPH_PATH, IMAGE_CACHE_DIR, MANIFEST_PATH, METADATA_PATH, SEARCH_STATE_PATH, build_page,
+                  generate_pages_recursively, is_draft, page_template, page_url, write_output, PageBuildError)
+from fswalk import TreeSnapshot, stat_key
+from image_pipeline import ImagePipeline
+from manifest import BuildManifest, file_digest
+from search_index import SearchIndex
+from site_metadata import MetadataStore
+from static_sync import copy_file, sync_static_files
+from url_resolver import BasePathResolver
+
+# inotify(7) event masks
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MODIFY
+_EVENT_HEADER = struct.Struct("iIII")
+# Seconds without changes after which serve --watch writes the site-wide outputs it deferred
+AGGREGATE_DELAY = 0.5
+
+
+def snapshot(roots: Iterable[str], previous: Dict[str, object] = None) -> Dict[str, object]:
+    """Maps every root to a TreeSnapshot if it is a directory, or to the stat key of the file otherwise.
+
+    Directory snapshots are scanned against the previous ones, so unchanged directories are not listed again.
+    """
+    previous = previous or {}
+    snapshots = {}
+    for root in roots:
+        if os.path.isdir(root):
+            last = previous.get(root)
+            snapshots[root] = TreeSnapshot.scan(root, last if isinstance(last, TreeSnapshot) else None)
+        else:
+            try:
+                snapshots[root] = stat_key(os.stat(root))
+            except FileNotFoundError:
+                snapshots[root] = None
+    return snapshots
+
+
+def changed_between(old: Dict[str, object], new: Dict[str, object]) -> Set[str]:
+    """Normalized paths of every file that differs between two snapshots of the same roots."""
+    changed = set()
+    for root, current in new.items():
+        last = old.get(root)
+        if isinstance(current, TreeSnapshot):
+            if not isinstance(last, TreeSnapshot):
+                last = TreeSnapshot(root)
+            changed.update(os.path.normpath(path) for path in last.changed_paths(current))
+        elif current != last:
+            changed.add(os.path.normpath(root))
+    return changed
+
+
+class PollingWatcher:
+    """Detects changes by diffing tree snapshots; works everywhere but costs a stat per file per poll."""
+    def __init__(self, roots: Iterable[str], interval: float = 0.1):
+        self.roots = list(roots)
+        self.interval = interval
+        self.snapshots = snapshot(self.roots)
+
+    def add(self, root: str):
+        """Starts watching another file or directory."""
+        self.roots.append(root)
+        self.snapshots.update(snapshot([root]))
+
+    def wait(self, timeout: float = None) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = snapshot(self.roots, self.snapshots)
+            changed = changed_between(self.snapshots, current)
+            self.snapshots = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Detects changes through Linux inotify via ctypes, so an edit is seen as soon as it is written."""
+    def __init__(self, roots: Iterable[str], debounce: float = 0.02):
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.debounce = debounce
+        self.directories = {}
+        self.files = set()
+        self.recursive_roots = []
+        self.roots = []
+        for root in roots:
+            self.add(root)
+
+    def add(self, root: str):
+        """Starts watching another file or directory."""
+        self.roots.append(root)
+        if os.path.isfile(root):
+            # Editors often replace files by renaming, so watch the parent and filter by name
+            self.files.add(os.path.normpath(root))
+            self._add_watch(os.path.dirname(root) or ".")
+        else:
+            for dirpath, _, _ in os.walk(root):
+                self._add_watch(dirpath)
+            self.recursive_roots.append(os.path.normpath(root))
+
+    @classmethod
+    def available(cls) -> bool:
+        return sys.platform.startswith("linux") and ctypes.util.find_library("c") is not None
+
+    def _add_watch(self, directory: str):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.directories[wd] = os.path.normpath(directory)
+
+    def _is_watched(self, path: str) -> bool:
+        return path in self.files or any(path == root or path.startswith(root + os.sep)
+                                         for root in self.recursive_roots)
+
+    def _read_events(self) -> Set[str]:
+        changed = set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0").decode()
+            offset += name_length
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.normpath(os.path.join(directory, name))
+            if not self._is_watched(path):
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                    for dirpath, _, filenames in os.walk(path):
+                        self._add_watch(dirpath)
+                        changed.update(os.path.join(dirpath, filename) for filename in filenames)
+                continue
+            changed.add(path)
+        return changed
+
+    def wait(self, timeout: float = None) -> Set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = self._read_events()
+        # Saving a file usually produces a burst of events; collect it in one batch
+        while select.select([self.fd], [], [], self.debounce)[0]:
+            changed |= self._read_events()
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DevSite:
+    """Keeps the manifest and parsed template warm in memory and rebuilds only what a change affects."""
+    def __init__(self, content_dir="content", static_dir="static", dest_dir="docs", template_path="template.html",
+                 base_path="/", manifest_path=MANIFEST_PATH, graph_path=DEPGRAPH_PATH,
+                 search_state_path=SEARCH_STATE_PATH, metadata_path=METADATA_PATH, image_cache_dir=IMAGE_CACHE_DIR,
+                 drafts=False, site_url=""):
+        self.content_dir = os.path.normpath(content_dir)
+        self.static_dir = os.path.normpath(static_dir)
+        self.dest_dir = os.path.normpath(dest_dir)
+        self.static_dest = os.path.join(self.dest_dir, "static")
+        self.template_path = os.path.normpath(template_path)
+        self.base_path = base_path
+        self.drafts = drafts
+        self.manifest = BuildManifest.load(manifest_path)
+        self.graph = DependencyGraph.load(graph_path, self.content_dir, self.static_dir)
+        self.search_index = SearchIndex.load(search_state_path, os.path.join(self.dest_dir, "search"),
+                                             base_path=base_path)
+        self.metadata = MetadataStore.load(metadata_path, self.dest_dir, site_url=site_url, base_path=base_path)
+        self.images = ImagePipeline.load(image_cache_dir, static_dir=self.static_dir,
+                                         output_dir=os.path.join(self.dest_dir, "assets"))
+
+    @property
+    def watched_paths(self):
+        """The content and static directories, the default template and every template a page names."""
+        templates = {template for dependencies in self.graph.pages.values() for template in dependencies["template"]}
+        return [self.content_dir, self.static_dir] + sorted(templates | {self.template_path})
+
+    def dest_for(self, source_path: str) -> str:
+        relative = os.path.relpath(source_path, self.content_dir)
+        return os.path.join(self.dest_dir, relative).replace('.md', '.html')
+
+    def full_build(self):
+        sync_static_files(self.static_dir, self.static_dest)
+        generate_pages_recursively(self.content_dir, self.template_path, self.dest_dir, self.base_path, self.manifest,
+                                   graph=self.graph, changed_paths=self.images.scan(), search_index=self.search_index,
+                                   metadata=self.metadata, drafts=self.drafts, images=self.images)
+        self.manifest.remove_stale_outputs(self.dest_dir)
+        self.images.prune()
+        self.write_aggregates()
+        self.save()
+
+    def save(self):
+        self.manifest.save()
+        self.graph.save()
+        self.search_index.save()
+        self.metadata.save()
+        self.images.save()
+
+    def rebuild_page(self, source_path: str):
+        dest_path = self.dest_for(source_path)
+        # Stat before reading, so an edit racing with this rebuild makes the recorded stat stale, not the content
+        try:
+            source_stat = stat_key(os.stat(source_path))
+            front_matter = read_front_matter(source_path)
+        except FileNotFoundError:
+            front_matter = None
+        except ValueError as e:
+            raise PageBuildError(source_path, e) from e
+        if front_matter is None or (is_draft(front_matter) and not self.drafts):
+            if os.path.isfile(dest_path):
+                print(f"Removing output of {'draft' if front_matter else 'deleted'} page: {dest_path}")
+                os.remove(dest_path)
+            self.manifest.entries.pop(dest_path, None)
+            self.graph.forget(source_path)
+            self.search_index.remove(source_path)
+            self.metadata.remove(source_path)
+            return
+        template_path = page_template(front_matter, self.template_path)
+        result = build_page((source_path, template_path, dest_path, self.base_path), collect_terms=True,
+                            images=self.images)
+        self.graph.record(source_path, template_path, result.urls)
+        url = BasePathResolver(self.base_path)(page_url(dest_path, self.dest_dir))
+        self.search_index.update(source_path, url, result.title, result.terms.terms)
+        self.metadata.update(source_path, url, result.title, source_stat[1])
+        self.manifest.record(dest_path, source_path, file_digest(source_path),
+                             self.manifest.template_digest(template_path), self.base_path, source_stat, front_matter)
+
+    def sync_asset(self, source_path: str):
+        dest_path = os.path.join(self.static_dest, os.path.relpath(source_path, self.static_dir))
+        if os.path.isfile(source_path):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            print(f"Copying file: {source_path} to {dest_path}")
+            copy_file(source_path, dest_path)
+        elif os.path.isfile(dest_path):
+            print(f"Removing stale file: {dest_path}")
+            os.remove(dest_path)
+
+    def write_aggregates(self):
+        """Writes the site-wide outputs collected from every page: the shards of the search index that rebuilt
+        pages dirtied, and the sitemap, feed and nav.json if any page metadata changed."""
+        self.search_index.write(write_output)
+        self.metadata.write(write_output)
+
+    def apply_changes(self, changed_paths: Iterable[str], defer_aggregates: bool = False):
+        """Rebuilds the pages and assets affected by the changed paths. A template change rebuilds every page.
+
+        Besides the changed pages themselves, pages that link to them or use a changed asset are rebuilt,
+        as recorded in the dependency graph, and published images superseded by a changed one are removed.
+        With defer_aggregates, the caller runs write_aggregates later, so a burst of edits writes a large
+        search shard and the sitemap, feed and nav.json of all pages once instead of on every save.
+        """
+        changed = {os.path.normpath(path) for path in changed_paths}
+        for path in sorted(changed):
+            if path.startswith(self.static_dir + os.sep):
+                self.sync_asset(path)
+        if self.template_path in changed:
+            print("Template changed, rebuilding all pages")
+            generate_pages_recursively(self.content_dir, self.template_path, self.dest_dir, self.base_path,
+                                       self.manifest, graph=self.graph, changed_paths=changed,
+                                       search_index=self.search_index, metadata=self.metadata,
+                                       drafts=self.drafts, images=self.images)
+        else:
+            for page, reason in sorted(self.graph.rebuild_set(changed).items()):
+                print(f"Rebuilding {page}: {reason}")
+                self.rebuild_page(page)
+        if any(path.startswith(self.static_dir + os.sep) for path in changed):
+            # Pages showing a changed image now use its new name
+            self.images.prune()
+        if not defer_aggregates:
+            self.write_aggregates()
+
+
+def serve(directory: str, port: int) -> ThreadingHTTPServer:
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {directory} at http://localhost:{port}")
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Build the site and serve it locally.")
+    parser.add_argument("basepath", nargs="?", default="/",
+                        help="URL prefix the site is served from (default: /)")
+    parser.add_argument("--port", type=int, default=8888, help="port of the dev server (default: 8888)")
+    parser.add_argument("--watch", action="store_true",
+                        help="rebuild affected pages and assets when content/, static/ or template.html change")
+    parser.add_argument("--drafts", action="store_true",
+                        help="also build pages whose front matter sets draft: true")
+    parser.add_argument("--site-url", default="", metavar="URL",
+                        help="origin the site is published at, as for builds, so sitemap.xml and feed.xml stay "
+                             "the same (default: neither is written)")
+    parser.add_argument("--poll", action="store_true", help="use stat polling instead of inotify")
+    parser.add_argument("--interval", type=float, default=0.1, help="polling interval in seconds (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    site = DevSite(base_path=args.basepath, drafts=args.drafts, site_url=args.site_url)
+    site.full_build()
+    server = serve(site.dest_dir, args.port)
+    pending = False
+    try:
+        if not args.watch:
+            threading.Event().wait()
+        if args.poll or not InotifyWatcher.available():
+            watcher = PollingWatcher(site.watched_paths, args.interval)
+        else:
+            watcher = InotifyWatcher(site.watched_paths)
+        print("Watching for changes, press Ctrl+C to stop")
+        while True:
+            # The pages are served as soon as they are rebuilt; the search index and metadata follow once edits
+            # settle
+            changed = watcher.wait(AGGREGATE_DELAY if pending else None)
+            if not changed:
+                if pending:
+                    start = time.perf_counter()
+                    site.write_aggregates()
+                    pending = False
+                    elapsed = (time.perf_counter() - start) * 1000
+                    print(f"Updated the search index and site metadata in {elapsed:.1f} ms")
+                continue
+            start = time.perf_counter()
+            try:
+                site.apply_changes(changed, defer_aggregates=True)
+            except PageBuildError as e:
+                print(e, file=sys.stderr)
+            except Exception as e:
+                print(f"Rebuild failed: {e}", file=sys.stderr)
+            pending = True
+            # A page may have switched to a template nothing else used
+            for path in sorted(set(site.watched_paths) - set(watcher.roots)):
+                watcher.add(path)
+            print(f"Rebuilt {len(changed)} changed path(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        if pending:
+            site.write_aggregates()
+        site.save()
+    return 0